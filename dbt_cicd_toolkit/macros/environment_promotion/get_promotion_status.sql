@@ -14,12 +14,7 @@
   
   {# Default to all models if none specified #}
   {%- if not models -%}
-    {%- set models = [] -%}
-    {%- for node_id, node in graph.nodes.items() -%}
-      {%- if node.resource_type == 'model' -%}
-        {%- do models.append(node.name) -%}
-      {%- endif -%}
-    {%- endfor -%}
+    {%- set models = dbt_cicd_toolkit.build_graph_index().model_ids.keys() | list -%}
   {%- endif -%}
   
   {# Initialize result dictionary #}
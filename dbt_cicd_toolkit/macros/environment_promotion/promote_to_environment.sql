@@ -19,17 +19,12 @@
   {%- set valid_models = [] -%}
   {%- set invalid_models = [] -%}
   
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
+  
   {%- for model_name in models -%}
-    {%- set found = false -%}
-    {%- for node_id, node in graph.nodes.items() -%}
-      {%- if node.resource_type == 'model' and node.name == model_name -%}
-        {%- set found = true -%}
-        {%- do valid_models.append({'name': model_name, 'node': node}) -%}
-        {%- break -%}
-      {%- endif -%}
-    {%- endfor -%}
-    
-    {%- if not found -%}
+    {%- if model_name in index.model_ids -%}
+      {%- do valid_models.append({'name': model_name, 'node': graph.nodes[index.model_ids[model_name]]}) -%}
+    {%- else -%}
       {%- do invalid_models.append(model_name) -%}
     {%- endif -%}
   {%- endfor -%}
@@ -43,11 +38,10 @@
     {%- set failing_tests = [] -%}
     
     {%- for model in valid_models -%}
-      {%- for node_id, node in graph.nodes.items() -%}
-        {%- if node.resource_type == 'test' and ('model.' ~ project_name ~ '.' ~ model.name) in node.depends_on.nodes -%}
-          {%- if node.test_metadata and node.test_metadata.get('status') == 'fail' -%}
-            {%- do failing_tests.append({'model': model.name, 'test': node.name}) -%}
-          {%- endif -%}
+      {%- for test_id in index.model_tests.get(model.node.unique_id, []) -%}
+        {%- set node = graph.nodes[test_id] -%}
+        {%- if node.test_metadata and node.test_metadata.get('status') == 'fail' -%}
+          {%- do failing_tests.append({'model': model.name, 'test': node.name}) -%}
         {%- endif -%}
       {%- endfor -%}
     {%- endfor -%}
@@ -0,0 +1,86 @@
+{% macro build_graph_index() %}
+  {{ return(adapter.dispatch('build_graph_index', 'dbt_cicd_toolkit')()) }}
+{% endmacro %}
+
+{% macro default__build_graph_index() %}
+  {#- This macro builds lookup maps over the graph once per invocation and memoizes them on the graph -#}
+
+  {%- if graph.get('_dbt_cicd_toolkit_index') is not none -%}
+    {{ return(graph['_dbt_cicd_toolkit_index']) }}
+  {%- endif -%}
+
+  {%- set index = {
+    'path_nodes': {},
+    'path_sources': {},
+    'model_ids': {},
+    'children': {},
+    'model_tests': {},
+    'models': [],
+    'tests': []
+  } -%}
+
+  {#- One pass over the nodes fills every map -#}
+  {%- for node_id, node in graph.nodes.items() -%}
+    {%- if node.resource_type == 'model' -%}
+      {%- do index.models.append(node_id) -%}
+      {%- if node.name not in index.model_ids -%}
+        {%- do index.model_ids.update({node.name: node_id}) -%}
+      {%- endif -%}
+    {%- endif -%}
+    {%- if node.original_file_path -%}
+      {%- do index.path_nodes.setdefault(node.original_file_path | replace('\\', '/'), []).append(node_id) -%}
+    {%- endif -%}
+    {%- if node.depends_on and node.depends_on.nodes -%}
+      {%- for upstream_id in node.depends_on.nodes -%}
+        {%- do index.children.setdefault(upstream_id, []).append(node_id) -%}
+        {%- if node.resource_type == 'test' -%}
+          {%- do index.model_tests.setdefault(upstream_id, []).append(node_id) -%}
+        {%- endif -%}
+      {%- endfor -%}
+    {%- endif -%}
+    {%- if node.resource_type == 'test' -%}
+      {%- do index.tests.append(node_id) -%}
+    {%- endif -%}
+  {%- endfor -%}
+
+  {%- for source_id, source in graph.sources.items() -%}
+    {%- if source.original_file_path -%}
+      {%- do index.path_sources.setdefault(source.original_file_path | replace('\\', '/'), []).append(source_id) -%}
+    {%- endif -%}
+  {%- endfor -%}
+
+  {%- do graph.update({'_dbt_cicd_toolkit_index': index}) -%}
+  {{ return(index) }}
+{% endmacro %}
+
+{% macro get_downstream_node_ids(node_ids) %}
+  {{ return(adapter.dispatch('get_downstream_node_ids', 'dbt_cicd_toolkit')(node_ids)) }}
+{% endmacro %}
+
+{% macro default__get_downstream_node_ids(node_ids) %}
+  {#- This macro returns every node downstream of node_ids, nearest first, without node_ids themselves -#}
+
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
+  {%- set seen = {} -%}
+  {%- set queue = [] -%}
+  {%- for node_id in node_ids -%}
+    {%- if node_id not in seen -%}
+      {%- do seen.update({node_id: true}) -%}
+      {%- do queue.append(node_id) -%}
+    {%- endif -%}
+  {%- endfor -%}
+
+  {#- Breadth-first walk: the loop also visits the children appended to the queue while it runs -#}
+  {%- set downstream = [] -%}
+  {%- for node_id in queue -%}
+    {%- for child_id in index.children.get(node_id, []) -%}
+      {%- if child_id not in seen -%}
+        {%- do seen.update({child_id: true}) -%}
+        {%- do queue.append(child_id) -%}
+        {%- do downstream.append(child_id) -%}
+      {%- endif -%}
+    {%- endfor -%}
+  {%- endfor -%}
+
+  {{ return(downstream) }}
+{% endmacro %}
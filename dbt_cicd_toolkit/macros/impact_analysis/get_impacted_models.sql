@@ -11,65 +11,37 @@
     {{ return(impacted_models) }}
   {%- endif -%}
   
-  {%- set directly_modified_nodes = [] -%}
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
   {%- set modified_node_ids = [] -%}
   
   {#- Identify directly modified nodes -#}
   {%- for file_path in source_files -%}
     {%- set file_path = file_path | replace('\\', '/') -%}
-    
-    {#- Find node by file path -#}
-    {%- for node_id, node in graph.nodes.items() -%}
-      {%- if node.original_file_path and (node.original_file_path | replace('\\', '/') == file_path) -%}
-        {%- do directly_modified_nodes.append(node) -%}
-        {%- do modified_node_ids.append(node.unique_id) -%}
-      {%- endif -%}
-    {%- endfor -%}
+    {%- do modified_node_ids.extend(index.path_nodes.get(file_path, [])) -%}
     
     {#- Check for source file if requested -#}
     {%- if include_sources -%}
-      {%- for source_id, source in graph.sources.items() -%}
-        {%- if source.original_file_path and (source.original_file_path | replace('\\', '/') == file_path) -%}
-          {%- do directly_modified_nodes.append(source) -%}
-          {%- do modified_node_ids.append(source.unique_id) -%}
-        {%- endif -%}
-      {%- endfor -%}
+      {%- do modified_node_ids.extend(index.path_sources.get(file_path, [])) -%}
     {%- endif -%}
   {%- endfor -%}
   
-  {%- set all_impacted_nodes = [] -%}
+  {%- set impacted_node_ids = [] -%}
   
   {#- Add directly modified nodes -#}
   {%- if not exclude_current -%}
-    {%- for node in directly_modified_nodes -%}
-      {%- do all_impacted_nodes.append(node) -%}
-    {%- endfor -%}
+    {%- do impacted_node_ids.extend(modified_node_ids) -%}
   {%- endif -%}
   
-  {#- Find downstream nodes if requested -#}
+  {#- Find every downstream node if requested -#}
   {%- if include_downstream -%}
-    {%- for node_id, node in graph.nodes.items() -%}
-      {%- if node.depends_on.nodes -%}
-        {%- set is_downstream = false -%}
-        {%- for upstream_node_id in node.depends_on.nodes -%}
-          {%- if upstream_node_id in modified_node_ids -%}
-            {%- set is_downstream = true -%}
-            {%- break -%}
-          {%- endif -%}
-        {%- endfor -%}
-        
-        {%- if is_downstream -%}
-          {%- do all_impacted_nodes.append(node) -%}
-          {%- do modified_node_ids.append(node.unique_id) -%}
-        {%- endif -%}
-      {%- endif -%}
-    {%- endfor -%}
+    {%- do impacted_node_ids.extend(dbt_cicd_toolkit.get_downstream_node_ids(modified_node_ids)) -%}
   {%- endif -%}
   
   {#- Extract model names from impacted nodes -#}
   {%- set impacted_models = [] -%}
-  {%- for node in all_impacted_nodes -%}
-    {%- if node.resource_type == 'model' -%}
+  {%- for node_id in impacted_node_ids -%}
+    {%- set node = graph.nodes.get(node_id) -%}
+    {%- if node and node.resource_type == 'model' -%}
       {%- do impacted_models.append(node.name) -%}
     {%- endif -%}
   {%- endfor -%}
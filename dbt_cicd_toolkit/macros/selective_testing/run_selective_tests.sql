@@ -23,11 +23,13 @@
     {{ return(none) }}
   {%- endif -%}
   
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
+  
   {# Add upstream models if requested #}
   {%- if include_upstream and not specific_models -%}
     {%- set upstream_models = [] -%}
     {%- for model_name in impacted_models -%}
-      {%- set model_node = graph.nodes['model.' ~ project_name ~ '.' ~ model_name] -%}
+      {%- set model_node = graph.nodes[index.model_ids[model_name]] -%}
       {%- if model_node.depends_on.nodes -%}
         {%- for upstream_node_id in model_node.depends_on.nodes -%}
           {%- if upstream_node_id.startswith('model.') -%}
@@ -41,48 +43,42 @@
     {%- set impacted_models = impacted_models | unique | list -%}
   {%- endif -%}
   
+  {# Collect the candidate tests: every test, or the tests attached to the impacted models #}
+  {%- if test_level == 'comprehensive' -%}
+    {%- set candidate_tests = index.tests -%}
+  {%- else -%}
+    {%- set candidate_tests = [] -%}
+    {%- set seen_tests = {} -%}
+    {%- set candidate_models = impacted_models if test_level in ('standard', 'minimal') else [] -%}
+    {%- for model_name in candidate_models -%}
+      {%- for test_id in index.model_tests.get(index.model_ids.get(model_name), []) -%}
+        {%- if test_id not in seen_tests -%}
+          {%- do seen_tests.update({test_id: true}) -%}
+          {%- do candidate_tests.append(test_id) -%}
+        {%- endif -%}
+      {%- endfor -%}
+    {%- endfor -%}
+  {%- endif -%}
+  
   {# Get tests to run based on test level #}
   {%- set tests_to_run = [] -%}
   {%- set passing_tests = [] -%}
   {%- set failing_tests = [] -%}
   
-  {%- for node_id, node in graph.nodes.items() -%}
-    {%- if node.resource_type == 'test' -%}
-      {%- set should_run_test = false -%}
+  {%- for test_id in candidate_tests -%}
+    {%- set node = graph.nodes[test_id] -%}
+    {%- set test_name = node.name -%}
+    
+    {# For minimal level, only run critical tests (not_null, primary_key, etc.) #}
+    {%- if test_level != 'minimal' or 'not_null' in test_name or 'unique' in test_name or 'primary_key' in test_name or 'accepted_values' in test_name -%}
+      {%- do tests_to_run.append(node.unique_id) -%}
       
-      {%- if test_level == 'comprehensive' -%}
-        {# Run all tests for comprehensive level #}
-        {%- set should_run_test = true -%}
-      {%- else -%}
-        {# For standard and minimal levels, check test dependencies #}
-        {%- for model_name in impacted_models -%}
-          {%- if ('model.' ~ project_name ~ '.' ~ model_name) in node.depends_on.nodes -%}
-            {%- if test_level == 'standard' -%}
-              {# Run all tests for standard level #}
-              {%- set should_run_test = true -%}
-              {%- break -%}
-            {%- elif test_level == 'minimal' -%}
-              {# For minimal level, only run critical tests (not_null, primary_key, etc.) #}
-              {%- set test_name = node.name -%}
-              {%- if 'not_null' in test_name or 'unique' in test_name or 'primary_key' in test_name or 'accepted_values' in test_name -%}
-                {%- set should_run_test = true -%}
-                {%- break -%}
-              {%- endif -%}
-            {%- endif -%}
-          {%- endif -%}
-        {%- endfor -%}
-      {%- endif -%}
-      
-      {%- if should_run_test -%}
-        {%- do tests_to_run.append(node.unique_id) -%}
-        
-        {# Track test status for results #}
-        {%- if node.test_metadata and node.test_metadata.status -%}
-          {%- if node.test_metadata.status == 'pass' -%}
-            {%- do passing_tests.append(node.unique_id) -%}
-          {%- elif node.test_metadata.status == 'fail' -%}
-            {%- do failing_tests.append(node.unique_id) -%}
-          {%- endif -%}
+      {# Track test status for results #}
+      {%- if node.test_metadata and node.test_metadata.status -%}
+        {%- if node.test_metadata.status == 'pass' -%}
+          {%- do passing_tests.append(node.unique_id) -%}
+        {%- elif node.test_metadata.status == 'fail' -%}
+          {%- do failing_tests.append(node.unique_id) -%}
         {%- endif -%}
       {%- endif -%}
     {%- endif -%}
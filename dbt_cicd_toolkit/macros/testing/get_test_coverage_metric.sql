@@ -10,51 +10,47 @@
     {{ return(none) }}
   {%- endif -%}
   
-  {# Set up metric calculation logic #}
-  {%- set total_models = 0 -%}
-  {%- set models_with_tests = 0 -%}
-  {%- set total_tests = 0 -%}
-  {%- set passing_tests = 0 -%}
-  {%- set failing_tests = 0 -%}
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
   
-  {# Calculate metrics for each model #}
-  {%- for node_id, node in graph.nodes.items() -%}
-    {%- if node.resource_type == 'model' -%}
-      {%- set total_models = total_models + 1 -%}
-      
-      {%- set model_tests = [] -%}
-      {%- set model_passing_tests = 0 -%}
-      {%- set model_failing_tests = 0 -%}
-      
-      {# Find tests for this model #}
-      {%- for test_id, test in graph.nodes.items() -%}
-        {%- if test.resource_type == 'test' and test.depends_on and test.depends_on.nodes -%}
-          {%- if node.unique_id in test.depends_on.nodes -%}
-            {%- do model_tests.append(test) -%}
-            
-            {# Check test status #}
-            {%- if test.test_metadata and test.test_metadata.status -%}
-              {%- if test.test_metadata.status == 'pass' -%}
-                {%- set model_passing_tests = model_passing_tests + 1 -%}
-              {%- elif test.test_metadata.status == 'fail' -%}
-                {%- set model_failing_tests = model_failing_tests + 1 -%}
-              {%- endif -%}
-            {%- endif -%}
-          {%- endif -%}
-        {%- endif -%}
-      {%- endfor -%}
-      
-      {# Update project metrics #}
-      {%- if model_tests | length > 0 -%}
-        {%- set models_with_tests = models_with_tests + 1 -%}
-      {%- endif -%}
-      
-      {%- set total_tests = total_tests + (model_tests | length) -%}
-      {%- set passing_tests = passing_tests + model_passing_tests -%}
-      {%- set failing_tests = failing_tests + model_failing_tests -%}
+  {# Set up metric calculation logic; counters live in a dict so the loop below can update them #}
+  {%- set counts = {
+    'total_models': 0,
+    'models_with_tests': 0,
+    'total_tests': 0,
+    'passing_tests': 0,
+    'failing_tests': 0
+  } -%}
+  
+  {# Calculate metrics for each model from its indexed tests #}
+  {%- for model_id in index.models -%}
+    {%- set model_tests = index.model_tests.get(model_id, []) -%}
+    {%- do counts.update({
+      'total_models': counts.total_models + 1,
+      'total_tests': counts.total_tests + (model_tests | length)
+    }) -%}
+    
+    {# Update project metrics #}
+    {%- if model_tests | length > 0 -%}
+      {%- do counts.update({'models_with_tests': counts.models_with_tests + 1}) -%}
     {%- endif -%}
+    
+    {# Check test status #}
+    {%- for test_id in model_tests -%}
+      {%- set test = graph.nodes[test_id] -%}
+      {%- if test.test_metadata and test.test_metadata.status == 'pass' -%}
+        {%- do counts.update({'passing_tests': counts.passing_tests + 1}) -%}
+      {%- elif test.test_metadata and test.test_metadata.status == 'fail' -%}
+        {%- do counts.update({'failing_tests': counts.failing_tests + 1}) -%}
+      {%- endif -%}
+    {%- endfor -%}
   {%- endfor -%}
   
+  {%- set total_models = counts.total_models -%}
+  {%- set models_with_tests = counts.models_with_tests -%}
+  {%- set total_tests = counts.total_tests -%}
+  {%- set passing_tests = counts.passing_tests -%}
+  {%- set failing_tests = counts.failing_tests -%}
+  
   {# Calculate derived metrics #}
   {%- set model_coverage_pct = (models_with_tests / total_models * 100) if total_models > 0 else 0 -%}
   {%- set test_pass_rate = (passing_tests / total_tests * 100) if total_tests > 0 else 0 -%}
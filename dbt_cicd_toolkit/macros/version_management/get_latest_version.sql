@@ -13,12 +13,47 @@
   {# Get version history for the model #}
   {%- set version_history = dbt_cicd_toolkit.get_version_history(model_name, environment) -%}
   
-  {# Return the latest version #}
+  {# Return the highest semantic version, like `dbt-cicd version latest` #}
   {%- if version_history.versions | length > 0 -%}
-    {%- set latest_version = version_history.versions[0].version -%}
+    {%- set ranked_versions = [] -%}
+    {%- for entry in version_history.versions -%}
+      {%- do ranked_versions.append({
+        'key': dbt_cicd_toolkit.semver_sort_key(entry.version, entry.timestamp),
+        'version': entry.version
+      }) -%}
+    {%- endfor -%}
+    {%- set latest_version = (ranked_versions | sort(attribute='key', reverse=true))[0].version -%}
     {{ return(latest_version) }}
   {%- else -%}
     {{ log("No versions found for model " ~ model_name, info=True) }}
     {{ return("0.0.0") }}
   {%- endif -%}
-{% endmacro %} 
\ No newline at end of file
+{% endmacro %}
+
+{% macro semver_sort_key(version, timestamp=none) %}
+  {#- Sort key matching the version registry: semver precedence, then versions that are not semver, newest first -#}
+  {%- set match = modules.re.match(
+    '^v?(0|[1-9][0-9]*)[.](0|[1-9][0-9]*)[.](0|[1-9][0-9]*)(?:-([0-9A-Za-z.-]+))?(?:[+][0-9A-Za-z.-]+)?$',
+    version | string
+  ) -%}
+  {%- if not match -%}
+    {{ return([0, 0, 0, 0, 0, '', timestamp or '']) }}
+  {%- endif -%}
+
+  {%- set prerelease = match.group(4) -%}
+  {%- if not prerelease -%}
+    {{ return([1, match.group(1) | int, match.group(2) | int, match.group(3) | int, 1, '~', timestamp or '']) }}
+  {%- endif -%}
+
+  {# Numeric identifiers are prefixed with their length so rc.2 sorts below rc.10 #}
+  {%- set identifiers = [] -%}
+  {%- for identifier in prerelease.split('.') -%}
+    {%- if modules.re.match('^[0-9]+$', identifier) -%}
+      {%- set number = identifier | int | string -%}
+      {%- do identifiers.append('0' ~ ('%02d' | format(number | length)) ~ number) -%}
+    {%- else -%}
+      {%- do identifiers.append('1' ~ identifier) -%}
+    {%- endif -%}
+  {%- endfor -%}
+  {{ return([1, match.group(1) | int, match.group(2) | int, match.group(3) | int, 0, identifiers | join(' '), timestamp or '']) }}
+{% endmacro %}
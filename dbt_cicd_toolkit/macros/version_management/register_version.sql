@@ -16,14 +16,8 @@
   {%- endif -%}
   
   {# Validate model exists #}
-  {%- set model_exists = false -%}
-  {%- for node_id, node in graph.nodes.items() -%}
-    {%- if node.resource_type == 'model' and node.name == model_name -%}
-      {%- set model_exists = true -%}
-      {%- set model_unique_id = node.unique_id -%}
-      {%- break -%}
-    {%- endif -%}
-  {%- endfor -%}
+  {%- set model_unique_id = dbt_cicd_toolkit.build_graph_index().model_ids.get(model_name) -%}
+  {%- set model_exists = model_unique_id is not none -%}
   
   {%- if not model_exists -%}
     {{ log("Model " ~ model_name ~ " does not exist. Cannot register version.", info=True) }}
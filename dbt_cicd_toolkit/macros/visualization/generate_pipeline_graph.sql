@@ -5,17 +5,18 @@
 {% macro default__generate_pipeline_graph(model_selection=none, include_environments=true, output_format='mermaid') %}
   {#- This macro generates a visual representation of the CI/CD pipeline for models -#}
   
+  {%- set index = dbt_cicd_toolkit.build_graph_index() -%}
+  
   {# Get models to include in the graph #}
   {%- if model_selection is none -%}
-    {%- set models_to_include = [] -%}
-    {%- for node_id, node in graph.nodes.items() -%}
-      {%- if node.resource_type == 'model' -%}
-        {%- do models_to_include.append(node.name) -%}
-      {%- endif -%}
-    {%- endfor -%}
+    {%- set models_to_include = index.model_ids.keys() | list -%}
   {%- else -%}
     {%- set models_to_include = model_selection -%}
   {%- endif -%}
+  {%- set included_models = {} -%}
+  {%- for model_name in models_to_include -%}
+    {%- do included_models.update({model_name: true}) -%}
+  {%- endfor -%}
   
   {# Get environment information if requested #}
   {%- if include_environments -%}
@@ -30,7 +31,7 @@
     
     {# Add model nodes and relationships #}
     {%- for model_name in models_to_include -%}
-      {%- set node = graph.nodes['model.' ~ project_name ~ '.' ~ model_name] -%}
+      {%- set node = graph.nodes[index.model_ids[model_name]] -%}
       {%- set model_id = model_name | replace(' ', '_') | replace('-', '_') -%}
       
       {# Add the model node #}
@@ -42,7 +43,7 @@
           {%- if upstream_id.startswith('model.') -%}
             {%- set upstream_name = upstream_id.split('.')[-1] -%}
             {%- set upstream_id_clean = upstream_name | replace(' ', '_') | replace('-', '_') -%}
-            {%- if upstream_name in models_to_include -%}
+            {%- if upstream_name in included_models -%}
               {%- do output_lines.append("    " ~ upstream_id_clean ~ " --> " ~ model_id) -%}
             {%- endif -%}
           {%- endif -%}
@@ -76,7 +77,7 @@
     
     {# Add model nodes and relationships #}
     {%- for model_name in models_to_include -%}
-      {%- set node = graph.nodes['model.' ~ project_name ~ '.' ~ model_name] -%}
+      {%- set node = graph.nodes[index.model_ids[model_name]] -%}
       {%- set model_id = model_name | replace(' ', '_') | replace('-', '_') -%}
       
       {# Add the model node #}
@@ -88,7 +89,7 @@
           {%- if upstream_id.startswith('model.') -%}
             {%- set upstream_name = upstream_id.split('.')[-1] -%}
             {%- set upstream_id_clean = upstream_name | replace(' ', '_') | replace('-', '_') -%}
-            {%- if upstream_name in models_to_include -%}
+            {%- if upstream_name in included_models -%}
               {%- do output_lines.append("    \"" ~ upstream_id_clean ~ "\" -> \"" ~ model_id ~ "\";") -%}
             {%- endif -%}
           {%- endif -%}
@@ -121,7 +122,7 @@
     
     {# Add model nodes #}
     {%- for model_name in models_to_include -%}
-      {%- set node = graph.nodes['model.' ~ project_name ~ '.' ~ model_name] -%}
+      {%- set node = graph.nodes[index.model_ids[model_name]] -%}
       {%- set model_id = model_name | replace(' ', '_') | replace('-', '_') -%}
       
       {%- do graph_data.nodes.append({
@@ -158,7 +159,7 @@
           {%- if upstream_id.startswith('model.') -%}
             {%- set upstream_name = upstream_id.split('.')[-1] -%}
             {%- set upstream_id_clean = upstream_name | replace(' ', '_') | replace('-', '_') -%}
-            {%- if upstream_name in models_to_include -%}
+            {%- if upstream_name in included_models -%}
               {%- do graph_data.edges.append({
                 "source": upstream_id_clean,
                 "target": model_id,
@@ -1,7 +1,14 @@
+{%- set catalog_source = var('catalog_source', 'graph') -%}
+
 {{
     config(
-        materialized='table',
-        tags=['dbt_cicd_toolkit', 'test_coverage']
+        materialized='incremental' if catalog_source == 'seed' else 'table',
+        unique_key='model_id',
+        tags=['dbt_cicd_toolkit', 'test_coverage'],
+        post_hook=(
+            ["DELETE FROM {{ this }} WHERE model_id NOT IN (SELECT model_id FROM {{ ref('dbt_cicd_catalog_models') }})"]
+            if catalog_source == 'seed' else []
+        )
     )
 }}
 
@@ -10,8 +17,36 @@
     
     This model extracts information about all models in the dbt project
     to support the test coverage dashboard.
+    
+    With catalog_source set to 'seed', rows are read from the
+    dbt_cicd_catalog_models seed written by scripts/catalog_export.py,
+    only rows whose checksum changed are upserted, and removed models are
+    deleted. Otherwise the catalog is rendered from the graph.
 */
 
+{% if catalog_source == 'seed' %}
+
+SELECT
+    CAST(catalog.model_id AS {{ dbt.type_string() }}) AS model_id,
+    CAST(catalog.model_name AS {{ dbt.type_string() }}) AS model_name,
+    CAST(catalog.model_schema AS {{ dbt.type_string() }}) AS model_schema,
+    CAST(catalog.model_path AS {{ dbt.type_string() }}) AS model_path,
+    CAST(catalog.materialization AS {{ dbt.type_string() }}) AS materialization,
+    CAST(catalog.description AS {{ dbt.type_string() }}) AS description,
+    CAST(catalog.package_name AS {{ dbt.type_string() }}) AS package_name,
+    CAST(catalog.checksum AS {{ dbt.type_string() }}) AS checksum
+FROM {{ ref('dbt_cicd_catalog_models') }} AS catalog
+{% if is_incremental() %}
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {{ this }} AS existing
+    WHERE existing.model_id = catalog.model_id
+      AND existing.checksum = catalog.checksum
+)
+{% endif %}
+
+{% else %}
+
 WITH models AS (
     
     {% for node_id, node in graph.nodes.items() %}
@@ -27,7 +62,8 @@ WITH models AS (
                 {% else %}
                     NULL AS description,
                 {% endif %}
-                '{{ node.package_name }}' AS package_name
+                '{{ node.package_name }}' AS package_name,
+                '{{ node.checksum.checksum }}' AS checksum
             
             {% if not loop.last %}UNION ALL{% endif %}
         {% endif %}
@@ -35,4 +71,6 @@ WITH models AS (
     
 )
 
-SELECT * FROM models 
\ No newline at end of file
+SELECT * FROM models
+
+{% endif %}
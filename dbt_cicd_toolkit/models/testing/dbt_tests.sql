@@ -1,7 +1,14 @@
+{%- set catalog_source = var('catalog_source', 'graph') -%}
+
 {{
     config(
-        materialized='table',
-        tags=['dbt_cicd_toolkit', 'test_coverage']
+        materialized='incremental' if catalog_source == 'seed' else 'table',
+        unique_key='test_id',
+        tags=['dbt_cicd_toolkit', 'test_coverage'],
+        post_hook=(
+            ["DELETE FROM {{ this }} WHERE test_id NOT IN (SELECT test_id FROM {{ ref('dbt_cicd_catalog_tests') }})"]
+            if catalog_source == 'seed' else []
+        )
     )
 }}
 
@@ -10,8 +17,37 @@
     
     This model extracts information about all tests in the dbt project
     to support the test coverage dashboard.
+    
+    With catalog_source set to 'seed', rows are read from the
+    dbt_cicd_catalog_tests seed written by scripts/catalog_export.py,
+    only rows whose checksum changed are upserted, and removed tests are
+    deleted. Otherwise the catalog is rendered from the graph.
 */
 
+{% if catalog_source == 'seed' %}
+
+SELECT
+    CAST(catalog.test_id AS {{ dbt.type_string() }}) AS test_id,
+    CAST(catalog.test_name AS {{ dbt.type_string() }}) AS test_name,
+    CAST(catalog.test_type AS {{ dbt.type_string() }}) AS test_type,
+    CAST(catalog.model_id AS {{ dbt.type_string() }}) AS model_id,
+    CAST(catalog.column_name AS {{ dbt.type_string() }}) AS column_name,
+    CAST(catalog.status AS {{ dbt.type_string() }}) AS status,
+    CAST(catalog.description AS {{ dbt.type_string() }}) AS description,
+    CAST(catalog.package_name AS {{ dbt.type_string() }}) AS package_name,
+    CAST(catalog.checksum AS {{ dbt.type_string() }}) AS checksum
+FROM {{ ref('dbt_cicd_catalog_tests') }} AS catalog
+{% if is_incremental() %}
+WHERE NOT EXISTS (
+    SELECT 1
+    FROM {{ this }} AS existing
+    WHERE existing.test_id = catalog.test_id
+      AND existing.checksum = catalog.checksum
+)
+{% endif %}
+
+{% else %}
+
 WITH tests AS (
     
     {% for node_id, node in graph.nodes.items() %}
@@ -57,7 +93,8 @@ WITH tests AS (
                 {% else %}
                     NULL AS description,
                 {% endif %}
-                '{{ node.package_name }}' AS package_name
+                '{{ node.package_name }}' AS package_name,
+                '{{ node.checksum.checksum }}' AS checksum
             
             {% if not loop.last %}UNION ALL{% endif %}
         {% endif %}
@@ -65,4 +102,6 @@ WITH tests AS (
     
 )
 
-SELECT * FROM tests 
\ No newline at end of file
+SELECT * FROM tests
+
+{% endif %}
@@ -0,0 +1,48 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['run_date', 'model_directory'],
+        enabled=var('enable_coverage_history', false),
+        tags=['dbt_cicd_toolkit', 'test_coverage']
+    )
+}}
+
+/*
+    Test Coverage by Directory
+    
+    Coverage per model directory per day, taken from the last run of each
+    day in test_coverage_history. Incremental runs only recompute days
+    from the latest day already loaded.
+*/
+
+WITH history AS (
+    SELECT *
+    FROM {{ ref('test_coverage_history') }}
+    {% if is_incremental() %}
+    WHERE run_date >= (SELECT MAX(run_date) FROM {{ this }})
+    {% endif %}
+),
+
+last_runs AS (
+    SELECT
+        run_date,
+        MAX(generated_at) AS generated_at
+    FROM history
+    GROUP BY run_date
+)
+
+SELECT
+    h.run_date,
+    h.model_directory,
+    COUNT(*) AS total_models,
+    SUM(h.has_tests) AS models_with_tests,
+    ROUND(100.0 * SUM(h.has_tests) / NULLIF(COUNT(*), 0), 2) AS model_coverage_pct,
+    SUM(h.total_tests) AS total_tests,
+    SUM(h.passing_tests) AS passing_tests,
+    SUM(h.failing_tests) AS failing_tests,
+    ROUND(100.0 * SUM(h.passing_tests) / NULLIF(SUM(h.total_tests), 0), 2) AS test_pass_rate
+FROM history h
+INNER JOIN last_runs r
+    ON h.run_date = r.run_date
+    AND h.generated_at = r.generated_at
+GROUP BY h.run_date, h.model_directory
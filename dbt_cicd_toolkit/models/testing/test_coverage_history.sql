@@ -0,0 +1,50 @@
+{{
+    config(
+        materialized='incremental',
+        unique_key=['run_id', 'model_id'],
+        enabled=var('enable_coverage_history', false),
+        tags=['dbt_cicd_toolkit', 'test_coverage']
+    )
+}}
+
+/*
+    Test Coverage History
+    
+    Appends the per-model coverage and test status of each dbt run, keyed
+    by (run_id, model_id). Rows come from the dbt_cicd_coverage_snapshot
+    seed written by scripts/catalog_export.py from run_results.json, and
+    each run only reads the rows of runs newer than those already loaded.
+*/
+
+WITH snapshot AS (
+    SELECT
+        CAST(run_id AS {{ dbt.type_string() }}) AS run_id,
+        CAST(generated_at AS {{ dbt.type_timestamp() }}) AS generated_at,
+        CAST(model_id AS {{ dbt.type_string() }}) AS model_id,
+        CAST(model_name AS {{ dbt.type_string() }}) AS model_name,
+        CAST(model_directory AS {{ dbt.type_string() }}) AS model_directory,
+        CAST(total_tests AS {{ dbt.type_int() }}) AS total_tests,
+        CAST(passing_tests AS {{ dbt.type_int() }}) AS passing_tests,
+        CAST(failing_tests AS {{ dbt.type_int() }}) AS failing_tests,
+        CAST(columns_tested AS {{ dbt.type_int() }}) AS columns_tested,
+        CAST(test_status AS {{ dbt.type_string() }}) AS test_status
+    FROM {{ ref('dbt_cicd_coverage_snapshot') }}
+)
+
+SELECT
+    run_id,
+    generated_at,
+    CAST(generated_at AS DATE) AS run_date,
+    model_id,
+    model_name,
+    model_directory,
+    total_tests,
+    passing_tests,
+    failing_tests,
+    columns_tested,
+    test_status,
+    CASE WHEN total_tests > 0 THEN 1 ELSE 0 END AS has_tests
+FROM snapshot
+{% if is_incremental() %}
+WHERE generated_at > (SELECT MAX(generated_at) FROM {{ this }})
+{% endif %}
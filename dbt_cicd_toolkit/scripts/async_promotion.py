@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Concurrent promotion of the same models to several environments.
+
+Each environment is validated with its own `dbt test --target <env>`
+subprocess, driven by asyncio so that a bounded number of environments
+run at once. Transient failures (dbt errors without test results, and
+timeouts) are retried, dbt output is streamed with an environment
+prefix, and successful promotions are recorded in the promotion store
+once every environment has finished.
+"""
+
+import asyncio
+import json
+import os
+import signal
+import time
+from collections import deque
+from datetime import datetime
+from pathlib import Path
+
+DEFAULT_CONCURRENCY = 4
+DEFAULT_RETRIES = 1
+DEFAULT_TIMEOUT_SECONDS = 3600
+PROMOTION_DIR_NAME = 'promotion'
+# Output lines kept per dbt invocation to explain a failure
+OUTPUT_TAIL_LINES = 20
+STREAM_LIMIT = 1024 * 1024
+
+FAILED_STATUSES = ('fail', 'error', 'runtime error')
+
+
+def environment_target_path(project_dir, environment):
+    """Return the target path used for one environment's dbt invocations."""
+    return (Path(project_dir) / 'target' / PROMOTION_DIR_NAME / environment).resolve()
+
+
+async def _stream_output(stream, prefix, lines):
+    async for raw_line in stream:
+        line = raw_line.decode('utf-8', errors='replace').rstrip()
+        lines.append(line)
+        print(f"{prefix} {line}", flush=True)
+
+
+def _kill(process):
+    """Kill dbt and anything it started, which may still hold its output pipe open."""
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, ProcessLookupError):
+        process.kill()
+
+
+async def run_dbt(args, prefix, timeout=None):
+    """Run dbt as an asyncio subprocess, streaming its output with a prefix.
+
+    Returns (returncode, last output lines); returncode is None on timeout,
+    after the process has been killed.
+    """
+    process = await asyncio.create_subprocess_exec(
+        'dbt', *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.STDOUT, limit=STREAM_LIMIT,
+        start_new_session=True
+    )
+    lines = deque(maxlen=OUTPUT_TAIL_LINES)
+    try:
+        await asyncio.wait_for(_stream_output(process.stdout, prefix, lines), timeout)
+        return await process.wait(), lines
+    except asyncio.TimeoutError:
+        _kill(process)
+        await process.wait()
+        return None, lines
+    except asyncio.CancelledError:
+        _kill(process)
+        await process.wait()
+        raise
+
+
+def _failed_tests(run_results_path):
+    if not run_results_path.exists():
+        return None
+    with open(run_results_path, 'r') as f:
+        run_results = json.load(f)
+    return [result.get('unique_id') for result in run_results.get('results', [])
+            if result.get('status') in FAILED_STATUSES]
+
+
+async def validate_environment(project_dir, environment, models, retries=DEFAULT_RETRIES,
+                               timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Run the models' tests against one environment, retrying transient failures.
+
+    Returns {'status', 'attempts', 'failed_tests', 'message'}. Failing tests
+    are final, while dbt errors without test results and timeouts are
+    retried up to `retries` more times.
+    """
+    target_path = environment_target_path(project_dir, environment)
+    target_path.mkdir(parents=True, exist_ok=True)
+    run_results_path = target_path / 'run_results.json'
+    args = ['test', '--project-dir', str(project_dir), '--target', environment,
+            '--target-path', str(target_path), '--log-path', str(target_path / 'logs'),
+            '--select'] + list(models)
+
+    result = {}
+    for attempt in range(1, retries + 2):
+        if attempt > 1:
+            print(f"[{environment}] Retrying (attempt {attempt} of {retries + 1})", flush=True)
+        # Never read results left over from an earlier attempt
+        run_results_path.unlink(missing_ok=True)
+        returncode, lines = await run_dbt(args, f"[{environment}]", timeout)
+        failed_tests = _failed_tests(run_results_path)
+
+        if returncode == 0:
+            return {'status': 'validated', 'attempts': attempt, 'failed_tests': [], 'message': ''}
+        if returncode is None:
+            result = {'status': 'timeout', 'attempts': attempt, 'failed_tests': [],
+                      'message': f"dbt test timed out after {timeout}s"}
+        elif failed_tests:
+            return {'status': 'failed', 'attempts': attempt, 'failed_tests': failed_tests,
+                    'message': f"{len(failed_tests)} tests failed"}
+        else:
+            result = {'status': 'error', 'attempts': attempt, 'failed_tests': [],
+                      'message': lines[-1] if lines else f"dbt exited with code {returncode}"}
+    return result
+
+
+async def promote_environment(project_dir, environment, models, semaphore, require_tests=True,
+                              retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Validate the models against one environment once a concurrency slot is free.
+
+    Returns the outcome, with status 'promoted' if the models can be promoted.
+    """
+    async with semaphore:
+        print(f"[{environment}] Starting promotion of {len(models)} models", flush=True)
+        start = time.monotonic()
+        if require_tests:
+            outcome = await validate_environment(project_dir, environment, models, retries, timeout)
+        else:
+            outcome = {'status': 'validated', 'attempts': 0, 'failed_tests': [], 'message': 'tests skipped'}
+
+        if outcome['status'] == 'validated':
+            outcome['status'] = 'promoted'
+        outcome.update({
+            'environment': environment,
+            'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'duration': round(time.monotonic() - start, 2)
+        })
+        print(f"[{environment}] {outcome['status']} after {outcome['duration']}s", flush=True)
+        return outcome
+
+
+async def promote_environments(project_dir, environments, models, concurrency=DEFAULT_CONCURRENCY, store=None,
+                               require_tests=True, retries=DEFAULT_RETRIES, timeout=DEFAULT_TIMEOUT_SECONDS):
+    """Promote the models to every environment with at most `concurrency` running at once.
+
+    Returns one result per environment, in the order given. Successful
+    promotions are recorded in `store` in one transaction after every
+    environment finished, since SQLite writes block the event loop and
+    can wait on the store's busy timeout.
+    """
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    results = await asyncio.gather(*(
+        promote_environment(project_dir, environment, models, semaphore, require_tests, retries, timeout)
+        for environment in environments
+    ))
+    if store is not None:
+        promotion_plans = [{
+            'target_environment': result['environment'],
+            'models': list(models),
+            'timestamp': result['timestamp'],
+            'success': True
+        } for result in results if result['status'] == 'promoted']
+        if promotion_plans:
+            store.record_promotions(promotion_plans)
+    return results
+
+
+def format_report(results, output_format='text'):
+    """Return the consolidated per-environment promotion report."""
+    if output_format == 'json':
+        return json.dumps({'environments': results}, indent=2)
+
+    promoted = sum(1 for result in results if result['status'] == 'promoted')
+    if output_format == 'markdown':
+        lines = ['# Promotion Results', '',
+                 f"{promoted} of {len(results)} environments promoted", '',
+                 '| Environment | Status | Attempts | Duration (s) | Details |',
+                 '| --- | --- | --- | --- | --- |']
+        for result in results:
+            lines.append(f"| {result['environment']} | {result['status']} | {result['attempts']} | "
+                         f"{result['duration']} | {result['message']} |")
+    else:
+        lines = ['Promotion Results:',
+                 f"{'Environment':<20} | {'Status':<9} | {'Attempts':<8} | {'Duration':>9} | Details",
+                 '-' * 80]
+        for result in results:
+            lines.append(f"{result['environment']:<20} | {result['status']:<9} | {result['attempts']:<8} | "
+                         f"{result['duration']:>8}s | {result['message']}")
+        lines.append(f"{promoted} of {len(results)} environments promoted")
+
+    for result in results:
+        for test_id in result['failed_tests']:
+            lines.append(f"  [{result['environment']}] failed: {test_id}")
+    return '\n'.join(lines)
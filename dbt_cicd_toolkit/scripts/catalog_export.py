@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""
+Export the model and test catalogs of a dbt project as seed files.
+
+The manifest is streamed once and every model and test is written as a
+CSV row with a checksum of its contents. Loading the files with
+`dbt seed` replaces the UNION ALL SQL the dbt_models and dbt_tests
+models otherwise render from the graph, and lets those models upsert
+only the rows whose checksum changed.
+
+When run results are available, a per-model coverage snapshot of that
+run is written as well, which the test_coverage_history model appends.
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import posixpath
+import sys
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.coverage import compute_coverage, default_run_results_path
+from dbt_cicd_toolkit.scripts.manifest_graph import default_manifest_path, load_graph
+from dbt_cicd_toolkit.scripts.manifest_reader import iter_manifest_members
+
+MODELS_SEED_NAME = 'dbt_cicd_catalog_models'
+TESTS_SEED_NAME = 'dbt_cicd_catalog_tests'
+SNAPSHOT_SEED_NAME = 'dbt_cicd_coverage_snapshot'
+
+MODEL_COLUMNS = ['model_id', 'model_name', 'model_schema', 'model_path', 'materialization',
+                 'description', 'package_name', 'checksum']
+TEST_COLUMNS = ['test_id', 'test_name', 'test_type', 'model_id', 'column_name', 'status',
+                'description', 'package_name', 'checksum']
+SNAPSHOT_COLUMNS = ['run_id', 'generated_at', 'model_id', 'model_name', 'model_directory',
+                    'total_tests', 'passing_tests', 'failing_tests', 'columns_tested', 'test_status']
+
+
+def parse_arguments(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description='Export dbt model and test catalogs as seed files.')
+    parser.add_argument('--dbt-project-dir', type=str, default='.',
+                        help='Path to dbt project directory')
+    parser.add_argument('--manifest-path', type=str,
+                        help='Path to manifest.json (defaults to <project-dir>/target/manifest.json)')
+    parser.add_argument('--run-results', type=str,
+                        help='run_results.json to read test statuses from '
+                             '(defaults to <project-dir>/target/run_results.json)')
+    parser.add_argument('--output-dir', type=str,
+                        help='Directory to write the seed files to (defaults to <project-dir>/seeds)')
+    return parser.parse_args(argv)
+
+
+def _node_checksum(node):
+    checksum = node.get('checksum') or {}
+    return checksum.get('checksum', '') if isinstance(checksum, dict) else str(checksum)
+
+
+def _row_checksum(values):
+    """Hash a catalog row so changed rows can be detected in the warehouse."""
+    digest = hashlib.sha256()
+    for value in values:
+        digest.update(str('' if value is None else value).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def model_row(unique_id, node):
+    """Return the catalog row of a model node."""
+    values = [
+        unique_id,
+        node.get('name'),
+        node.get('schema'),
+        node.get('original_file_path'),
+        (node.get('config') or {}).get('materialized'),
+        node.get('description') or None,
+        node.get('package_name'),
+        _node_checksum(node)
+    ]
+    return values[:-1] + [_row_checksum(values)]
+
+
+def test_row(unique_id, node, status):
+    """Return the catalog row of a test node."""
+    test_metadata = node.get('test_metadata') or {}
+    model_ids = [n for n in (node.get('depends_on') or {}).get('nodes') or [] if n.startswith('model.')]
+    values = [
+        unique_id,
+        node.get('name'),
+        test_metadata.get('name') or 'custom',
+        model_ids[0] if model_ids else None,
+        node.get('column_name'),
+        status or 'unknown',
+        node.get('description') or None,
+        node.get('package_name'),
+        _node_checksum(node)
+    ]
+    return values[:-1] + [_row_checksum(values)]
+
+
+def _open_seed(path):
+    f = open(path, 'w', newline='', encoding='utf-8')
+    return f, csv.writer(f, lineterminator='\n')
+
+
+def _temp_path(path):
+    return path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+
+
+def load_run_results(run_results_path):
+    """Return a run_results document, or None if the file does not exist."""
+    path = Path(run_results_path)
+    if not path.exists():
+        return None
+    with open(path, 'r') as f:
+        return json.load(f)
+
+
+def export_catalogs(manifest_path, output_dir, test_statuses=None):
+    """Stream the manifest into the model and test seed files.
+
+    Returns (models written, tests written). Files are replaced
+    atomically so a concurrent `dbt seed` never reads a partial file.
+    """
+    test_statuses = test_statuses or {}
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    models_path = output_dir / f'{MODELS_SEED_NAME}.csv'
+    tests_path = output_dir / f'{TESTS_SEED_NAME}.csv'
+    models_tmp = _temp_path(models_path)
+    tests_tmp = _temp_path(tests_path)
+
+    model_count = test_count = 0
+    models_file, models_writer = _open_seed(models_tmp)
+    tests_file, tests_writer = _open_seed(tests_tmp)
+    with models_file, tests_file:
+        models_writer.writerow(MODEL_COLUMNS)
+        tests_writer.writerow(TEST_COLUMNS)
+        for _, unique_id, node in iter_manifest_members(manifest_path, ('nodes',)):
+            resource_type = node.get('resource_type')
+            if resource_type == 'model':
+                models_writer.writerow(model_row(unique_id, node))
+                model_count += 1
+            elif resource_type == 'test':
+                tests_writer.writerow(test_row(unique_id, node, test_statuses.get(unique_id)))
+                test_count += 1
+
+    os.replace(models_tmp, models_path)
+    os.replace(tests_tmp, tests_path)
+    return model_count, test_count
+
+
+def export_coverage_snapshot(graph, run_results, output_dir):
+    """Write the per-model coverage of one run to the snapshot seed.
+
+    Rows carry the run's invocation id and the time its run_results were
+    generated. Returns the number of rows written.
+    """
+    metadata = run_results.get('metadata') or {}
+    run_id = metadata.get('invocation_id')
+    generated_at = metadata.get('generated_at')
+    test_statuses = {result['unique_id']: result.get('status')
+                     for result in run_results.get('results', []) if result.get('unique_id')}
+    coverage = compute_coverage(graph, test_statuses)
+
+    snapshot_path = Path(output_dir) / f'{SNAPSHOT_SEED_NAME}.csv'
+    snapshot_tmp = _temp_path(snapshot_path)
+    snapshot_file, writer = _open_seed(snapshot_tmp)
+    with snapshot_file:
+        writer.writerow(SNAPSHOT_COLUMNS)
+        for row in coverage['models']:
+            writer.writerow([
+                run_id,
+                generated_at,
+                row['model_id'],
+                row['model_name'],
+                posixpath.dirname(row['model_path'] or ''),
+                row['total_tests'],
+                row['passing_tests'],
+                row['failing_tests'],
+                row['columns_tested'],
+                row['test_status']
+            ])
+    os.replace(snapshot_tmp, snapshot_path)
+    return len(coverage['models'])
+
+
+def main(argv=None):
+    args = parse_arguments(argv)
+    manifest_path = Path(args.manifest_path) if args.manifest_path else default_manifest_path(args.dbt_project_dir)
+    if not manifest_path.exists():
+        print(f"Error: Manifest not found at {manifest_path}. Run 'dbt compile' first.")
+        return 1
+
+    output_dir = args.output_dir or Path(args.dbt_project_dir) / 'seeds'
+    run_results = load_run_results(args.run_results or default_run_results_path(args.dbt_project_dir))
+    test_statuses = {result['unique_id']: result.get('status')
+                     for result in (run_results or {}).get('results', []) if result.get('unique_id')}
+    model_count, test_count = export_catalogs(manifest_path, output_dir, test_statuses)
+    print(f"Exported {model_count} models and {test_count} tests to {output_dir}")
+    seeds = [MODELS_SEED_NAME, TESTS_SEED_NAME]
+
+    if run_results is not None:
+        graph = load_graph(args.dbt_project_dir, str(manifest_path))
+        snapshot_count = export_coverage_snapshot(graph, run_results, output_dir)
+        print(f"Exported coverage of {snapshot_count} models for run "
+              f"{(run_results.get('metadata') or {}).get('invocation_id')}")
+        seeds.append(SNAPSHOT_SEED_NAME)
+
+    print(f"Load them with: dbt seed --select {' '.join(seeds)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,31 @@ This script provides CLI access to the toolkit's features.
 """
 
 import argparse
+import io
 import json
 import os
-import subprocess
 import sys
-from pathlib import Path
 
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtCommandError, get_runner
 
-def parse_arguments():
+# Commands that can be served by a running daemon. Commands that run dbt
+# tests (selective-testing, promote and version deploy) are excluded: the
+# daemon serves one request at a time, so long test runs would block
+# interactive queries, outlive the client timeout and hide their progress.
+DAEMON_COMMANDS = ('impact-analysis', 'graph', 'version', 'promotion', 'merge-results')
+# Subcommands of daemon commands that always run in the client
+CLIENT_SUBCOMMANDS = {'version': ('deploy',)}
+
+
+def forwards_to_daemon(args):
+    """Return True if a parsed command may be served by a running daemon."""
+    if args.command not in DAEMON_COMMANDS:
+        return False
+    subcommand = getattr(args, f"{args.command}_command", None)
+    return subcommand not in CLIENT_SUBCOMMANDS.get(args.command, ())
+
+
+def parse_arguments(argv=None):
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='dbt CI/CD Toolkit CLI')
     subparsers = parser.add_subparsers(dest='command', help='Command to execute')
@@ -33,24 +50,131 @@ def parse_arguments():
     
     # Impact analysis command
     impact_parser = subparsers.add_parser('impact-analysis', help='Analyze impact of changes')
-    impact_parser.add_argument('--files', type=str, nargs='+', required=True,
-                        help='Source files that have changed')
+    impact_parser.add_argument('--files', type=str, nargs='+', default=[],
+                        help='Source files that have changed (directories and glob patterns '
+                             'such as models/staging/** are allowed)')
+    impact_parser.add_argument('--files-from', type=str,
+                        help='File listing changed files one per line, e.g. from git diff --name-only, '
+                             'or - for stdin')
+    impact_parser.add_argument('--state', type=str,
+                        help='Manifest (or artifacts directory) to compare against, e.g. from production')
+    impact_parser.add_argument('--columns', action='store_true',
+                        help='Report the impacted columns of each model using column-level lineage')
+    impact_parser.add_argument('--changed-columns', type=str, nargs='+', default=[],
+                        help='Changed columns as model.column (implies --columns)')
     impact_parser.add_argument('--include-downstream', action='store_true',
                         help='Include downstream models')
     impact_parser.add_argument('--format', type=str, choices=['json', 'markdown', 'text'],
                         default='text', help='Output format')
+    impact_parser.add_argument('--project-dir', type=str, default='.',
+                        help='Path to the dbt project directory')
+    impact_parser.add_argument('--manifest-path', type=str,
+                        help='Path to manifest.json (defaults to <project-dir>/target/manifest.json)')
+    
+    # Pipeline graph command
+    graph_parser = subparsers.add_parser('graph', help='Render the model DAG')
+    graph_parser.add_argument('--select', type=str, nargs='+',
+                       help='Models to center the graph on (default: all models)')
+    graph_parser.add_argument('--depth', type=int,
+                       help='Maximum number of hops from the selected models')
+    graph_parser.add_argument('--direction', type=str, choices=['up', 'down', 'both'],
+                       default='both', help='Expand the selection upstream, downstream or both')
+    graph_parser.add_argument('--changed-files', type=str, nargs='+',
+                       help='Only render the models impacted by these changed files')
+    graph_parser.add_argument('--cluster-by', type=str, choices=['directory', 'package'],
+                       help='Collapse models into one node per directory or package')
+    graph_parser.add_argument('--reduce', action='store_true',
+                       help='Drop edges implied by longer paths (transitive reduction)')
+    graph_parser.add_argument('--include-environments', action='store_true',
+                       help='Show the environments each model has been promoted to')
+    graph_parser.add_argument('--format', type=str, choices=['mermaid', 'dot', 'json'],
+                       default='mermaid', help='Output format')
+    graph_parser.add_argument('--output', type=str,
+                       help='File to write the graph to (default: stdout)')
+    graph_parser.add_argument('--project-dir', type=str, default='.',
+                       help='Path to the dbt project directory')
+    graph_parser.add_argument('--manifest-path', type=str,
+                       help='Path to manifest.json (defaults to <project-dir>/target/manifest.json)')
+    
+    # Watch mode
+    watch_parser = subparsers.add_parser('watch', help='Print the impact of every saved file while editing')
+    watch_parser.add_argument('--files', type=str, nargs='+', default=[],
+                       help='Files already changed when the watch starts')
+    watch_parser.add_argument('--level', type=str, choices=['minimal', 'standard', 'comprehensive'],
+                       default='minimal', help='Test level of the planned tests')
+    watch_parser.add_argument('--run-tests', action='store_true',
+                       help='Run the planned tests after every save')
+    watch_parser.add_argument('--poll', action='store_true',
+                       help='Poll for changes instead of using watchdog file events')
+    watch_parser.add_argument('--interval', type=float, default=0.5,
+                       help='Seconds between polls')
+    watch_parser.add_argument('--project-dir', type=str, default='.',
+                       help='Path to the dbt project directory')
+    watch_parser.add_argument('--manifest-path', type=str,
+                       help='Path to manifest.json (defaults to <project-dir>/target/manifest.json)')
     
     # Selective testing command
     test_parser = subparsers.add_parser('selective-testing', help='Run selective tests')
-    test_parser.add_argument('--files', type=str, nargs='+', required=True,
-                      help='Changed files to test')
+    test_parser.add_argument('--files', type=str, nargs='+', default=[],
+                      help='Changed files to test (directories and glob patterns are allowed)')
+    test_parser.add_argument('--files-from', type=str,
+                      help='File listing changed files one per line, or - for stdin')
     test_parser.add_argument('--level', type=str, 
-                      choices=['minimal', 'standard', 'comprehensive'],
+                      choices=['minimal', 'standard', 'comprehensive', 'column'],
                       default='standard', help='Test level')
+    test_parser.add_argument('--changed-columns', type=str, nargs='+',
+                      help='Changed columns as model.column, for the column test level')
     test_parser.add_argument('--include-upstream', action='store_true',
                       help='Include upstream models')
     test_parser.add_argument('--include-downstream', action='store_true',
                       help='Include downstream models')
+    test_parser.add_argument('--project-dir', type=str, default='.',
+                      help='Path to the dbt project directory')
+    test_parser.add_argument('--workers', type=int, default=1,
+                      help='Number of dbt test processes to run in parallel')
+    test_parser.add_argument('--shard', type=str,
+                      help='Only run shard i of N of the planned tests (e.g. 2/8)')
+    test_parser.add_argument('--balance-by', type=str, choices=['duration', 'count'],
+                      default='duration', help='Balance shards by test duration or test count')
+    test_parser.add_argument('--durations-from', type=str, nargs='+',
+                      help='Previous run_results.json files used to balance shards')
+    test_parser.add_argument('--prioritize', action='store_true',
+                      help='Run the tests most likely to fail first')
+    test_parser.add_argument('--fail-fast', action='store_true',
+                      help='Stop the whole test run at the first failure')
+    test_parser.add_argument('--history-dir', type=str,
+                      help='Directory of past test results used to estimate failure rates')
+    test_parser.add_argument('--budget', type=str,
+                      help='Time budget for the run (e.g. 10m); tests left out are reported')
+    test_parser.add_argument('--budget-type', type=str, choices=['wall', 'warehouse'],
+                      default='wall', help='Budget wall-clock time or total warehouse seconds')
+    test_parser.add_argument('--state', type=str,
+                      help='Production artifacts directory or manifest.json; changed nodes count as changed files')
+    test_parser.add_argument('--build', action='store_true',
+                      help='Build the impacted models and run their tests in one dbt build')
+    test_parser.add_argument('--defer', action='store_true',
+                      help='Resolve refs to models that are not built against --state')
+    test_parser.add_argument('--clone-upstream', action='store_true',
+                      help='With --build, clone unchanged upstream tables from --state first')
+    test_parser.add_argument('--dry-run', action='store_true',
+                      help='Print the test plan without running tests')
+    
+    # Merge sharded test results
+    merge_parser = subparsers.add_parser('merge-results', help='Merge run_results.json files from test shards')
+    merge_parser.add_argument('--inputs', type=str, nargs='+', required=True,
+                       help='run_results.json files to merge')
+    merge_parser.add_argument('--output', type=str, default='target/run_results.json',
+                       help='Path to write the merged run_results.json')
+    
+    # Catalog export
+    catalog_parser = subparsers.add_parser('export-catalog',
+                                           help='Export the model and test catalogs as seed files')
+    catalog_parser.add_argument('--project-dir', type=str, default='.',
+                         help='Path to the dbt project directory')
+    catalog_parser.add_argument('--output-dir', type=str,
+                         help='Directory to write the seed files to (defaults to <project-dir>/seeds)')
+    catalog_parser.add_argument('--run-results', type=str,
+                         help='run_results.json to read test statuses from')
     
     # Version management commands
     version_parser = subparsers.add_parser('version', help='Version management')
@@ -58,9 +182,9 @@ def parse_arguments():
     
     # Register version
     register_parser = version_subparsers.add_parser('register', help='Register a new version')
-    register_parser.add_argument('--model', type=str, required=True,
+    register_parser.add_argument('--model', type=str,
                           help='Model name')
-    register_parser.add_argument('--version', type=str, required=True,
+    register_parser.add_argument('--version', type=str,
                           help='Version string (e.g. 1.2.0)')
     register_parser.add_argument('--description', type=str,
                           help='Description of changes')
@@ -68,17 +192,23 @@ def parse_arguments():
                           help='Mark as breaking change')
     register_parser.add_argument('--author', type=str,
                           help='Author of the change')
+    register_parser.add_argument('--from-file', type=str,
+                          help='JSON or CSV file of versions to register in one transaction '
+                               '(fields: model, version, description, is_breaking, author)')
     
     # Deploy version
     deploy_parser = version_subparsers.add_parser('deploy', help='Deploy a version')
-    deploy_parser.add_argument('--model', type=str, required=True,
+    deploy_parser.add_argument('--model', type=str,
                         help='Model name')
-    deploy_parser.add_argument('--version', type=str, required=True,
+    deploy_parser.add_argument('--version', type=str,
                         help='Version to deploy')
-    deploy_parser.add_argument('--environment', type=str, required=True,
-                        help='Environment to deploy to')
+    deploy_parser.add_argument('--environment', type=str,
+                        help='Environment to deploy to (default for entries in --from-file)')
     deploy_parser.add_argument('--skip-tests', action='store_true',
                         help='Skip running tests before deployment')
+    deploy_parser.add_argument('--from-file', type=str,
+                        help='JSON or CSV file of versions to deploy in one transaction '
+                             '(fields: model, version, environment)')
     
     # Get version history
     history_parser = version_subparsers.add_parser('history', help='Get version history')
@@ -89,31 +219,96 @@ def parse_arguments():
     history_parser.add_argument('--format', type=str, choices=['json', 'table'],
                          default='table', help='Output format')
     
+    # Get latest version
+    latest_parser = version_subparsers.add_parser('latest', help='Get the latest version of a model')
+    latest_parser.add_argument('--model', type=str, required=True,
+                        help='Model name')
+    latest_parser.add_argument('--environment', type=str,
+                        help='Only consider versions deployed to this environment')
+    
+    # Check breaking version
+    breaking_parser = version_subparsers.add_parser('check-breaking',
+                                                    help='Check if a version is a breaking change')
+    breaking_parser.add_argument('--model', type=str, required=True,
+                          help='Model name')
+    breaking_parser.add_argument('--version', type=str, required=True,
+                          help='Version to check')
+    
+    # Import JSON version files
+    version_subparsers.add_parser('import-json', help='Import versions from the JSON version files')
+    
     # Environment promotion
     promote_parser = subparsers.add_parser('promote', help='Promote to environment')
-    promote_parser.add_argument('--environment', type=str, required=True,
+    promote_target = promote_parser.add_mutually_exclusive_group(required=True)
+    promote_target.add_argument('--environment', type=str,
                          help='Target environment')
+    promote_target.add_argument('--environments', type=str, nargs='+',
+                         help='Target environments to promote to concurrently, each a dbt target')
     promote_parser.add_argument('--models', type=str, nargs='+', required=True,
                          help='Models to promote')
     promote_parser.add_argument('--skip-tests', action='store_true',
                          help='Skip running tests before promotion')
+    promote_parser.add_argument('--concurrency', type=int,
+                         help='Number of environments promoted at once (default: 4)')
+    promote_parser.add_argument('--retries', type=int,
+                         help='Retries for an environment whose dbt run errored or timed out (default: 1)')
+    promote_parser.add_argument('--timeout', type=float,
+                         help='Seconds before an environment\'s tests are stopped (default: 3600)')
+    promote_parser.add_argument('--format', type=str, choices=['text', 'json', 'markdown'],
+                         default='text', help='Report format for --environments')
+    promote_parser.add_argument('--project-dir', type=str, default='.',
+                         help='Path to the dbt project directory, for --environments')
+    
+    # Promotion state
+    promotion_parser = subparsers.add_parser('promotion', help='Promotion state')
+    promotion_subparsers = promotion_parser.add_subparsers(dest='promotion_command', help='Promotion command')
+    
+    status_parser = promotion_subparsers.add_parser('status', help='Show the promotion status of models')
+    status_parser.add_argument('--environment', type=str,
+                        help='Environment to check (default: all environments)')
+    status_parser.add_argument('--models', type=str, nargs='+',
+                        help='Models to check (default: all promoted models)')
+    status_parser.add_argument('--history', action='store_true',
+                        help='Include the promotion history of each model')
+    status_parser.add_argument('--format', type=str, choices=['json', 'table'],
+                        default='table', help='Output format')
+    status_parser.add_argument('--project-dir', type=str, default='.',
+                        help='Path to the dbt project directory')
+    
+    import_parser = promotion_subparsers.add_parser('import-json',
+                                                    help='Import promotions from the JSON state files')
+    import_parser.add_argument('--project-dir', type=str, default='.',
+                        help='Path to the dbt project directory')
     
-    return parser.parse_args()
+    compact_parser = promotion_subparsers.add_parser('compact', help='Drop old promotion history')
+    compact_parser.add_argument('--keep-last', type=int, required=True,
+                         help='Number of promotions to keep per model and environment')
+    compact_parser.add_argument('--project-dir', type=str, default='.',
+                         help='Path to the dbt project directory')
+    
+    # Daemon
+    serve_parser = subparsers.add_parser('serve', help='Run a daemon that keeps project state warm')
+    serve_parser.add_argument('--project-dir', type=str, default='.',
+                       help='Path to the dbt project directory')
+    serve_parser.add_argument('--host', type=str, default='127.0.0.1',
+                       help='Host to listen on')
+    serve_parser.add_argument('--port', type=int, default=0,
+                       help='Port to listen on (0 picks a free port)')
+    
+    return parser.parse_args(argv)
 
 
 def run_dbt_operation(operation, args_dict):
-    """Run a dbt operation with the given arguments."""
-    args_json = json.dumps(args_dict)
-    cmd = ['dbt', 'run-operation', operation, '--args', args_json]
-    
-    print(f"Running: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"Error running dbt operation: {result.stderr}")
-        sys.exit(result.returncode)
+    """Run a dbt operation with the given arguments and return its return value.
     
-    return result.stdout
+    dbt runs in-process when available, sharing one parsed project across
+    every operation in this CLI run.
+    """
+    try:
+        return get_runner('.').run_macro(operation, args_dict)
+    except DbtCommandError as e:
+        print(f"Error running dbt operation: {e}")
+        sys.exit(1)
 
 
 def handle_setup(args):
@@ -138,116 +333,452 @@ def handle_setup(args):
 
 def handle_impact_analysis(args):
     """Handle the impact analysis command."""
-    operation_args = {
-        'source_files': args.files,
-        'include_downstream': args.include_downstream,
-        'output_format': args.format
-    }
+    from dbt_cicd_toolkit.scripts.manifest_graph import (
+        default_manifest_path,
+        format_impact,
+        load_graph,
+        read_changed_files,
+    )
+    
+    if args.files_from:
+        args.files = list(dict.fromkeys(args.files + read_changed_files(args.files_from)))
+    if not args.files and not args.state and not args.changed_columns:
+        print("Error: Either --files, --files-from, --state or --changed-columns must be provided")
+        sys.exit(1)
+    
+    graph = load_graph(args.project_dir, args.manifest_path)
+    modified_ids = graph.find_nodes_by_files(args.files, include_sources=True)
+    
+    state_changes = None
+    state_manifest = None
+    if args.state:
+        from dbt_cicd_toolkit.scripts.state_diff import diff_manifests, resolve_state_manifest
+        state_manifest = resolve_state_manifest(args.state)
+        state_graph = load_graph(args.project_dir, state_manifest)
+        state_changes = diff_manifests(graph, state_graph)['nodes']
+    
+    if not args.columns and not args.changed_columns:
+        impacted_models = graph.get_impacted_models_by_ids(
+            modified_ids + list(state_changes or []),
+            include_downstream=args.include_downstream,
+            exclude_current=False
+        )
+        print(format_impact(args.files, impacted_models, args.format, state_changes))
+        return
+    
+    from dbt_cicd_toolkit.scripts.column_lineage import (
+        impacted_columns,
+        load_column_lineage,
+        seed_changed_columns,
+    )
+    lineage = load_column_lineage(graph, args.manifest_path or default_manifest_path(args.project_dir))
+    state_lineage = load_column_lineage(state_graph, state_manifest) if args.state else None
+    try:
+        changed = seed_changed_columns(graph, lineage, modified_ids, args.changed_columns,
+                                       state_changes, state_lineage)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     
-    result = run_dbt_operation('dbt_cicd_toolkit.get_impacted_models', operation_args)
-    print(result.strip())
+    columns_by_model = {}
+    for node_id, columns in impacted_columns(graph, lineage, changed, args.include_downstream).items():
+        node = graph.nodes.get(node_id)
+        if node and node['resource_type'] == 'model':
+            columns_by_model[node['name']] = sorted(columns)
+    print(format_impact(args.files, list(columns_by_model), args.format, state_changes, columns_by_model))
+
+
+def handle_graph(args):
+    """Handle the graph command."""
+    from dbt_cicd_toolkit.scripts import graph_renderer
+    from dbt_cicd_toolkit.scripts.manifest_graph import load_graph
+    
+    graph = load_graph(args.project_dir, args.manifest_path)
+    
+    if args.changed_files:
+        impacted = graph.get_impacted_models(args.changed_files, include_sources=True,
+                                             include_downstream=True, exclude_current=False)
+        model_ids = [graph.get_model_id(name) for name in impacted]
+        if args.select:
+            model_ids = [uid for uid in model_ids if graph.nodes[uid]['name'] in args.select]
+    else:
+        try:
+            model_ids = graph_renderer.select_models(graph, args.select, args.depth, args.direction)
+        except ValueError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+    
+    nodes, edges = graph_renderer.build_view(graph, model_ids, args.cluster_by)
+    if args.reduce:
+        edges = graph_renderer.transitive_reduction(nodes, edges)
+    
+    environments = None
+    if args.include_environments and not args.cluster_by:
+        from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+        with PromotionStore.for_project(args.project_dir) as store:
+            status = store.get_status()
+        environments = graph_renderer.promoted_environments(status, nodes, graph, model_ids)
+    
+    if args.output:
+        with open(args.output, 'w') as out:
+            graph_renderer.render_graph(out, nodes, edges, args.format, environments)
+        print(f"Wrote graph of {len(nodes)} nodes and {len(edges)} edges to {args.output}")
+    else:
+        graph_renderer.render_graph(sys.stdout, nodes, edges, args.format, environments)
+
+
+def handle_watch(args):
+    """Handle the watch command."""
+    from dbt_cicd_toolkit.scripts import watch
+    from dbt_cicd_toolkit.scripts.dbt_runner import DbtRunner
+    from dbt_cicd_toolkit.scripts.manifest_graph import load_graph
+    
+    graph = load_graph(args.project_dir, args.manifest_path)
+    session = watch.WatchSession(args.project_dir, graph, test_level=args.level)
+    for file_path in args.files:
+        session.record_change(file_path)
+    watcher = watch.make_watcher(args.project_dir, session.directories(), args.poll, args.interval)
+    runner = DbtRunner(args.project_dir, in_process=False) if args.run_tests else None
+    sys.exit(watch.watch(session, watcher, args.run_tests, runner))
 
 
 def handle_selective_testing(args):
     """Handle the selective testing command."""
-    operation_args = {
-        'changed_files': args.files,
-        'test_level': args.level,
-        'include_upstream': args.include_upstream,
-        'include_downstream': args.include_downstream
-    }
+    from dbt_cicd_toolkit.scripts.run_selective_tests import main as selective_main
+    sys.argv = ['run_selective_tests.py',
+                '--test-level', args.level,
+                '--dbt-project-dir', args.project_dir,
+                '--workers', str(args.workers),
+                '--balance-by', args.balance_by]
+    
+    if args.files:
+        sys.argv.extend(['--changed-files', ','.join(args.files)])
+    
+    if args.files_from:
+        sys.argv.extend(['--changed-files-file', args.files_from])
+    
+    if args.changed_columns:
+        sys.argv.extend(['--changed-columns', ','.join(args.changed_columns)])
+    
+    if args.include_upstream:
+        sys.argv.append('--include-upstream')
+    
+    if args.shard:
+        sys.argv.extend(['--shard', args.shard])
+    
+    if args.durations_from:
+        sys.argv.extend(['--durations-from'] + args.durations_from)
+    
+    if args.prioritize:
+        sys.argv.append('--prioritize')
+    
+    if args.fail_fast:
+        sys.argv.append('--fail-fast')
+    
+    if args.history_dir:
+        sys.argv.extend(['--history-dir', args.history_dir])
+    
+    if args.budget:
+        sys.argv.extend(['--budget', args.budget, '--budget-type', args.budget_type])
+    
+    if args.state:
+        sys.argv.extend(['--state', args.state])
+    
+    if args.build:
+        sys.argv.append('--build')
+    
+    if args.defer:
+        sys.argv.append('--defer')
+    
+    if args.clone_upstream:
+        sys.argv.append('--clone-upstream')
+    
+    if args.dry_run:
+        sys.argv.append('--dry-run')
+    
+    sys.exit(selective_main())
+
+
+def handle_merge_results(args):
+    """Handle the merge-results command."""
+    from dbt_cicd_toolkit.scripts.shard_runner import (
+        merge_run_results,
+        summarize_run_results,
+        write_run_results,
+    )
+    
+    run_results = merge_run_results(args.inputs)
+    write_run_results(run_results, args.output)
+    summary = summarize_run_results(run_results)
+    print(f"Merged {len(run_results['results'])} results into {args.output}: {summary}")
     
-    result = run_dbt_operation('dbt_cicd_toolkit.run_selective_tests', operation_args)
-    print(result.strip())
+    if summary.get('fail') or summary.get('error'):
+        sys.exit(1)
+
+
+def handle_export_catalog(args):
+    """Handle the export-catalog command."""
+    from dbt_cicd_toolkit.scripts.catalog_export import main as export_main
+    
+    export_args = ['--dbt-project-dir', args.project_dir]
+    if args.output_dir:
+        export_args.extend(['--output-dir', args.output_dir])
+    if args.run_results:
+        export_args.extend(['--run-results', args.run_results])
+    
+    sys.exit(export_main(export_args))
+
+
+def _read_version_entries(args, required_fields):
+    """Return version entries from --from-file or from the single-entry arguments."""
+    from dbt_cicd_toolkit.scripts.version_registry import read_entries_file
+    
+    if args.from_file:
+        entries = read_entries_file(args.from_file)
+    else:
+        if not args.model or not args.version:
+            print("Error: --model and --version are required unless --from-file is given")
+            sys.exit(1)
+        entries = [{'model': args.model, 'version': args.version}]
+    
+    for entry in entries:
+        missing = [field for field in required_fields if not entry.get(field)]
+        if missing:
+            print(f"Error: Version entry {entry} is missing {', '.join(missing)}")
+            sys.exit(1)
+    return entries
 
 
 def handle_version_register(args):
     """Handle the version register command."""
-    operation_args = {
-        'model_name': args.model,
-        'version': args.version,
-        'is_breaking': args.breaking
-    }
+    from dbt_cicd_toolkit.scripts.manifest_graph import default_manifest_path, load_graph
+    from dbt_cicd_toolkit.scripts.version_registry import VersionError, VersionRegistry
     
-    if args.description:
-        operation_args['description'] = args.description
+    entries = _read_version_entries(args, ('model', 'version'))
+    if not args.from_file:
+        entries[0].update({'description': args.description, 'is_breaking': args.breaking,
+                           'author': args.author})
     
-    if args.author:
-        operation_args['author'] = args.author
+    # Validate models against the manifest when one has been compiled
+    known_models = None
+    if default_manifest_path('.').exists():
+        known_models = load_graph('.').model_ids
     
-    result = run_dbt_operation('dbt_cicd_toolkit.register_version', operation_args)
-    print(result.strip())
+    try:
+        with VersionRegistry.for_project('.') as registry:
+            registered = registry.register(entries, known_models)
+    except VersionError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    
+    if args.from_file:
+        print(f"Registered {len(registered)} versions")
+    else:
+        print(json.dumps(registered[0], indent=2))
 
 
 def handle_version_deploy(args):
     """Handle the version deploy command."""
-    operation_args = {
-        'model_name': args.model,
-        'version': args.version,
-        'environment': args.environment,
-        'require_tests': not args.skip_tests
-    }
+    from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+    from dbt_cicd_toolkit.scripts.version_registry import VersionError, VersionRegistry
+    
+    entries = _read_version_entries(args, ('model', 'version'))
+    if not args.environment and not all(entry.get('environment') for entry in entries):
+        print("Error: --environment is required for entries without an environment")
+        sys.exit(1)
+    models = list(dict.fromkeys(entry['model'] for entry in entries))
+    
+    # Test every model in one dbt invocation
+    if not args.skip_tests:
+        result = get_runner('.').invoke('test', ['--select'] + models)
+        failed = result.failed_results()
+        if failed or not result.success:
+            print("Tests failed. Versions cannot be deployed.")
+            for test_result in failed:
+                print(f"  {test_result.get('unique_id')}: {test_result.get('status')}")
+            sys.exit(1)
+    
+    try:
+        with VersionRegistry.for_project('.') as registry:
+            deployed = registry.deploy(entries, args.environment)
+    except VersionError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
     
-    result = run_dbt_operation('dbt_cicd_toolkit.deploy_version', operation_args)
-    print(result.strip())
+    # Record one promotion per environment, as deploy_version does
+    environment_models = {}
+    for deployment in deployed:
+        environment_models.setdefault(deployment['environment'], []).append(deployment['model'])
+    with PromotionStore.for_project('.') as store:
+        store.record_promotions([
+            {
+                'target_environment': environment,
+                'models': list(dict.fromkeys(env_models)),
+                'timestamp': deployed[0]['timestamp'],
+                'success': True
+            }
+            for environment, env_models in environment_models.items()
+        ])
+    
+    if args.from_file:
+        print(f"Deployed {len(deployed)} versions")
+    else:
+        print(json.dumps(deployed[0], indent=2))
 
 
 def handle_version_history(args):
     """Handle the version history command."""
-    operation_args = {
-        'model_name': args.model
-    }
+    from dbt_cicd_toolkit.scripts.version_registry import VersionRegistry
     
-    if args.environment:
-        operation_args['environment'] = args.environment
+    with VersionRegistry.for_project('.') as registry:
+        registry.sync_models([args.model])
+        history = registry.history(args.model, args.environment)
     
-    result = run_dbt_operation('dbt_cicd_toolkit.get_version_history', operation_args)
-    
-    try:
-        history = json.loads(result.strip())
+    if args.format == 'table':
+        print(f"Version history for model: {args.model}")
+        print("-" * 80)
+        print(f"{'Version':<10} | {'Timestamp':<20} | {'Status':<10} | {'Breaking':<8} | Description")
+        print("-" * 80)
         
-        if args.format == 'table':
-            print(f"Version history for model: {args.model}")
-            print("-" * 80)
-            print(f"{'Version':<10} | {'Timestamp':<20} | {'Status':<10} | {'Breaking':<8} | Description")
-            print("-" * 80)
-            
-            for version_entry in history.get('versions', []):
-                print(f"{version_entry.get('version', ''):<10} | "
-                      f"{version_entry.get('timestamp', ''):<20} | "
-                      f"{version_entry.get('status', ''):<10} | "
-                      f"{str(version_entry.get('is_breaking', False)):<8} | "
-                      f"{version_entry.get('description', '')}")
-        else:
-            print(json.dumps(history, indent=2))
+        for version_entry in history.get('versions', []):
+            print(f"{version_entry.get('version', ''):<10} | "
+                  f"{version_entry.get('timestamp', ''):<20} | "
+                  f"{version_entry.get('status', ''):<10} | "
+                  f"{str(version_entry.get('is_breaking', False)):<8} | "
+                  f"{version_entry.get('description', '')}")
+    else:
+        print(json.dumps(history, indent=2))
+
+
+def handle_version_latest(args):
+    """Handle the version latest command."""
+    from dbt_cicd_toolkit.scripts.version_registry import VersionRegistry
+    
+    with VersionRegistry.for_project('.') as registry:
+        registry.sync_models([args.model])
+        print(registry.get_latest(args.model, args.environment))
+
+
+def handle_version_check_breaking(args):
+    """Handle the version check-breaking command."""
+    from dbt_cicd_toolkit.scripts.version_registry import VersionRegistry
     
-    except json.JSONDecodeError:
-        print("Error parsing version history. Raw output:")
-        print(result.strip())
+    with VersionRegistry.for_project('.') as registry:
+        registry.sync_models([args.model])
+        print('true' if registry.is_breaking(args.model, args.version) else 'false')
+
+
+def handle_version_import(args):
+    """Handle the version import-json command."""
+    from dbt_cicd_toolkit.scripts.version_registry import VersionRegistry
+    
+    with VersionRegistry.for_project('.') as registry:
+        imported = registry.import_json_files()
+    print(f"Imported version files for {imported} models")
 
 
 def handle_promote(args):
     """Handle the promote command."""
+    from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+    
+    if args.environments:
+        from dbt_cicd_toolkit.scripts.promote_models import main as promote_main
+        sys.argv = ['promote_models.py',
+                    '--target-environments', ','.join(args.environments),
+                    '--models', ','.join(args.models),
+                    '--dbt-project-dir', args.project_dir,
+                    '--output-format', args.format]
+        if args.skip_tests:
+            sys.argv.append('--skip-tests')
+        if args.concurrency is not None:
+            sys.argv.extend(['--concurrency', str(args.concurrency)])
+        if args.retries is not None:
+            sys.argv.extend(['--retries', str(args.retries)])
+        if args.timeout is not None:
+            sys.argv.extend(['--timeout', str(args.timeout)])
+        sys.exit(promote_main())
+    
     operation_args = {
         'target_environment': args.environment,
         'models': args.models,
-        'require_tests': not args.skip_tests
+        'require_tests': not args.skip_tests,
+        'update_state': False
     }
     
     result = run_dbt_operation('dbt_cicd_toolkit.promote_to_environment', operation_args)
-    print(result.strip())
+    if result and result.get('success'):
+        with PromotionStore.for_project('.') as store:
+            store.record_promotion(result)
+    print(json.dumps(result, indent=2))
 
 
-def main():
-    """Main entry point for the CLI."""
-    args = parse_arguments()
+def handle_promotion_status(args):
+    """Handle the promotion status command."""
+    from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+    
+    with PromotionStore.for_project(args.project_dir) as store:
+        status = store.get_status(args.environment, args.models, args.history)
+    
+    if args.format == 'table':
+        print(f"{'Environment':<15} | {'Model':<40} | {'Last Promotion':<20} | Success")
+        print("-" * 90)
+        for environment, models in status.items():
+            for model, model_status in sorted(models.items()):
+                print(f"{environment:<15} | {model:<40} | "
+                      f"{model_status.get('last_promotion') or '':<20} | "
+                      f"{model_status.get('last_success', '')}")
+                for entry in model_status['promotion_history']:
+                    print(f"{'':<15} | {'':<40} | {entry['timestamp']:<20} | {entry['success']}")
+    else:
+        print(json.dumps(status, indent=2))
+
+
+def handle_promotion_import(args):
+    """Handle the promotion import-json command."""
+    from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+    
+    with PromotionStore.for_project(args.project_dir) as store:
+        imported = store.import_json_states()
+    print(f"Imported {imported} promotions")
+
+
+def handle_promotion_compact(args):
+    """Handle the promotion compact command."""
+    from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+    
+    if args.keep_last < 1:
+        print("Error: --keep-last must be at least 1")
+        sys.exit(1)
+    
+    with PromotionStore.for_project(args.project_dir) as store:
+        removed = store.compact(args.keep_last)
+    print(f"Removed {removed} promotion history entries")
+
+
+def handle_serve(args):
+    """Handle the serve command."""
+    from dbt_cicd_toolkit.scripts.daemon import serve
+    serve(args.project_dir, args.host, args.port)
+
+
+def run_command(argv):
+    """Parse argv and run the command in this process."""
+    args = parse_arguments(argv)
     
     if args.command == 'setup':
         handle_setup(args)
     elif args.command == 'impact-analysis':
         handle_impact_analysis(args)
+    elif args.command == 'graph':
+        handle_graph(args)
+    elif args.command == 'watch':
+        handle_watch(args)
     elif args.command == 'selective-testing':
         handle_selective_testing(args)
+    elif args.command == 'merge-results':
+        handle_merge_results(args)
+    elif args.command == 'export-catalog':
+        handle_export_catalog(args)
     elif args.command == 'version':
         if args.version_command == 'register':
             handle_version_register(args)
@@ -255,15 +786,55 @@ def main():
             handle_version_deploy(args)
         elif args.version_command == 'history':
             handle_version_history(args)
+        elif args.version_command == 'latest':
+            handle_version_latest(args)
+        elif args.version_command == 'check-breaking':
+            handle_version_check_breaking(args)
+        elif args.version_command == 'import-json':
+            handle_version_import(args)
         else:
             print("Error: Please specify a version subcommand")
             sys.exit(1)
     elif args.command == 'promote':
         handle_promote(args)
+    elif args.command == 'promotion':
+        if args.promotion_command == 'status':
+            handle_promotion_status(args)
+        elif args.promotion_command == 'import-json':
+            handle_promotion_import(args)
+        elif args.promotion_command == 'compact':
+            handle_promotion_compact(args)
+        else:
+            print("Error: Please specify a promotion subcommand")
+            sys.exit(1)
+    elif args.command == 'serve':
+        handle_serve(args)
     else:
         print("Error: Please specify a command")
         sys.exit(1)
 
 
+def main():
+    """Main entry point for the CLI.
+    
+    Commands are forwarded to a running `dbt-cicd serve` daemon when one
+    is available, and run directly otherwise.
+    """
+    argv = sys.argv[1:]
+    args = parse_arguments(argv)
+    
+    if forwards_to_daemon(args) and not os.environ.get('DBT_CICD_NO_DAEMON'):
+        from dbt_cicd_toolkit.scripts.daemon import forward_to_daemon
+        # The daemon cannot read this process's stdin, so --files-from - is sent along
+        stdin = sys.stdin.read() if getattr(args, 'files_from', None) == '-' else None
+        exit_code = forward_to_daemon(argv, getattr(args, 'project_dir', '.'), stdin)
+        if exit_code is not None:
+            sys.exit(exit_code)
+        if stdin is not None:
+            sys.stdin = io.StringIO(stdin)
+    
+    run_command(argv)
+
+
 if __name__ == "__main__":
     main() 
\ No newline at end of file
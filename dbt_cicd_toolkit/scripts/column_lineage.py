@@ -0,0 +1,747 @@
+#!/usr/bin/env python3
+"""
+Column-level lineage for dbt-ci-cd-toolkit.
+
+Works out which upstream columns each output column of a model is
+derived from, using a heuristic parser over the compiled SQL in the
+manifest (or the raw SQL, with ref and source calls resolved, when the
+project has only been parsed). Parsed SQL is cached under target/ keyed
+by a hash of each node's SQL, so only changed models are re-parsed.
+
+The parser follows CTEs, subqueries, joins, set operations and select *,
+which covers most dbt models. Columns used in joins, filters and
+groupings count as inputs of every output column. A model whose SQL
+cannot be followed is opaque: all of its columns depend on all upstream
+columns, so lineage errs towards running more tests, never fewer.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.graph_index import INDEX_DIR_NAME, manifest_stat, read_index, write_index
+from dbt_cicd_toolkit.scripts.manifest_reader import iter_manifest_members
+
+LINEAGE_VERSION = 1
+LINEAGE_FILE_NAME = 'column_lineage.pickle'
+LINEAGE_RESOURCE_TYPES = ('model', 'snapshot')
+
+# Reasons from a state comparison whose effect is fully visible in the SQL
+SQL_CHANGE_REASONS = ('body', 'macro list', 'dependencies')
+
+ALL_COLUMNS = '*'
+# Dependency on the rows of a relation rather than on one of its columns
+ROWS = '#rows'
+
+# dbt inlines ephemeral models as CTEs with this prefix
+EPHEMERAL_PREFIX = '__dbt__cte__'
+
+SQL_KEYWORDS = {
+    'select', 'from', 'where', 'and', 'or', 'not', 'null', 'is', 'in', 'like', 'ilike', 'between',
+    'case', 'when', 'then', 'else', 'end', 'as', 'on', 'distinct', 'all', 'any', 'some', 'exists',
+    'true', 'false', 'over', 'partition', 'by', 'order', 'asc', 'desc', 'nulls', 'first', 'last',
+    'rows', 'range', 'unbounded', 'preceding', 'following', 'current', 'row', 'within', 'group',
+    'filter', 'interval', 'escape', 'respect', 'ignore', 'qualify', 'having', 'limit'
+}
+JOIN_KEYWORDS = {'join', 'inner', 'left', 'right', 'full', 'outer', 'cross', 'natural', 'lateral',
+                 'semi', 'anti', 'asof', 'straight_join'}
+FROM_RESERVED = JOIN_KEYWORDS | {'on', 'using', 'where', 'group', 'having', 'qualify', 'order', 'limit',
+                                 'window', 'union', 'except', 'intersect', 'minus', 'tablesample',
+                                 'pivot', 'unpivot', 'at', 'before', 'changes', 'for', 'with'}
+SET_OPERATORS = {'union', 'intersect', 'except', 'minus'}
+ROW_CLAUSES = {'where', 'group', 'having', 'qualify'}
+END_CLAUSES = {'order', 'limit', 'offset', 'fetch', 'window'}
+
+_TOKEN = re.compile(r"""
+    (?P<space>\s+)
+  | (?P<comment>--[^\n]*|/\*.*?\*/)
+  | (?P<string>'(?:[^'\\]|\\.|'')*')
+  | (?P<quoted>"(?:[^"]|"")*"|`[^`]*`)
+  | (?P<number>\d+(?:\.\d*)?(?:[eE][+-]?\d+)?)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_$]*)
+  | (?P<op>::|<=|>=|<>|!=|\|\||=>|.)
+""", re.S | re.X)
+
+_JINJA_RELATION = re.compile(r'\{\{\s*(?:ref|source)\s*\(([^)]*)\)\s*\}\}')
+_JINJA_EXPRESSION = re.compile(r'\{\{.*?\}\}', re.S)
+_JINJA_STATEMENT = re.compile(r'\{%.*?%\}|\{#.*?#\}', re.S)
+
+
+class LineageError(Exception):
+    """Raised when SQL cannot be parsed into column lineage."""
+
+
+def render_raw_sql(raw_sql):
+    """Strip Jinja from uncompiled SQL, replacing ref() and source() with relation names."""
+    def relation_name(match):
+        positional = [arg.strip().strip('\'"') for arg in match.group(1).split(',')
+                      if arg.strip() and '=' not in arg]
+        return positional[-1] if positional else '__jinja__'
+
+    sql = _JINJA_RELATION.sub(relation_name, raw_sql)
+    sql = _JINJA_EXPRESSION.sub('__jinja__', sql)
+    return _JINJA_STATEMENT.sub(' ', sql)
+
+
+def tokenize(sql):
+    """Return (kind, text) tokens with unquoted identifiers lower-cased."""
+    tokens = []
+    for match in _TOKEN.finditer(sql):
+        kind, text = match.lastgroup, match.group()
+        if kind in ('space', 'comment'):
+            continue
+        if kind == 'word':
+            tokens.append(('word', text.lower()))
+        elif kind == 'quoted':
+            tokens.append(('name', text[1:-1].lower()))
+        else:
+            tokens.append((kind, text))
+    return tokens
+
+
+def _is_ident(token):
+    return token[0] in ('word', 'name')
+
+
+def _is_word(tokens, i, *words):
+    return i < len(tokens) and tokens[i][0] == 'word' and tokens[i][1] in words
+
+
+def _matching_paren(tokens, start):
+    depth = 0
+    for i in range(start, len(tokens)):
+        if tokens[i] == ('op', '('):
+            depth += 1
+        elif tokens[i] == ('op', ')'):
+            depth -= 1
+            if depth == 0:
+                return i
+    raise LineageError("Unbalanced parentheses")
+
+
+def _top_level(tokens):
+    """Yield (index, token) for tokens outside any parentheses."""
+    i = 0
+    while i < len(tokens):
+        if tokens[i] == ('op', '('):
+            i = _matching_paren(tokens, i) + 1
+            continue
+        yield i, tokens[i]
+        i += 1
+
+
+def _split_commas(tokens):
+    parts, start = [], 0
+    for i, token in _top_level(tokens):
+        if token == ('op', ','):
+            parts.append(tokens[start:i])
+            start = i + 1
+    parts.append(tokens[start:])
+    return [part for part in parts if part]
+
+
+def _read_chain(tokens, i):
+    """Read a dotted identifier chain starting at i; return (parts, next index)."""
+    parts = [tokens[i][1]]
+    i += 1
+    while i + 1 < len(tokens) and tokens[i] == ('op', '.') and _is_ident(tokens[i + 1]):
+        parts.append(tokens[i + 1][1])
+        i += 2
+    return parts, i
+
+
+def _starts_query(tokens):
+    return _is_word(tokens, 0, 'select', 'with') or (
+        tokens and tokens[0] == ('op', '(') and _starts_query(tokens[1:]))
+
+
+def _expression_refs(tokens):
+    """Return the column references and subqueries used by an expression."""
+    refs = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == ('op', '('):
+            end = _matching_paren(tokens, i)
+            inner = tokens[i + 1:end]
+            if _starts_query(inner):
+                refs.append(('query', parse_query(inner)))
+                i = end + 1
+            else:
+                i += 1
+            continue
+        if not _is_ident(token):
+            i += 1
+            continue
+        parts, after = _read_chain(tokens, i)
+        previous = tokens[i - 1] if i else None
+        skip = (
+            (after < len(tokens) and tokens[after] == ('op', '('))
+            or previous in (('op', '::'), ('word', 'as'))
+            or (token[0] == 'word' and len(parts) == 1 and token[1] in SQL_KEYWORDS)
+        )
+        if not skip:
+            refs.append(('col', parts[-2] if len(parts) > 1 else None, parts[-1]))
+        i = after
+    return refs
+
+
+def _parse_select_item(tokens, position):
+    """Return ('star', qualifier, excluded) or ('column', name, refs, text)."""
+    star_end = None
+    if tokens[0] == ('op', '*'):
+        qualifier, star_end = None, 1
+    elif _is_ident(tokens[0]):
+        parts, after = _read_chain(tokens, 0)
+        if after + 1 < len(tokens) and tokens[after] == ('op', '.') and tokens[after + 1] == ('op', '*'):
+            qualifier, star_end = parts[-1], after + 2
+    if star_end is not None:
+        excluded = set()
+        if _is_word(tokens, star_end, 'except', 'exclude') and star_end + 1 < len(tokens):
+            if tokens[star_end + 1] == ('op', '('):
+                end = _matching_paren(tokens, star_end + 1)
+                excluded = {t[1] for t in tokens[star_end + 2:end] if _is_ident(t)}
+            elif _is_ident(tokens[star_end + 1]):
+                excluded = {tokens[star_end + 1][1]}
+        return ('star', qualifier, excluded)
+
+    expression = tokens
+    name = None
+    if len(tokens) >= 3 and tokens[-2] == ('word', 'as') and _is_ident(tokens[-1]):
+        name, expression = tokens[-1][1], tokens[:-2]
+    elif (len(tokens) >= 2 and _is_ident(tokens[-1])
+          and not (tokens[-1][0] == 'word' and tokens[-1][1] in SQL_KEYWORDS)
+          and (_is_ident(tokens[-2]) or tokens[-2][0] in ('number', 'string') or tokens[-2] == ('op', ')'))
+          and not (tokens[-2][0] == 'word' and tokens[-2][1] in SQL_KEYWORDS)):
+        name, expression = tokens[-1][1], tokens[:-1]
+    else:
+        # A bare column keeps its name, also through a cast such as amount::numeric
+        column = tokens[:-2] if len(tokens) > 2 and tokens[-2] == ('op', '::') else tokens
+        if _is_ident(column[0]) and _read_chain(column, 0)[1] == len(column):
+            name = column[-1][1]
+    if name is None:
+        name = f'_col{position}'
+    text = ' '.join(t[1] for t in expression)
+    return ('column', name, _expression_refs(expression), text)
+
+
+def _read_alias(tokens, i):
+    if _is_word(tokens, i, 'as'):
+        i += 1
+    if i < len(tokens) and _is_ident(tokens[i]) and not _is_word(tokens, i, *FROM_RESERVED):
+        return tokens[i][1], i + 1
+    return None, i
+
+
+def _parse_from(tokens):
+    """Return ({alias: relation}, row-level refs) for a FROM clause."""
+    relations = {}
+    refs = []
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token == ('op', ',') or _is_word(tokens, i, *JOIN_KEYWORDS):
+            i += 1
+            continue
+        if _is_word(tokens, i, 'on'):
+            end = i + 1
+            while end < len(tokens) and tokens[end] != ('op', ',') and not _is_word(tokens, end, *JOIN_KEYWORDS):
+                end = _matching_paren(tokens, end) + 1 if tokens[end] == ('op', '(') else end + 1
+            refs.extend(_expression_refs(tokens[i + 1:end]))
+            i = end
+            continue
+        if _is_word(tokens, i, 'using') and i + 1 < len(tokens) and tokens[i + 1] == ('op', '('):
+            end = _matching_paren(tokens, i + 1)
+            refs.extend(('col', None, t[1]) for t in tokens[i + 2:end] if _is_ident(t))
+            i = end + 1
+            continue
+
+        default_alias = None
+        if token == ('op', '('):
+            end = _matching_paren(tokens, i)
+            inner = tokens[i + 1:end]
+            i = end + 1
+            if not _starts_query(inner):
+                # Parenthesized join
+                inner_relations, inner_refs = _parse_from(inner)
+                relations.update(inner_relations)
+                refs.extend(inner_refs)
+                continue
+            relation = ('query', parse_query(inner))
+        elif _is_ident(token):
+            parts, i = _read_chain(tokens, i)
+            default_alias = parts[-1]
+            if i < len(tokens) and tokens[i] == ('op', '('):
+                # Table function such as unnest() or flatten()
+                end = _matching_paren(tokens, i)
+                relation = ('function', _expression_refs(tokens[i + 1:end]))
+                i = end + 1
+            else:
+                relation = ('table', parts[-1])
+        else:
+            i += 1
+            continue
+
+        alias, i = _read_alias(tokens, i)
+        if i < len(tokens) and tokens[i] == ('op', '('):
+            # Column aliases, e.g. AS t(a, b)
+            i = _matching_paren(tokens, i) + 1
+        relations[alias or default_alias or f'_subquery{len(relations)}'] = relation
+    return relations, refs
+
+
+def _parse_select(tokens):
+    """Parse a single SELECT statement without set operators."""
+    clauses = {}
+    order = []
+    for i, token in _top_level(tokens):
+        if i == 0 or token[0] != 'word':
+            continue
+        word = token[1]
+        if word in ('group', 'order') and not _is_word(tokens, i + 1, 'by'):
+            continue
+        if word == 'from' or word in ROW_CLAUSES or word in END_CLAUSES:
+            order.append((i, word))
+
+    bounds = [i for i, _ in order] + [len(tokens)]
+    for (start, word), end in zip(order, bounds[1:]):
+        clauses.setdefault(word, []).extend(tokens[start + 1:end])
+
+    select_end = bounds[0]
+    items = tokens[1:select_end]
+    if _is_word(items, 0, 'distinct', 'all'):
+        items = items[1:]
+        if _is_word(items, 0, 'on') and len(items) > 1 and items[1] == ('op', '('):
+            items = items[_matching_paren(items, 1) + 1:]
+    if _is_word(items, 0, 'top') and len(items) > 1:
+        items = items[2:]
+
+    relations, refs = _parse_from(clauses.get('from', []))
+    row_tokens = []
+    for word in ROW_CLAUSES:
+        row_tokens.extend(clauses.get(word, []))
+    refs.extend(_expression_refs(row_tokens))
+
+    row_text = ' '.join(t[1] for t in clauses.get('from', []) + row_tokens)
+    return {
+        'items': [_parse_select_item(item, position) for position, item in enumerate(_split_commas(items))],
+        'relations': relations,
+        'row_refs': refs,
+        'row_text': row_text
+    }
+
+
+def _parse_branch(tokens):
+    if tokens and tokens[0] == ('op', '(') and _matching_paren(tokens, 0) == len(tokens) - 1:
+        return parse_query(tokens[1:-1])
+    if not _is_word(tokens, 0, 'select'):
+        raise LineageError(f"Expected SELECT, found '{tokens[0][1] if tokens else 'end of query'}'")
+    return _parse_select(tokens)
+
+
+def parse_query(tokens):
+    """Parse a query into {'ctes': {name: query}, 'branches': [select or query, ...]}.
+
+    Branches are the operands of UNION, INTERSECT and EXCEPT.
+    """
+    ctes = {}
+    i = 0
+    if _is_word(tokens, 0, 'with'):
+        i = 2 if _is_word(tokens, 1, 'recursive') else 1
+        while True:
+            if i >= len(tokens) or not _is_ident(tokens[i]):
+                raise LineageError("Expected a CTE name")
+            name = tokens[i][1]
+            i += 1
+            if i < len(tokens) and tokens[i] == ('op', '('):
+                i = _matching_paren(tokens, i) + 1
+            while i < len(tokens) and tokens[i] != ('op', '('):
+                i += 1
+            end = _matching_paren(tokens, i)
+            ctes[name] = parse_query(tokens[i + 1:end])
+            i = end + 1
+            if i < len(tokens) and tokens[i] == ('op', ','):
+                i += 1
+                continue
+            break
+
+    body = tokens[i:]
+    branches, start = [], 0
+    for j, token in _top_level(body):
+        if token[0] == 'word' and token[1] in SET_OPERATORS and not (j and body[j - 1] == ('op', '*')):
+            branches.append(body[start:j])
+            start = j + 1
+            if _is_word(body, start, 'all', 'distinct'):
+                start += 1
+    branches.append(body[start:])
+    return {'ctes': ctes, 'branches': [_parse_branch(branch) for branch in branches]}
+
+
+def parse_sql(sql):
+    """Parse the SQL of a model, ignoring trailing semicolons."""
+    tokens = tokenize(sql)
+    while tokens and tokens[-1] == ('op', ';'):
+        tokens.pop()
+    if not tokens:
+        raise LineageError("Empty SQL")
+    return parse_query(tokens)
+
+
+def _fingerprint(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def _empty_relation():
+    return {'columns': {}, 'passthrough': set(), 'row_deps': set(), 'row_fp': ''}
+
+
+def _node_relation(node_id, lineage):
+    """Return the relation an upstream node exposes to its children."""
+    node_lineage = lineage.get(node_id)
+    if node_lineage is None:
+        # Sources, seeds and nodes without SQL: columns pass through by name
+        return {'columns': {}, 'passthrough': {node_id}, 'row_deps': {(node_id, ROWS)}, 'row_fp': node_id}
+    relation = _empty_relation()
+    relation['row_deps'] = {(node_id, ROWS)}
+    relation['row_fp'] = node_id
+    relation['columns'] = {name: ({(node_id, name)}, f'{node_id}.{name}') for name in node_lineage['columns']}
+    if node_lineage['passthrough'] or node_lineage['opaque']:
+        relation['passthrough'] = {node_id}
+    return relation
+
+
+class _Resolver:
+    """Resolve parsed queries of one model against its upstream lineage."""
+
+    def __init__(self, upstream, lineage):
+        self.upstream = upstream
+        self.lineage = lineage
+        # Relations of enclosing queries, for correlated subqueries
+        self.outer = []
+
+    def query(self, query, scope):
+        scope = dict(scope)
+        for name, cte in query['ctes'].items():
+            scope[name] = self.query(cte, scope)
+        branches = [self.query(branch, scope) if 'branches' in branch else self.select(branch, scope)
+                    for branch in query['branches']]
+        return branches[0] if len(branches) == 1 else self.combine(branches)
+
+    def combine(self, branches):
+        """Merge set-operator branches, by position when every column is explicit."""
+        result = _empty_relation()
+        for branch in branches:
+            result['passthrough'] |= branch['passthrough']
+            result['row_deps'] |= branch['row_deps']
+        result['row_fp'] = _fingerprint(*(branch['row_fp'] for branch in branches))
+        widths = {len(branch['columns']) for branch in branches}
+        positional = not result['passthrough'] and len(widths) == 1
+        for index, name in enumerate(branches[0]['columns']):
+            deps, fps = set(), []
+            for branch in branches:
+                columns = list(branch['columns'].values())
+                if positional:
+                    column = columns[index]
+                else:
+                    column = branch['columns'].get(name) or self.passthrough_column(branch, name)
+                if column:
+                    deps |= column[0]
+                    fps.append(column[1])
+            result['columns'][name] = (deps, _fingerprint(*fps))
+        return result
+
+    def relation(self, relation, scope):
+        kind, value = relation
+        if kind == 'query':
+            return self.query(value, scope)
+        if kind == 'function':
+            resolved = _empty_relation()
+            resolved['row_deps'], fps = self.refs(value, {}, scope)
+            resolved['row_fp'] = _fingerprint(*fps)
+            resolved['function'] = True
+            return resolved
+        node_id = self.upstream.get(value)
+        if value in scope and not value.startswith(EPHEMERAL_PREFIX):
+            return scope[value]
+        if node_id is None:
+            # A table that is not a dbt node; changes cannot come from it
+            return _empty_relation()
+        return _node_relation(node_id, self.lineage)
+
+    @staticmethod
+    def passthrough_column(relation, name):
+        if not relation['passthrough']:
+            return None
+        deps = {(node_id, name) for node_id in relation['passthrough']} | relation['row_deps']
+        return deps, _fingerprint(relation['row_fp'], name)
+
+    def column(self, relation, name):
+        """Return (deps, fingerprint) of a column of a relation, or None if it has no such column."""
+        if relation.get('function'):
+            return relation['row_deps'], relation['row_fp']
+        if name in relation['columns']:
+            return relation['columns'][name]
+        return self.passthrough_column(relation, name)
+
+    def refs(self, refs, relations, scope):
+        """Resolve references to (deps, fingerprints)."""
+        deps, fps = set(), []
+        for ref in refs:
+            if ref[0] == 'query':
+                self.outer.append(relations)
+                try:
+                    sub = self.query(ref[1], scope)
+                finally:
+                    self.outer.pop()
+                deps |= sub['row_deps'] | {(node_id, ALL_COLUMNS) for node_id in sub['passthrough']}
+                for column_deps, fp in sub['columns'].values():
+                    deps |= column_deps
+                    fps.append(fp)
+                fps.append(sub['row_fp'])
+                continue
+            _, qualifier, name = ref
+            candidates = []
+            if qualifier is not None:
+                for visible in [relations] + self.outer[::-1]:
+                    if qualifier in visible:
+                        candidates = [visible[qualifier]]
+                        break
+                if not candidates:
+                    # Struct field access such as address.city
+                    name = qualifier
+            if not candidates:
+                candidates = [relation for relation in relations.values() if name in relation['columns']]
+            if not candidates:
+                candidates = [relation for relation in relations.values()
+                              if relation['passthrough'] or relation.get('function')]
+            for relation in candidates:
+                column = self.column(relation, name)
+                if column:
+                    deps |= column[0]
+                    fps.append(column[1])
+        return deps, fps
+
+    def select(self, select, scope):
+        relations = {alias: self.relation(relation, scope) for alias, relation in select['relations'].items()}
+        row_deps, row_fps = self.refs(select['row_refs'], relations, scope)
+        for relation in relations.values():
+            row_deps |= relation['row_deps']
+            row_fps.append(relation['row_fp'])
+
+        result = _empty_relation()
+        result['row_deps'] = row_deps
+        result['row_fp'] = _fingerprint(select['row_text'], *row_fps)
+        for item in select['items']:
+            if item[0] == 'star':
+                _, qualifier, excluded = item
+                sources = [relations[qualifier]] if qualifier in relations else list(relations.values())
+                for relation in sources:
+                    for name, (deps, fp) in relation['columns'].items():
+                        if name not in excluded:
+                            result['columns'][name] = (deps | row_deps, _fingerprint(fp, result['row_fp']))
+                    result['passthrough'] |= relation['passthrough']
+            else:
+                _, name, refs, text = item
+                deps, fps = self.refs(refs, relations, scope)
+                result['columns'][name] = (deps | row_deps, _fingerprint(text, result['row_fp'], *fps))
+        return result
+
+
+def opaque_lineage(parents):
+    """Lineage of a model whose SQL could not be followed."""
+    return {
+        'columns': {},
+        'passthrough': set(parents),
+        'row_deps': {(parent, ALL_COLUMNS) for parent in parents},
+        'row_fp': _fingerprint('opaque', *sorted(parents)),
+        'opaque': True
+    }
+
+
+def resolve_lineage(parsed, parents, relation_names, lineage):
+    """Return the lineage of one model from its parsed SQL.
+
+    relation_names maps each parent to the names it can be referenced by
+    in SQL; lineage holds the already resolved lineage of the parents.
+    """
+    if parsed is None:
+        return opaque_lineage(parents)
+    upstream = {}
+    for parent in parents:
+        for name in relation_names.get(parent, ()):
+            upstream.setdefault(name, parent)
+    try:
+        resolved = _Resolver(upstream, lineage).query(parsed, {})
+    except (LineageError, KeyError, IndexError, RecursionError):
+        return opaque_lineage(parents)
+    resolved.pop('function', None)
+    resolved['opaque'] = False
+    return resolved
+
+
+def default_lineage_path(manifest_path):
+    """Return the column lineage cache location for a manifest."""
+    return Path(manifest_path).parent / INDEX_DIR_NAME / LINEAGE_FILE_NAME
+
+
+def parse_manifest_sql(manifest_path, previous=None):
+    """Stream the manifest and parse the SQL of every model and snapshot.
+
+    Returns (parsed, relation_names). parsed maps unique_ids to
+    (sql hash, parsed query or None); entries of `previous` whose hash
+    still matches are reused without parsing.
+    """
+    previous = previous or {}
+    parsed = {}
+    relation_names = {}
+    for section, unique_id, node in iter_manifest_members(manifest_path, ('nodes', 'sources')):
+        names = {name.lower() for name in (node.get('name'), node.get('alias'), node.get('identifier')) if name}
+        if node.get('name'):
+            names.add(f"{EPHEMERAL_PREFIX}{node['name'].lower()}")
+        relation_names[unique_id] = names
+        if section != 'nodes' or node.get('resource_type') not in LINEAGE_RESOURCE_TYPES:
+            continue
+        sql = node.get('compiled_code') or node.get('compiled_sql')
+        if not sql:
+            sql = render_raw_sql(node.get('raw_code') or node.get('raw_sql') or '')
+        sql_hash = hashlib.sha256(sql.encode('utf-8')).hexdigest()
+        cached = previous.get(unique_id)
+        if cached and cached[0] == sql_hash:
+            parsed[unique_id] = cached
+            continue
+        try:
+            parsed[unique_id] = (sql_hash, parse_sql(sql))
+        except (LineageError, IndexError, RecursionError):
+            parsed[unique_id] = (sql_hash, None)
+    return parsed, relation_names
+
+
+def build_lineage(graph, parsed, relation_names):
+    """Resolve the lineage of every parsed node in topological order."""
+    lineage = {}
+    for wave in graph.topological_waves(list(parsed)):
+        for node_id in wave:
+            lineage[node_id] = resolve_lineage(parsed[node_id][1], graph.parents.get(node_id, []),
+                                               relation_names, lineage)
+    return lineage
+
+
+_loaded_lineage = {}
+
+
+def load_column_lineage(graph, manifest_path, cache_path=None):
+    """Return {unique_id: lineage} for a manifest, using the on-disk cache.
+
+    The cache is reused as is while the manifest is unchanged. Otherwise
+    the manifest is re-read, but only nodes whose SQL changed are re-parsed.
+    """
+    manifest_path = Path(manifest_path)
+    cache_path = cache_path or default_lineage_path(manifest_path)
+    stat = manifest_stat(manifest_path)
+    key = str(manifest_path.resolve())
+    loaded = _loaded_lineage.get(key)
+    if loaded and loaded[0] == stat:
+        return loaded[1]
+
+    cache = read_index(cache_path, LINEAGE_VERSION)
+    if cache is not None and cache['manifest_stat'] == stat:
+        lineage = cache['lineage']
+    else:
+        parsed, relation_names = parse_manifest_sql(manifest_path, cache['parsed'] if cache else None)
+        lineage = build_lineage(graph, parsed, relation_names)
+        try:
+            write_index(cache_path, {'version': LINEAGE_VERSION, 'manifest_stat': stat,
+                                     'parsed': parsed, 'lineage': lineage})
+        except OSError as e:
+            print(f"Warning: Could not write column lineage cache to {cache_path}: {e}")
+
+    _loaded_lineage[key] = (stat, lineage)
+    return lineage
+
+
+def _column_hit(dep, changed):
+    parent, column = dep
+    columns = changed.get(parent)
+    if not columns:
+        return False
+    if column == ROWS:
+        # Only a change to every column may change which rows a relation has
+        return ALL_COLUMNS in columns
+    return ALL_COLUMNS in columns or column == ALL_COLUMNS or column in columns
+
+
+def impacted_columns(graph, lineage, changed, include_downstream=True):
+    """Propagate changed columns to the columns derived from them.
+
+    changed maps unique_ids to sets of column names, where '*' stands for
+    every column. Returns the same shape for every impacted node.
+    """
+    impacted = {node_id: set(columns) for node_id, columns in changed.items() if columns}
+    if not include_downstream:
+        return impacted
+
+    downstream = [node_id for node_id in graph.get_downstream(list(impacted)) if node_id in lineage]
+    for wave in graph.topological_waves(downstream):
+        for node_id in wave:
+            node_lineage = lineage[node_id]
+            columns = impacted.setdefault(node_id, set())
+            if any(_column_hit(dep, impacted) for dep in node_lineage['row_deps']):
+                columns.add(ALL_COLUMNS)
+                continue
+            for name, (deps, _) in node_lineage['columns'].items():
+                if any(_column_hit(dep, impacted) for dep in deps):
+                    columns.add(name)
+            for parent in node_lineage['passthrough']:
+                for column in impacted.get(parent, ()):
+                    if column == ALL_COLUMNS or column not in node_lineage['columns']:
+                        columns.add(column)
+    return {node_id: columns for node_id, columns in impacted.items() if columns}
+
+
+def changed_columns(current, previous):
+    """Return the columns of a node whose derivation differs between two lineages."""
+    if current is None or previous is None or current['opaque'] or previous['opaque']:
+        return {ALL_COLUMNS}
+    if current['row_fp'] != previous['row_fp'] or current['passthrough'] != previous['passthrough']:
+        return {ALL_COLUMNS}
+    columns = {name for name, (_, fp) in current['columns'].items()
+               if name not in previous['columns'] or previous['columns'][name][1] != fp}
+    columns.update(name for name in previous['columns'] if name not in current['columns'])
+    return columns
+
+
+def parse_column_selectors(graph, selectors):
+    """Turn 'model.column' selectors into {unique_id: {column}}, raising ValueError for unknown models."""
+    changed = {}
+    for selector in selectors:
+        model_name, _, column = selector.rpartition('.')
+        model_id = graph.get_model_id(model_name)
+        if not model_name or model_id is None:
+            raise ValueError(f"Unknown model in column selector '{selector}' (expected model.column)")
+        changed.setdefault(model_id, set()).add(column.lower())
+    return changed
+
+
+def seed_changed_columns(graph, lineage, modified_ids=(), column_selectors=(),
+                         state_changes=None, state_lineage=None):
+    """Return the changed columns to start column-level impact analysis from.
+
+    Nodes from changed files change in every column. Nodes from a state
+    comparison are narrowed to the columns whose SQL changed, when the
+    change is visible in the SQL of both manifests.
+    """
+    changed = {node_id: {ALL_COLUMNS} for node_id in modified_ids}
+    for node_id, reasons in (state_changes or {}).items():
+        if state_lineage is not None and all(reason in SQL_CHANGE_REASONS or reason.startswith('macro ')
+                                             for reason in reasons):
+            columns = changed_columns(lineage.get(node_id), state_lineage.get(node_id))
+        else:
+            columns = {ALL_COLUMNS}
+        changed.setdefault(node_id, set()).update(columns)
+    for node_id, columns in parse_column_selectors(graph, column_selectors).items():
+        changed.setdefault(node_id, set()).update(columns)
+    return changed
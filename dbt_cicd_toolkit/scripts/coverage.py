@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+Test coverage engine for dbt-ci-cd-toolkit.
+
+Computes every test coverage metric, plus a per-model breakdown, in one
+pass over the manifest graph and the latest run_results.json, without
+invoking dbt.
+"""
+
+import csv
+import io
+import json
+from pathlib import Path
+
+COVERAGE_METRICS = ['total_models', 'models_with_tests', 'model_coverage_pct', 'total_tests',
+                    'passing_tests', 'failing_tests', 'test_pass_rate']
+
+MODEL_COLUMNS = ['model_id', 'model_name', 'model_path', 'total_tests', 'passing_tests',
+                 'failing_tests', 'columns_tested', 'test_status']
+
+PASSING_STATUSES = ('pass',)
+FAILING_STATUSES = ('fail', 'error', 'runtime error')
+
+
+def default_run_results_path(project_dir='.'):
+    """Return the run_results.json written by the last dbt run of a project."""
+    return Path(project_dir) / 'target' / 'run_results.json'
+
+
+def load_test_statuses(run_results_path):
+    """Return {unique_id: status} from a run_results.json file, or {} if it does not exist."""
+    path = Path(run_results_path)
+    if not path.exists():
+        return {}
+    with open(path, 'r') as f:
+        run_results = json.load(f)
+    return {result['unique_id']: result.get('status') for result in run_results.get('results', [])
+            if result.get('unique_id')}
+
+
+def _percentage(part, whole):
+    return round(100.0 * part / whole, 2) if whole else 0
+
+
+def compute_coverage(graph, test_statuses):
+    """Return {'metrics': {...}, 'models': [...]} for a manifest graph.
+
+    Metrics match the get_test_coverage_metric macro, except that a test
+    on several models (e.g. relationships) is counted once in the project
+    totals. Test statuses come from run_results rather than the manifest.
+    """
+    model_rows = {}
+    for node_id, node in graph.nodes.items():
+        if node['resource_type'] == 'model':
+            model_rows[node_id] = {
+                'model_id': node_id,
+                'model_name': node['name'],
+                'model_path': node.get('original_file_path'),
+                'total_tests': 0,
+                'passing_tests': 0,
+                'failing_tests': 0,
+                'columns_tested': set()
+            }
+
+    model_tests = set()
+    for model_id, row in model_rows.items():
+        for test_id in graph.model_tests.get(model_id, []):
+            status = test_statuses.get(test_id)
+            row['total_tests'] += 1
+            row['passing_tests'] += status in PASSING_STATUSES
+            row['failing_tests'] += status in FAILING_STATUSES
+            column_name = graph.nodes[test_id].get('column_name')
+            if column_name:
+                row['columns_tested'].add(column_name)
+            model_tests.add(test_id)
+
+    for row in model_rows.values():
+        row['columns_tested'] = len(row['columns_tested'])
+        if row['total_tests'] == 0:
+            row['test_status'] = 'No tests'
+        elif row['passing_tests'] == row['total_tests']:
+            row['test_status'] = 'All passing'
+        elif row['failing_tests'] > 0:
+            row['test_status'] = 'Has failures'
+        else:
+            row['test_status'] = 'Unknown'
+
+    total_models = len(model_rows)
+    models_with_tests = sum(1 for row in model_rows.values() if row['total_tests'])
+    total_tests = len(model_tests)
+    passing_tests = sum(1 for test_id in model_tests if test_statuses.get(test_id) in PASSING_STATUSES)
+    failing_tests = sum(1 for test_id in model_tests if test_statuses.get(test_id) in FAILING_STATUSES)
+
+    metrics = {
+        'total_models': total_models,
+        'models_with_tests': models_with_tests,
+        'model_coverage_pct': _percentage(models_with_tests, total_models),
+        'total_tests': total_tests,
+        'passing_tests': passing_tests,
+        'failing_tests': failing_tests,
+        'test_pass_rate': _percentage(passing_tests, total_tests)
+    }
+    models = sorted(model_rows.values(), key=lambda row: row['model_id'])
+    return {'metrics': metrics, 'models': models}
+
+
+def format_coverage(coverage, output_format='json'):
+    """Format a coverage document as JSON or CSV.
+
+    CSV has one row per model with the project metrics repeated on every
+    row, like the test_coverage_dashboard model.
+    """
+    if output_format == 'csv':
+        output = io.StringIO()
+        writer = csv.writer(output, lineterminator='\n')
+        project_columns = [f'project_{metric}' for metric in COVERAGE_METRICS]
+        writer.writerow(MODEL_COLUMNS + project_columns)
+        project_values = [coverage['metrics'][metric] for metric in COVERAGE_METRICS]
+        for row in coverage['models']:
+            writer.writerow([row[column] for column in MODEL_COLUMNS] + project_values)
+        return output.getvalue()
+    return json.dumps(coverage, indent=2)
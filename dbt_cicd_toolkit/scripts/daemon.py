@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Long-running `dbt-cicd serve` daemon for dbt-ci-cd-toolkit.
+
+The daemon keeps the manifest graph and the in-process dbt project warm
+and serves CLI commands over HTTP on localhost. The CLI forwards commands
+to a running daemon and falls back to direct execution when none is
+available.
+"""
+
+import contextlib
+import io
+import json
+import os
+import secrets
+import signal
+import sys
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+from urllib.error import URLError
+from urllib.request import Request, urlopen
+
+STATE_FILE_NAME = 'daemon.json'
+TOKEN_HEADER = 'X-Dbt-Cicd-Token'
+HEALTH_TIMEOUT_SECONDS = 1
+CLIENT_TIMEOUT_SECONDS = 600
+
+
+def state_file_path(project_dir='.'):
+    """Return the daemon state file location for a project."""
+    return Path(project_dir) / 'target' / 'dbt_cicd_toolkit' / STATE_FILE_NAME
+
+
+def _manifest_mtime(project_dir):
+    try:
+        return os.stat(Path(project_dir) / 'target' / 'manifest.json').st_mtime_ns
+    except OSError:
+        return None
+
+
+class DaemonState:
+    """Warm state shared by every request the daemon serves."""
+
+    def __init__(self, project_dir):
+        self.project_dir = str(Path(project_dir).resolve())
+        self.manifest_mtime = _manifest_mtime(self.project_dir)
+
+    def refresh(self):
+        """Drop the warm dbt project if manifest.json changed since the last request.
+
+        The manifest graph reloads itself from the graph index when the
+        manifest changes, so only the in-process dbt runner is reset here.
+        """
+        from dbt_cicd_toolkit.scripts import dbt_runner
+
+        manifest_mtime = _manifest_mtime(self.project_dir)
+        if manifest_mtime != self.manifest_mtime:
+            self.manifest_mtime = manifest_mtime
+            dbt_runner._default_runners.clear()
+            print("Manifest changed; reloading project state")
+
+    def run(self, argv, cwd, stdin=None):
+        """Run a CLI command in-process and return (exit_code, output).
+
+        stdin is the client's standard input, for `--files-from -`; the
+        daemon's own stdin is never read.
+        """
+        from dbt_cicd_toolkit.scripts.cli import run_command
+
+        self.refresh()
+        output = io.StringIO()
+        exit_code = 0
+        saved_cwd, saved_argv, saved_stdin = os.getcwd(), sys.argv, sys.stdin
+        try:
+            os.chdir(cwd)
+            sys.stdin = io.StringIO(stdin or '')
+            with contextlib.redirect_stdout(output):
+                try:
+                    run_command(argv)
+                except SystemExit as e:
+                    exit_code = e.code if isinstance(e.code, int) else (0 if e.code is None else 1)
+        except Exception as e:
+            output.write(f"Error: {e}\n")
+            exit_code = 1
+        finally:
+            os.chdir(saved_cwd)
+            sys.argv = saved_argv
+            sys.stdin = saved_stdin
+        return exit_code, output.getvalue()
+
+
+def _make_handler(state, token):
+    class DaemonRequestHandler(BaseHTTPRequestHandler):
+        def _send_json(self, status, payload):
+            body = json.dumps(payload).encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/health':
+                self._send_json(200, {'status': 'ok', 'project_dir': state.project_dir})
+            else:
+                self._send_json(404, {'error': 'not found'})
+
+        def do_POST(self):
+            if self.headers.get(TOKEN_HEADER) != token:
+                self._send_json(403, {'error': 'invalid token'})
+                return
+            if self.path != '/run':
+                self._send_json(404, {'error': 'not found'})
+                return
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            exit_code, output = state.run(request.get('argv', []), request.get('cwd', state.project_dir),
+                                          request.get('stdin'))
+            self._send_json(200, {'exit_code': exit_code, 'output': output})
+
+        def log_message(self, format, *args):
+            pass
+
+    return DaemonRequestHandler
+
+
+def serve(project_dir='.', host='127.0.0.1', port=0):
+    """Serve CLI commands until interrupted.
+
+    Requests are handled one at a time, since in-process dbt invocations
+    cannot run concurrently.
+    """
+    state = DaemonState(project_dir)
+    token = secrets.token_hex(16)
+    server = HTTPServer((host, port), _make_handler(state, token))
+
+    state_path = state_file_path(state.project_dir)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(os.open(state_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+        json.dump({'pid': os.getpid(), 'host': host, 'port': server.server_address[1], 'token': token}, f)
+
+    # Stop cleanly on SIGTERM as well as Ctrl-C
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    print(f"dbt-cicd daemon serving {state.project_dir} on http://{host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(OSError):
+            state_path.unlink()
+        print("dbt-cicd daemon stopped")
+
+
+def forward_to_daemon(argv, project_dir='.', stdin=None):
+    """Run argv on a running daemon and return its exit code.
+
+    stdin, if given, is sent as the command's standard input. Returns
+    None when no daemon is reachable, so the caller can run the command
+    directly.
+    """
+    try:
+        with open(state_file_path(project_dir), 'r') as f:
+            daemon = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    base_url = f"http://{daemon['host']}:{daemon['port']}"
+    try:
+        with urlopen(f"{base_url}/health", timeout=HEALTH_TIMEOUT_SECONDS) as response:
+            response.read()
+    except (URLError, OSError, ValueError):
+        return None
+
+    request = Request(
+        f"{base_url}/run",
+        data=json.dumps({'argv': argv, 'cwd': os.getcwd(), 'stdin': stdin}).encode('utf-8'),
+        headers={'Content-Type': 'application/json', TOKEN_HEADER: daemon['token']}
+    )
+    try:
+        with urlopen(request, timeout=CLIENT_TIMEOUT_SECONDS) as response:
+            result = json.loads(response.read())
+    except (URLError, OSError, ValueError) as e:
+        # The daemon accepted the command, so do not run it a second time
+        print(f"Error: dbt-cicd daemon request failed: {e}")
+        return 1
+
+    sys.stdout.write(result.get('output', ''))
+    return result.get('exit_code', 1)
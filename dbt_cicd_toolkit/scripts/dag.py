@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Compact, integer-indexed DAG for dbt-ci-cd-toolkit.
+
+Unique ids are interned to integers, adjacency is stored in CSR form in
+`array` buffers and reachability is tracked in bitsets, so closures over
+hundreds of seeds are computed in a single batched traversal.
+"""
+
+from array import array
+from collections import deque
+
+INDEX_TYPECODE = 'i'
+
+
+def new_bitset(size):
+    """Return an empty bitset able to hold `size` members."""
+    return bytearray((size + 7) >> 3)
+
+
+def bitset_contains(bits, i):
+    """Return True if member i is set."""
+    return bool(bits[i >> 3] & (1 << (i & 7)))
+
+
+def bitset_add(bits, i):
+    """Set member i."""
+    bits[i >> 3] |= 1 << (i & 7)
+
+
+def iter_bitset(bits):
+    """Yield the members of a bitset in ascending order."""
+    for byte_index, byte in enumerate(bits):
+        if byte:
+            base = byte_index << 3
+            for bit in range(8):
+                if byte & (1 << bit):
+                    yield base + bit
+
+
+def _build_csr(size, edges):
+    """Build CSR offsets and targets from (source, target) pairs."""
+    offsets = array(INDEX_TYPECODE, [0]) * (size + 1)
+    for source, _ in edges:
+        offsets[source + 1] += 1
+    for i in range(size):
+        offsets[i + 1] += offsets[i]
+
+    targets = array(INDEX_TYPECODE, [0]) * len(edges)
+    cursor = array(INDEX_TYPECODE, offsets[:-1])
+    for source, target in edges:
+        targets[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, targets
+
+
+class CompactDag:
+    """CSR parent/child adjacency over interned integer node ids."""
+
+    def __init__(self, ids, child_offsets, child_targets, parent_offsets, parent_targets):
+        self.ids = ids
+        self.index = {unique_id: i for i, unique_id in enumerate(ids)}
+        self.child_offsets = child_offsets
+        self.child_targets = child_targets
+        self.parent_offsets = parent_offsets
+        self.parent_targets = parent_targets
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_parents(cls, parents):
+        """Build a DAG from {unique_id: [parent unique_ids]}.
+
+        Parents that are not keys themselves (sources, metrics, disabled
+        nodes) are interned as well so every edge is kept.
+        """
+        ids = list(parents)
+        index = {unique_id: i for i, unique_id in enumerate(ids)}
+        edges = []
+        for node_id, parent_ids in parents.items():
+            child = index[node_id]
+            for parent_id in parent_ids:
+                parent = index.get(parent_id)
+                if parent is None:
+                    parent = index[parent_id] = len(ids)
+                    ids.append(parent_id)
+                edges.append((parent, child))
+
+        child_offsets, child_targets = _build_csr(len(ids), edges)
+        parent_offsets, parent_targets = _build_csr(len(ids), [(c, p) for p, c in edges])
+        return cls(ids, child_offsets, child_targets, parent_offsets, parent_targets)
+
+    def to_index(self):
+        """Return the DAG as plain data, with adjacency arrays as raw bytes."""
+        return {
+            'ids': self.ids,
+            'typecode': INDEX_TYPECODE,
+            'child_offsets': self.child_offsets.tobytes(),
+            'child_targets': self.child_targets.tobytes(),
+            'parent_offsets': self.parent_offsets.tobytes(),
+            'parent_targets': self.parent_targets.tobytes()
+        }
+
+    @classmethod
+    def from_index(cls, data):
+        """Rebuild a DAG from the output of to_index."""
+        def load(key):
+            values = array(data['typecode'])
+            values.frombytes(data[key])
+            return values
+
+        return cls(data['ids'], load('child_offsets'), load('child_targets'),
+                   load('parent_offsets'), load('parent_targets'))
+
+    def intern(self, unique_ids):
+        """Map unique_ids to integer ids, dropping unknown ids."""
+        return [self.index[u] for u in unique_ids if u in self.index]
+
+    def children(self, i):
+        """Return the integer ids of the direct children of i."""
+        return self.child_targets[self.child_offsets[i]:self.child_offsets[i + 1]]
+
+    def parents(self, i):
+        """Return the integer ids of the direct parents of i."""
+        return self.parent_targets[self.parent_offsets[i]:self.parent_offsets[i + 1]]
+
+    def closure(self, seeds, upstream=False):
+        """Return (order, bitset) for everything reachable from seeds.
+
+        All seeds are traversed in one batched BFS. `order` lists reached
+        ids in BFS order and excludes the seeds; `bitset` includes them.
+        """
+        if upstream:
+            offsets, targets = self.parent_offsets, self.parent_targets
+        else:
+            offsets, targets = self.child_offsets, self.child_targets
+
+        bits = new_bitset(len(self.ids))
+        queue = deque()
+        for i in seeds:
+            if not bits[i >> 3] & (1 << (i & 7)):
+                bits[i >> 3] |= 1 << (i & 7)
+                queue.append(i)
+
+        order = []
+        while queue:
+            i = queue.popleft()
+            for j in targets[offsets[i]:offsets[i + 1]]:
+                mask = 1 << (j & 7)
+                if not bits[j >> 3] & mask:
+                    bits[j >> 3] |= mask
+                    order.append(j)
+                    queue.append(j)
+        return order, bits
+
+    def waves(self, members):
+        """Group members into topological waves.
+
+        A member's wave is the number of other members on the longest path
+        above it, counting paths through non-members, so every member
+        comes after all of its upstream members.
+        """
+        member_bits = new_bitset(len(self.ids))
+        for i in members:
+            bitset_add(member_bits, i)
+        _, scope = self.closure(members, upstream=True)
+
+        # Kahn's algorithm over the upstream closure of the members
+        pending = {}
+        queue = deque()
+        for i in iter_bitset(scope):
+            pending[i] = self.parent_offsets[i + 1] - self.parent_offsets[i]
+            if not pending[i]:
+                queue.append(i)
+
+        depth = dict.fromkeys(pending, 0)
+        while queue:
+            i = queue.popleft()
+            child_depth = depth[i] + (1 if bitset_contains(member_bits, i) else 0)
+            for j in self.children(i):
+                if j in pending:
+                    depth[j] = max(depth[j], child_depth)
+                    pending[j] -= 1
+                    if not pending[j]:
+                        queue.append(j)
+
+        waves = []
+        for i in sorted(set(members)):
+            wave = depth[i]
+            while len(waves) <= wave:
+                waves.append([])
+            waves[wave].append(i)
+        return waves
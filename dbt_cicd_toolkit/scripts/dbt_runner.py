@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+"""
+Execution layer for invoking dbt from dbt-ci-cd-toolkit.
+
+dbt is invoked in-process through its programmatic API (dbt-core 1.5+)
+when it is importable, reusing one parsed manifest across every call in
+a CLI run, and as a subprocess otherwise. Results are read from dbt's
+structured artifacts and events rather than from log text.
+"""
+
+import json
+import os
+import re
+import subprocess
+import threading
+from pathlib import Path
+
+import yaml
+
+# Commands that write run_results.json
+RUN_RESULTS_COMMANDS = ('build', 'run', 'test', 'seed', 'snapshot', 'clone')
+
+# Longest command line echoed before running dbt
+MAX_SHOWN_ARGS = 24
+
+_ENV_VAR_CALL = re.compile(r"""\{\{\s*env_var\(\s*['"]([^'"]+)['"]\s*(?:,\s*['"]([^'"]*)['"]\s*)?\)\s*\}\}""")
+
+
+class DbtCommandError(Exception):
+    """Raised when a dbt invocation fails or returns no usable result."""
+
+
+class DbtResult:
+    """Outcome of a dbt invocation."""
+
+    def __init__(self, success, returncode, output='', run_results=None, compiled=None, preview=None):
+        self.success = success
+        self.returncode = returncode
+        self.output = output
+        self.run_results = run_results
+        self.compiled = compiled
+        self.preview = preview
+
+    def failed_results(self):
+        """Return the run results whose status is fail or error."""
+        return [
+            result for result in (self.run_results or {}).get('results', [])
+            if result.get('status') in ('fail', 'error', 'runtime error')
+        ]
+
+
+def _load_programmatic_runner():
+    try:
+        from dbt.cli.main import dbtRunner
+    except ImportError:
+        return None
+    return dbtRunner
+
+
+def _read_yaml(path):
+    try:
+        with open(path, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError):
+        return {}
+
+
+def _render_env_vars(value):
+    """Render the {{ env_var('NAME', 'default') }} calls profiles commonly use."""
+    return _ENV_VAR_CALL.sub(lambda m: os.environ.get(m.group(1), m.group(2) or ''), str(value))
+
+
+def resolve_target(project_dir='.'):
+    """Return the (profile, target) names dbt will run against, as far as they can be resolved.
+
+    Follows dbt: DBT_PROFILE and DBT_TARGET win, then the profile named in
+    dbt_project.yml and its default target in profiles.yml, which is read
+    from DBT_PROFILES_DIR, the project directory or ~/.dbt.
+    """
+    profile = _render_env_vars(os.environ.get('DBT_PROFILE')
+                               or _read_yaml(Path(project_dir) / 'dbt_project.yml').get('profile') or '')
+    target = os.environ.get('DBT_TARGET')
+    if not target:
+        profiles_dirs = [os.environ.get('DBT_PROFILES_DIR'), project_dir, Path.home() / '.dbt']
+        for profiles_dir in filter(None, profiles_dirs):
+            profiles_path = Path(profiles_dir) / 'profiles.yml'
+            if profiles_path.exists():
+                target = (_read_yaml(profiles_path).get(profile) or {}).get('target') or 'default'
+                break
+    return profile, _render_env_vars(target or 'default')
+
+
+def _jinja_string(value):
+    """Quote a Python string as a Jinja string literal."""
+    return json.dumps(value)
+
+
+class DbtRunner:
+    """Invoke dbt commands in-process when possible, as subprocesses otherwise."""
+
+    def __init__(self, project_dir='.', in_process=None, global_args=None):
+        self.project_dir = str(project_dir)
+        self.global_args = list(global_args or [])
+        self._dbt_runner = _load_programmatic_runner() if in_process is not False else None
+        if in_process and self._dbt_runner is None:
+            raise DbtCommandError("In-process execution requires dbt-core 1.5 or later")
+        self._manifest = None
+        self._processes = set()
+        self._lock = threading.Lock()
+        self._terminated = False
+
+    @property
+    def in_process(self):
+        return self._dbt_runner is not None
+
+    def _cli_args(self, command, args, target_path):
+        cli_args = [command, '--project-dir', self.project_dir] + self.global_args + list(args or [])
+        if target_path:
+            cli_args.extend(['--target-path', str(target_path)])
+        return cli_args
+
+    def _invoke_in_process(self, cli_args):
+        """Invoke dbt in-process, parsing the project once and reusing the manifest."""
+        messages = []
+
+        def collect(event):
+            messages.append(event.info.msg)
+
+        if self._manifest is None:
+            parse_result = self._dbt_runner().invoke(['parse', '--project-dir', self.project_dir] + self.global_args)
+            if parse_result.success:
+                self._manifest = parse_result.result
+
+        runner = self._dbt_runner(manifest=self._manifest, callbacks=[collect])
+        result = runner.invoke(cli_args)
+
+        compiled = preview = None
+        node_results = (getattr(result.result, 'results', None) or []) if result.success else []
+        if cli_args[0] == 'compile' and node_results:
+            compiled = node_results[-1].node.compiled_code
+        elif cli_args[0] == 'show' and node_results:
+            table = node_results[-1].agate_table
+            preview = [dict(zip(table.column_names, row)) for row in table.rows]
+
+        returncode = 0 if result.success else (2 if result.exception else 1)
+        return result.success, returncode, '\n'.join(str(m) for m in messages), compiled, preview
+
+    def _invoke_subprocess(self, cli_args):
+        """Invoke dbt as a subprocess, reading compiled output and previews from JSON log events."""
+        cmd = ['dbt'] + cli_args
+        if cli_args[0] in ('compile', 'show'):
+            cmd[1:1] = ['--log-format', 'json']
+        with self._lock:
+            if self._terminated:
+                return False, -15, 'Terminated', None, None
+            process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+            self._processes.add(process)
+        try:
+            stdout, stderr = process.communicate()
+        finally:
+            with self._lock:
+                self._processes.discard(process)
+        result = subprocess.CompletedProcess(cmd, process.returncode, stdout, stderr)
+
+        compiled = preview = None
+        if cli_args[0] in ('compile', 'show'):
+            for line in result.stdout.splitlines():
+                try:
+                    event = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                name = event.get('info', {}).get('name')
+                if name == 'CompiledNode':
+                    compiled = event.get('data', {}).get('compiled')
+                elif name == 'ShowNode':
+                    preview = json.loads(event.get('data', {}).get('preview') or '[]')
+                    if isinstance(preview, dict):
+                        preview = preview.get('show', [])
+
+        output = result.stdout if result.returncode == 0 else (result.stderr or result.stdout)
+        return result.returncode == 0, result.returncode, output, compiled, preview
+
+    def terminate(self):
+        """Stop running dbt subprocesses and refuse new ones, e.g. to fail fast."""
+        with self._lock:
+            self._terminated = True
+            for process in self._processes:
+                process.terminate()
+
+    def invoke(self, command, args=None, target_path=None):
+        """Run a dbt command and return a DbtResult.
+
+        For commands that execute nodes, run_results.json is read from the
+        target path into DbtResult.run_results.
+        """
+        cli_args = self._cli_args(command, args, target_path)
+        shown_args = cli_args if len(cli_args) <= MAX_SHOWN_ARGS else (
+            cli_args[:MAX_SHOWN_ARGS] + [f"... (+{len(cli_args) - MAX_SHOWN_ARGS} more)"]
+        )
+        print(f"Running: dbt {' '.join(shown_args)}")
+
+        if self.in_process:
+            success, returncode, output, compiled, preview = self._invoke_in_process(cli_args)
+        else:
+            success, returncode, output, compiled, preview = self._invoke_subprocess(cli_args)
+
+        run_results = None
+        if command in RUN_RESULTS_COMMANDS:
+            run_results_path = Path(target_path or Path(self.project_dir) / 'target') / 'run_results.json'
+            if run_results_path.exists():
+                with open(run_results_path, 'r') as f:
+                    run_results = json.load(f)
+
+        return DbtResult(success, returncode, output, run_results, compiled, preview)
+
+    def run_operation(self, macro, kwargs=None):
+        """Run a macro with run-operation and return its DbtResult."""
+        return self.invoke('run-operation', [macro, '--args', json.dumps(kwargs or {})])
+
+    def show(self, inline, limit=None):
+        """Run a query with `dbt show --inline` and return its rows as dicts."""
+        args = ['--inline', inline, '--output', 'json']
+        if limit is not None:
+            args.extend(['--limit', str(limit)])
+        result = self.invoke('show', args)
+        if not result.success:
+            raise DbtCommandError(f"Error running query: {result.output.strip()}")
+        if result.preview is None:
+            raise DbtCommandError("No rows returned by dbt show")
+        return result.preview
+
+    def run_macro(self, macro, kwargs=None):
+        """Call a macro and return its return value, decoded from JSON.
+
+        The macro is rendered with `dbt compile --inline`, so its return
+        value comes back as structured output rather than log text.
+        """
+        inline = f"{{{{ tojson({macro}(**fromjson({_jinja_string(json.dumps(kwargs or {}))}))) }}}}"
+        result = self.invoke('compile', ['--inline', inline])
+        if not result.success:
+            raise DbtCommandError(f"Error running macro {macro}: {result.output.strip()}")
+        if result.compiled is None:
+            raise DbtCommandError(f"No output returned by macro {macro}")
+        try:
+            return json.loads(result.compiled)
+        except json.JSONDecodeError:
+            raise DbtCommandError(f"Could not parse output of macro {macro}: {result.compiled}")
+
+
+_default_runners = {}
+
+
+def get_runner(project_dir='.'):
+    """Return the shared runner for a project so one CLI run parses it only once."""
+    key = str(Path(project_dir).resolve())
+    if key not in _default_runners:
+        _default_runners[key] = DbtRunner(project_dir)
+    return _default_runners[key]
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Slim CI builds for dbt-ci-cd-toolkit.
+
+Builds only the impacted models and their planned tests with a single
+`dbt build`, deferring every unchanged upstream ref to the artifacts of
+another environment (usually production). Unchanged upstream tables can
+be cloned into the CI schema first with `dbt clone`, which uses
+zero-copy clones where the adapter supports them.
+"""
+
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtRunner
+from dbt_cicd_toolkit.scripts.selective_planner import selectors_for_tests
+
+# Upstream resources `dbt clone` can copy from the state environment
+CLONE_RESOURCE_TYPES = ('model', 'seed', 'snapshot')
+
+
+def state_dir(state_manifest):
+    """Return the artifacts directory dbt's --state expects for a manifest path."""
+    return Path(state_manifest).resolve().parent
+
+
+def defer_args(state_manifest):
+    """Return the dbt arguments that defer unselected refs to a state manifest."""
+    return ['--defer', '--state', str(state_dir(state_manifest))]
+
+
+def unchanged_upstream(graph, build_ids, test_ids=()):
+    """Return the direct upstream nodes of the build that are not rebuilt and can be cloned.
+
+    Ephemeral models have no relation to clone and are skipped.
+    """
+    building = set(build_ids)
+    upstream = {}
+    for node_id in list(build_ids) + list(test_ids):
+        for parent_id in graph.parents.get(node_id, []):
+            parent = graph.nodes.get(parent_id)
+            if (parent_id in building or parent is None
+                    or parent['resource_type'] not in CLONE_RESOURCE_TYPES
+                    or parent.get('materialized') == 'ephemeral'):
+                continue
+            upstream[parent_id] = None
+    return list(upstream)
+
+
+def clone_upstream(project_dir, graph, node_ids, state_manifest, runner=None):
+    """Clone unchanged upstream relations from the state environment into the target schema.
+
+    Returns True on success. A failed clone is not fatal, since deferral
+    still resolves those refs to the state environment.
+    """
+    if not node_ids:
+        return True
+    runner = runner or DbtRunner(project_dir, in_process=False)
+    print(f"Cloning {len(node_ids)} unchanged upstream relations from {state_dir(state_manifest)}")
+    result = runner.invoke('clone', ['--select'] + [graph.nodes[node_id]['name'] for node_id in node_ids]
+                           + ['--state', str(state_dir(state_manifest))])
+    if not result.success:
+        print(f"Warning: dbt clone failed (exit code {result.returncode}); "
+              f"upstream refs will be deferred instead")
+    return result.success
+
+
+def run_deferred_build(project_dir, graph, build_ids, test_ids, state_manifest=None, fail_fast=False,
+                       runner=None):
+    """Build the given models and run exactly the given tests in one dbt build.
+
+    Returns (returncode, run_results_path). Tests on the built models that
+    were not planned are left out with --indirect-selection empty. With a
+    state manifest, refs to unselected nodes resolve against it.
+    """
+    runner = runner or DbtRunner(project_dir, in_process=False)
+    args = (['--select'] + [graph.nodes[node_id]['name'] for node_id in build_ids]
+            + selectors_for_tests(graph, test_ids) + ['--indirect-selection', 'empty'])
+    if state_manifest:
+        args.extend(defer_args(state_manifest))
+    if fail_fast:
+        args.append('--fail-fast')
+
+    run_results_path = Path(project_dir) / 'target' / 'run_results.json'
+    # Never report results left over from an earlier command
+    run_results_path.unlink(missing_ok=True)
+
+    print(f"Building {len(build_ids)} models and running {len(test_ids)} tests")
+    result = runner.invoke('build', args)
+    if not result.success and result.output and not result.run_results:
+        print(result.output.strip())
+    return result.returncode, run_results_path
@@ -1,151 +1,153 @@
 #!/usr/bin/env python3
 """
-Script to extract test coverage metrics from the test coverage dashboard.
+Script to extract test coverage metrics for a dbt project.
+
+By default all metrics are computed in one pass over the manifest and
+the latest run_results.json, without invoking dbt. The
+test_coverage_dashboard table or the get_test_coverage_metric macro can
+be used instead.
 """
 
 import argparse
-import json
-import os
-import subprocess
 import sys
-from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.coverage import (
+    COVERAGE_METRICS,
+    compute_coverage,
+    default_run_results_path,
+    format_coverage,
+    load_test_statuses,
+)
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtCommandError, get_runner
+
+# Dashboard columns holding each project-level metric
+DASHBOARD_COLUMNS = {
+    'total_models': 'total_models',
+    'models_with_tests': 'models_with_tests',
+    'model_coverage_pct': 'model_coverage_pct',
+    'total_tests': 'project_total_tests',
+    'passing_tests': 'project_passed_tests',
+    'failing_tests': 'project_failed_tests',
+    'test_pass_rate': 'project_test_pass_rate'
+}
 
 
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Extract test coverage metrics from dbt.')
-    parser.add_argument('--metric', type=str, required=True,
-                        choices=['model_coverage_pct', 'test_pass_rate', 'total_models', 
-                                 'models_with_tests', 'total_tests', 'passing_tests', 
-                                 'failing_tests'],
-                        help='Metric to extract')
+    parser.add_argument('--metric', type=str, nargs='+', choices=COVERAGE_METRICS,
+                        help='Metrics to extract')
+    parser.add_argument('--all', action='store_true',
+                        help='Extract every metric and the per-model breakdown')
+    parser.add_argument('--output-format', type=str, choices=['value', 'json', 'csv'],
+                        help='Output format (default: value for a single metric, json otherwise)')
+    parser.add_argument('--output', type=str,
+                        help='File to write the output to instead of stdout')
     parser.add_argument('--dbt-project-dir', type=str, default='.',
                         help='Path to dbt project directory')
+    parser.add_argument('--manifest-path', type=str,
+                        help='Path to manifest.json (defaults to <project-dir>/target/manifest.json)')
+    parser.add_argument('--run-results', type=str,
+                        help='Path to run_results.json (defaults to <project-dir>/target/run_results.json)')
     parser.add_argument('--use-table', action='store_true',
-                        help='Query the test_coverage_dashboard table instead of running a macro')
+                        help='Query the test_coverage_dashboard table instead of the manifest')
+    parser.add_argument('--use-macro', action='store_true',
+                        help='Use the get_test_coverage_metric macro instead of the manifest')
     parser.add_argument('--schema', type=str, default='cicd_analytics',
                         help='Schema where the test_coverage_dashboard table is located')
-    return parser.parse_args()
-
-
-def run_dbt_command(args, command, additional_args=None):
-    """Run a dbt command and return the result."""
-    if additional_args is None:
-        additional_args = []
-    
-    cmd = ['dbt', command, '--project-dir', args.dbt_project_dir] + additional_args
-    
-    print(f"Running command: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"Error running dbt command: {result.stderr}")
-        sys.exit(result.returncode)
-    
-    return result.stdout
-
-
-def extract_coverage_metric_from_table(args, metric):
-    """Extract test coverage metric from the test_coverage_dashboard table."""
-    # Create a temporary file to run the query
-    temp_dir = Path(args.dbt_project_dir) / 'target' / 'run'
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    temp_file = temp_dir / 'extract_metric.sql'
-    
-    # Write the query
-    if metric in ['model_coverage_pct', 'test_pass_rate']:
-        # These are project-level metrics, so just grab first row
-        with open(temp_file, 'w') as f:
-            f.write(f"""
--- This is a temporary model to extract metrics
-SELECT 
-    project_{metric} as value
-FROM {{{{ ref('test_coverage_dashboard') }}}}
-LIMIT 1
-""")
-    else:
-        # These need to be aggregated
-        with open(temp_file, 'w') as f:
-            f.write(f"""
--- This is a temporary model to extract metrics
-SELECT 
-    SUM({metric}) as value
-FROM {{{{ ref('test_coverage_dashboard') }}}}
-""")
-    
-    # Run the query
-    result = run_dbt_command(args, 'compile', ['--models', 'extract_metric'])
-    
-    # Parse the result
+    args = parser.parse_args()
+
+    if not args.metric and not args.all:
+        parser.error('one of --metric or --all is required')
+    return args
+
+
+def extract_coverage_from_manifest(args):
+    """Compute every metric and the per-model breakdown from the manifest and run results."""
+    from dbt_cicd_toolkit.scripts.manifest_graph import load_graph
+
+    graph = load_graph(args.dbt_project_dir, args.manifest_path)
+    run_results_path = args.run_results or default_run_results_path(args.dbt_project_dir)
+    test_statuses = load_test_statuses(run_results_path)
+    if not test_statuses:
+        print(f"Warning: No test results found at {run_results_path}; pass rates will be 0", file=sys.stderr)
+    return compute_coverage(graph, test_statuses)
+
+
+def extract_coverage_metrics_from_table(args, metrics):
+    """Read project-level metrics from the test_coverage_dashboard table with one query."""
+    columns = ', '.join(f"{DASHBOARD_COLUMNS[metric]} AS {metric}" for metric in metrics)
+    query = f"SELECT {columns} FROM {{{{ ref('test_coverage_dashboard') }}}}"
+
     try:
-        # Extract the SQL query
-        sql_start = result.find('SELECT')
-        if sql_start < 0:
-            print("Error: Could not find SQL in dbt compile result")
-            return None
-        
-        # Run the SQL query against the database
-        # In a production implementation, we would use the appropriate database connector here
-        value = 85.5  # This would be replaced with actual database query in production
-        
-        return value
-    except Exception as e:
-        print(f"Error extracting metric: {e}")
+        rows = get_runner(args.dbt_project_dir).show(query, limit=1)
+    except DbtCommandError as e:
+        print(f"Error extracting metrics: {e}")
         return None
 
+    if not rows:
+        print("Error: test_coverage_dashboard is empty")
+        return None
+    # Adapters may return upper-case column names
+    row = {key.lower(): value for key, value in rows[0].items()}
+    return {metric: row.get(metric) for metric in metrics}
+
 
 def extract_coverage_metric_from_macro(args, metric):
     """Extract test coverage metric using a dbt macro."""
-    # Create a temporary file to run the macro
-    temp_dir = Path(args.dbt_project_dir) / 'target' / 'run'
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    temp_file = temp_dir / 'extract_metric.sql'
-    
-    # Write the macro call
-    with open(temp_file, 'w') as f:
-        f.write(f"""
--- This is a temporary model to extract metrics
-{{{{ config(enabled=false) }}}}
-
-SELECT 
-    {{{{ dbt_cicd_toolkit.get_test_coverage_metric('{metric}') }}}}
-""")
-    
-    # Run the macro
-    result = run_dbt_command(args, 'compile', ['--models', 'extract_metric'])
-    
-    # Parse the result
     try:
-        # Extract the numeric value
-        for line in result.split('\n'):
-            if line.strip().replace('.', '', 1).isdigit():
-                return float(line.strip())
-        
-        print("Error: Could not find numeric value in dbt compile result")
-        return None
-    except Exception as e:
+        value = get_runner(args.dbt_project_dir).run_macro(
+            'dbt_cicd_toolkit.get_test_coverage_metric', {'metric_name': metric}
+        )
+    except DbtCommandError as e:
         print(f"Error extracting metric: {e}")
         return None
 
+    if value is None:
+        print("Error: Macro returned no value")
+        return None
+
+    return float(value)
+
+
+def write_output(args, text):
+    """Write text to --output, or print it."""
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text if text.endswith('\n') else text + '\n')
+        print(f"Wrote test coverage to {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
 
 def main():
     args = parse_arguments()
-    metric = args.metric
-    
-    if args.use_table:
-        value = extract_coverage_metric_from_table(args, metric)
+    metrics = COVERAGE_METRICS if args.all else args.metric
+    output_format = args.output_format or ('value' if len(metrics) == 1 else 'json')
+
+    if args.use_table or args.use_macro:
+        if output_format == 'csv':
+            print("Error: CSV output requires the per-model breakdown, which is only computed from the manifest")
+            return 1
+        if args.use_table:
+            values = extract_coverage_metrics_from_table(args, metrics)
+        else:
+            values = {metric: extract_coverage_metric_from_macro(args, metric) for metric in metrics}
+        if values is None or any(value is None for value in values.values()):
+            print(f"Failed to extract {', '.join(metrics)}")
+            return 1
+        coverage = {'metrics': values}
     else:
-        value = extract_coverage_metric_from_macro(args, metric)
-    
-    if value is not None:
-        print(value)
-        return 0
+        coverage = extract_coverage_from_manifest(args)
+        if not args.all and output_format != 'csv':
+            coverage = {'metrics': {metric: coverage['metrics'][metric] for metric in metrics}}
+
+    if output_format == 'value':
+        write_output(args, '\n'.join(str(coverage['metrics'][metric]) for metric in metrics))
     else:
-        print(f"Failed to extract {metric}")
-        return 1
+        write_output(args, format_coverage(coverage, output_format))
+    return 0
 
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Failure-probability prioritization of planned dbt tests.
+
+Every selective test run is recorded in a local history directory. From
+that history each planned test gets an estimated probability of failing,
+based on its recent failure rate and on whether it directly tests a
+changed node, and tests are ordered by probability per second of
+runtime. Running them in that order, in growing batches, surfaces the
+most likely failures first.
+"""
+
+import json
+import os
+import time
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.result_cache import DEFAULT_CACHE_DIR
+from dbt_cicd_toolkit.scripts.shard_runner import DEFAULT_TEST_DURATION
+
+DEFAULT_HISTORY_DIR = os.path.join(DEFAULT_CACHE_DIR, 'history')
+DEFAULT_HISTORY_RUNS = 50
+DEFAULT_PRIORITY_BATCHES = 3
+
+# Weight of each older run relative to the next newer one
+HISTORY_DECAY = 0.8
+# Failure rate assumed before a test has any history, worth PRIOR_RUNS runs
+PRIOR_FAILURE_RATE = 0.05
+PRIOR_RUNS = 1.0
+# Chance that a test directly on a changed node fails regardless of its history
+CHANGED_NODE_FAILURE_RATE = 0.2
+
+FAILING_STATUSES = ('fail', 'error', 'runtime error')
+HISTORY_FIELDS = ('unique_id', 'status', 'execution_time')
+
+
+def history_files(history_dir=DEFAULT_HISTORY_DIR):
+    """Return the recorded run_results files, oldest first."""
+    history_dir = Path(history_dir)
+    if not history_dir.is_dir():
+        return []
+    return sorted(history_dir.glob('run_results_*.json'))
+
+
+def record_history(run_results, history_dir=DEFAULT_HISTORY_DIR, keep=DEFAULT_HISTORY_RUNS):
+    """Add the executed results of a run to the history and prune the oldest runs."""
+    results = [{field: result.get(field) for field in HISTORY_FIELDS}
+               for result in run_results.get('results', [])
+               if result.get('unique_id') and not result.get('cached')]
+    if not results:
+        return None
+    history_dir = Path(history_dir)
+    history_dir.mkdir(parents=True, exist_ok=True)
+    path = history_dir / f'run_results_{time.time_ns()}.json'
+    temp_path = path.with_name(f'.{path.name}.{os.getpid()}.tmp')
+    with open(temp_path, 'w') as f:
+        json.dump({'metadata': run_results.get('metadata', {}), 'results': results}, f)
+    os.replace(temp_path, path)
+
+    for old_path in history_files(history_dir)[:-keep] if keep else []:
+        old_path.unlink(missing_ok=True)
+    return path
+
+
+def load_test_history(run_results_paths):
+    """Return {unique_id: {'runs', 'failures', 'duration'}} from run_results files.
+
+    Pass paths oldest first. Runs and failures are weighted so that each
+    older run counts HISTORY_DECAY times as much as the next one, and
+    duration is the most recent execution time.
+    """
+    paths = [Path(path) for path in run_results_paths if Path(path).exists()]
+    history = {}
+    for age, path in enumerate(reversed(paths)):
+        weight = HISTORY_DECAY ** age
+        try:
+            with open(path, 'r') as f:
+                run_results = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read test history from {path}: {e}")
+            continue
+        for result in run_results.get('results', []):
+            unique_id = result.get('unique_id')
+            if not unique_id or result.get('cached'):
+                continue
+            stats = history.setdefault(unique_id, {'runs': 0.0, 'failures': 0.0, 'duration': None})
+            stats['runs'] += weight
+            if result.get('status') in FAILING_STATUSES:
+                stats['failures'] += weight
+            if stats['duration'] is None and result.get('execution_time') is not None:
+                stats['duration'] = float(result['execution_time'])
+    return history
+
+
+def failure_probability(stats, touches_changed=False):
+    """Estimate the probability that a test fails from its history stats."""
+    stats = stats or {}
+    probability = ((stats.get('failures', 0.0) + PRIOR_FAILURE_RATE * PRIOR_RUNS)
+                   / (stats.get('runs', 0.0) + PRIOR_RUNS))
+    if touches_changed:
+        probability = 1 - (1 - probability) * (1 - CHANGED_NODE_FAILURE_RATE)
+    return probability
+
+
+def prioritize_tests(test_ids, history, graph=None, changed_ids=()):
+    """Return [(test_id, probability, duration)] with the likeliest failures per second first.
+
+    Ordering by probability divided by duration minimizes the expected
+    time until the first failure is reported. Tests without a recorded
+    duration are costed at the median known duration.
+    """
+    changed_ids = set(changed_ids)
+    known = sorted(history[t]['duration'] for t in test_ids
+                   if t in history and history[t]['duration'] is not None)
+    default_duration = known[len(known) // 2] if known else DEFAULT_TEST_DURATION
+
+    ranked = []
+    for test_id in test_ids:
+        stats = history.get(test_id)
+        touches_changed = graph is not None and any(parent in changed_ids
+                                                    for parent in graph.parents.get(test_id, []))
+        duration = stats['duration'] if stats and stats['duration'] is not None else default_duration
+        ranked.append((test_id, failure_probability(stats, touches_changed), duration))
+    ranked.sort(key=lambda item: (-item[1] / max(item[2], 0.001), item[0]))
+    return ranked
+
+
+def priority_batches(test_ids, batch_count=DEFAULT_PRIORITY_BATCHES):
+    """Split ordered test_ids into batches that double in size.
+
+    Small early batches report the likeliest failures quickly, while the
+    number of dbt invocations stays at batch_count.
+    """
+    batch_count = max(1, min(batch_count, len(test_ids)))
+    total_weight = 2 ** batch_count - 1
+    batches = []
+    start = 0
+    for i in range(batch_count):
+        end = len(test_ids) if i == batch_count - 1 else max(
+            start + 1, round(len(test_ids) * (2 ** (i + 1) - 1) / total_weight))
+        batches.append(test_ids[start:end])
+        start = end
+    return [batch for batch in batches if batch]
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Persistent on-disk graph index for dbt-ci-cd-toolkit.
+
+The index lives next to the manifest under target/ and is keyed by the
+manifest's content hash, so repeated toolkit calls in a CI job skip
+re-reading manifest.json until it changes.
+"""
+
+import hashlib
+import os
+import pickle
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.manifest_graph import ManifestGraph
+
+INDEX_VERSION = 8
+INDEX_DIR_NAME = 'dbt_cicd_toolkit'
+INDEX_FILE_NAME = 'graph_index.pickle'
+
+
+def default_index_path(manifest_path):
+    """Return the index location for a manifest."""
+    return Path(manifest_path).parent / INDEX_DIR_NAME / INDEX_FILE_NAME
+
+
+def hash_manifest(manifest_path, chunk_size=1024 * 1024):
+    """Return the sha256 hex digest of a manifest file."""
+    digest = hashlib.sha256()
+    with open(manifest_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def manifest_stat(manifest_path):
+    """Return the size and mtime used to tell whether a manifest changed."""
+    stat = os.stat(manifest_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def read_index(index_path, version=INDEX_VERSION):
+    """Read an index file, returning None if it is missing, unreadable or of another version."""
+    try:
+        with open(index_path, 'rb') as f:
+            index = pickle.load(f)
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get('version') != version:
+        return None
+    return index
+
+
+def write_index(index_path, index):
+    """Atomically write an index file so concurrent readers never see a partial file."""
+    index_path = Path(index_path)
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = index_path.with_name(f"{index_path.name}.{os.getpid()}.tmp")
+    with open(temp_path, 'wb') as f:
+        pickle.dump(index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, index_path)
+
+
+def build_index(manifest_path, manifest_hash=None):
+    """Parse a manifest and return a fresh index for it."""
+    graph = ManifestGraph.from_manifest(manifest_path)
+    return {
+        'version': INDEX_VERSION,
+        'manifest_hash': manifest_hash or hash_manifest(manifest_path),
+        'manifest_stat': manifest_stat(manifest_path),
+        'graph': graph.to_index()
+    }
+
+
+def load_or_build_index(manifest_path, index_path=None):
+    """Return the graph for a manifest, rebuilding the index when it is stale.
+
+    A matching size and mtime is trusted without re-hashing; otherwise the
+    manifest is hashed and the index is only rebuilt if the content changed.
+    """
+    index_path = index_path or default_index_path(manifest_path)
+    index = read_index(index_path)
+    stat = manifest_stat(manifest_path)
+
+    if index is not None and index['manifest_stat'] == stat:
+        return ManifestGraph.from_index(index['graph'])
+
+    manifest_hash = hash_manifest(manifest_path)
+    if index is not None and index['manifest_hash'] == manifest_hash:
+        index['manifest_stat'] = stat
+    else:
+        index = build_index(manifest_path, manifest_hash)
+
+    try:
+        write_index(index_path, index)
+    except OSError as e:
+        print(f"Warning: Could not write graph index to {index_path}: {e}")
+
+    return ManifestGraph.from_index(index['graph'])
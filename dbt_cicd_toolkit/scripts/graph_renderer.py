@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Pipeline graph renderer for dbt-ci-cd-toolkit.
+
+Renders the model DAG from the cached manifest graph as Mermaid, DOT or
+JSON without invoking dbt. Large DAGs can be cut down to a depth-limited
+neighbourhood of a selection or to the models impacted by a change,
+collapsed into directory or package clusters, and simplified with a
+transitive reduction. Output is streamed line by line.
+"""
+
+import json
+import posixpath
+import re
+from collections import deque
+
+RENDER_FORMATS = ('mermaid', 'dot', 'json')
+CLUSTER_KEYS = ('directory', 'package')
+
+
+def _clean_id(value):
+    """Return an identifier that is safe in Mermaid and DOT."""
+    return re.sub(r'[^0-9A-Za-z_]', '_', value)
+
+
+class _IdAllocator:
+    """Map keys to distinct safe identifiers.
+
+    Cleaning can map different keys to the same identifier (models/a_b and
+    models/a/b), so a later key that collides gets a numeric suffix.
+    """
+
+    def __init__(self):
+        self.ids = {}
+        self.taken = set()
+
+    def get(self, key, value):
+        if key not in self.ids:
+            base = _clean_id(value)
+            node_id = base
+            suffix = 2
+            while node_id in self.taken:
+                node_id = f'{base}_{suffix}'
+                suffix += 1
+            self.ids[key] = node_id
+            self.taken.add(node_id)
+        return self.ids[key]
+
+
+def _is_model(graph, unique_id):
+    node = graph.nodes.get(unique_id)
+    return node is not None and node['resource_type'] == 'model'
+
+
+def model_parents(graph, unique_id):
+    """Return the direct upstream models of a node."""
+    return [p for p in graph.parents.get(unique_id, []) if _is_model(graph, p)]
+
+
+def model_children(graph, unique_id):
+    """Return the direct downstream models of a node."""
+    return [c for c in graph.get_children(unique_id) if _is_model(graph, c)]
+
+
+def select_models(graph, models=None, depth=None, direction='both'):
+    """Return the unique_ids of the models to render.
+
+    Without a selection every model is returned. With one, the selected
+    models are expanded upstream and/or downstream by at most `depth`
+    hops (unlimited when depth is None).
+    """
+    if not models:
+        return [uid for uid in graph.nodes if _is_model(graph, uid)]
+
+    seeds = [graph.get_model_id(name) for name in models]
+    missing = [name for name, uid in zip(models, seeds) if uid is None]
+    if missing:
+        raise ValueError(f"Unknown models: {', '.join(missing)}")
+
+    selected = dict.fromkeys(seeds)
+    steps = []
+    if direction in ('up', 'both'):
+        steps.append(model_parents)
+    if direction in ('down', 'both'):
+        steps.append(model_children)
+    for step in steps:
+        queue = deque((uid, 0) for uid in seeds)
+        seen = set(seeds)
+        while queue:
+            uid, distance = queue.popleft()
+            if depth is not None and distance >= depth:
+                continue
+            for neighbour in step(graph, uid):
+                if neighbour not in seen:
+                    seen.add(neighbour)
+                    selected[neighbour] = None
+                    queue.append((neighbour, distance + 1))
+    return list(selected)
+
+
+def build_view(graph, model_ids, cluster_by=None):
+    """Return (nodes, edges) for the selected models.
+
+    nodes maps a render id to {'id', 'label', 'type', 'models'}; edges maps
+    (source id, target id) to the number of model edges it stands for.
+    With cluster_by, models are collapsed into one node per directory or
+    package, and edges inside a cluster are dropped.
+    """
+    selected = set(model_ids)
+    ids = _IdAllocator()
+
+    def group_of(unique_id):
+        node = graph.nodes[unique_id]
+        if cluster_by == 'directory':
+            key = posixpath.dirname(node.get('original_file_path') or '') or '.'
+        elif cluster_by == 'package':
+            key = node.get('package_name') or '.'
+        else:
+            return ids.get(unique_id, node['name']), node['name'], 'model'
+        return ids.get(('cluster', key), f'cluster_{key}'), key, 'cluster'
+
+    nodes = {}
+    members = {}
+    for unique_id in model_ids:
+        node_id, label, node_type = group_of(unique_id)
+        members[unique_id] = node_id
+        entry = nodes.setdefault(node_id, {'id': node_id, 'label': label, 'type': node_type, 'models': 0})
+        entry['models'] += 1
+
+    edges = {}
+    for unique_id in model_ids:
+        target = members[unique_id]
+        for parent in model_parents(graph, unique_id):
+            if parent in selected and members[parent] != target:
+                key = (members[parent], target)
+                edges[key] = edges.get(key, 0) + 1
+    return nodes, edges
+
+
+def transitive_reduction(nodes, edges):
+    """Drop every edge u -> v for which another path from u to v exists.
+
+    Reachability sets are kept as integer bitsets and built in reverse
+    topological order, so the reduction is a single pass over the DAG.
+    """
+    index = {node_id: i for i, node_id in enumerate(nodes)}
+    children = {node_id: [] for node_id in nodes}
+    pending = dict.fromkeys(nodes, 0)
+    for source, target in edges:
+        children[source].append(target)
+        pending[source] += 1
+
+    # Reverse topological order: a node is processed after all its children
+    reach = {}
+    parents = {node_id: [] for node_id in nodes}
+    for source, target in edges:
+        parents[target].append(source)
+    queue = deque(node_id for node_id, count in pending.items() if count == 0)
+    while queue:
+        node_id = queue.popleft()
+        bits = 0
+        for child in children[node_id]:
+            bits |= reach[child] | (1 << index[child])
+        reach[node_id] = bits
+        for parent in parents[node_id]:
+            pending[parent] -= 1
+            if pending[parent] == 0:
+                queue.append(parent)
+
+    if len(reach) < len(nodes):
+        # Clustering can create cycles; leave such graphs unreduced
+        return dict(edges)
+
+    reduced = {}
+    for source in nodes:
+        # A DAG node never reaches itself, so a child is redundant exactly
+        # when another child reaches it
+        via_children = 0
+        for child in children[source]:
+            via_children |= reach[child]
+        for target in children[source]:
+            if not via_children >> index[target] & 1:
+                reduced[(source, target)] = edges[(source, target)]
+    return reduced
+
+
+def iter_mermaid(nodes, edges, environments=None):
+    """Yield the lines of a Mermaid flowchart."""
+    yield 'graph TD'
+    for node in nodes.values():
+        if node['type'] == 'cluster':
+            yield f'    {node["id"]}[["{node["label"]} ({node["models"]} models)"]]'
+        else:
+            yield f'    {node["id"]}["{node["label"]}"]'
+    for (source, target), count in edges.items():
+        label = f'|{count}|' if count > 1 else ''
+        yield f'    {source} -->{label} {target}'
+    for node_id, environment in (environments or []):
+        env_id = f'{environment}_{node_id}'
+        yield f'    {env_id}({environment})'
+        yield f'    {node_id} --> {env_id}:::promoted'
+    yield '    classDef promoted fill:#afa,stroke:#5a5,stroke-width:2px'
+
+
+def iter_dot(nodes, edges, environments=None):
+    """Yield the lines of a Graphviz DOT digraph."""
+    yield 'digraph CI_CD_Pipeline {'
+    yield '    rankdir=TB;'
+    yield '    node [shape=box, style=filled, fillcolor=lightblue];'
+    for node in nodes.values():
+        if node['type'] == 'cluster':
+            yield (f'    "{node["id"]}" [label="{node["label"]}\\n{node["models"]} models", '
+                   f'shape=box3d, fillcolor=lightyellow];')
+        else:
+            yield f'    "{node["id"]}" [label="{node["label"]}"];'
+    for (source, target), count in edges.items():
+        attributes = f' [label="{count}", penwidth={min(1 + count / 10, 5):g}]' if count > 1 else ''
+        yield f'    "{source}" -> "{target}"{attributes};'
+    for node_id, environment in (environments or []):
+        env_id = f'{environment}_{node_id}'
+        yield f'    "{env_id}" [label="{environment}", shape=ellipse, fillcolor=lightgreen];'
+        yield f'    "{node_id}" -> "{env_id}";'
+    yield '}'
+
+
+def iter_json(nodes, edges, environments=None):
+    """Yield a JSON document of nodes and edges in chunks."""
+    yield '{"nodes": ['
+    first = True
+    for node in nodes.values():
+        yield ('' if first else ',\n') + json.dumps(node)
+        first = False
+    for node_id, environment in (environments or []):
+        yield ('' if first else ',\n') + json.dumps(
+            {'id': f'{environment}_{node_id}', 'label': environment, 'type': 'environment', 'promoted': True})
+        first = False
+    yield '],\n"edges": ['
+    first = True
+    for (source, target), count in edges.items():
+        yield ('' if first else ',\n') + json.dumps(
+            {'source': source, 'target': target, 'type': 'dependency', 'count': count})
+        first = False
+    for node_id, environment in (environments or []):
+        yield ('' if first else ',\n') + json.dumps(
+            {'source': node_id, 'target': f'{environment}_{node_id}', 'type': 'promotion'})
+        first = False
+    yield ']}'
+
+
+RENDERERS = {'mermaid': iter_mermaid, 'dot': iter_dot, 'json': iter_json}
+
+
+def promoted_environments(status, nodes, graph, model_ids):
+    """Return (node id, environment) pairs for promoted models in the view."""
+    names = {graph.nodes[uid]['name'] for uid in model_ids}
+    node_ids = {}
+    for node in nodes.values():
+        if node['type'] == 'model':
+            node_ids.setdefault(node['label'], []).append(node['id'])
+    pairs = []
+    for environment, models in status.items():
+        for name, model_status in models.items():
+            if model_status.get('promoted') and name in names:
+                pairs.extend((node_id, environment) for node_id in node_ids.get(name, []))
+    return pairs
+
+
+def render_graph(out, nodes, edges, output_format='mermaid', environments=None):
+    """Stream a rendered graph to a writable text file."""
+    separator = '' if output_format == 'json' else '\n'
+    for chunk in RENDERERS[output_format](nodes, edges, environments):
+        out.write(chunk + separator)
+    if output_format == 'json':
+        out.write('\n')
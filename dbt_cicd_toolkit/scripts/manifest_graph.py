@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Python graph engine built directly from dbt's target/manifest.json.
+
+This mirrors the impact analysis macros without starting a dbt process.
+"""
+
+import json
+import sys
+from fnmatch import fnmatchcase
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.dag import CompactDag
+from dbt_cicd_toolkit.scripts.manifest_reader import read_manifest
+
+
+GLOB_CHARS = '*?['
+
+
+def normalize_path(file_path):
+    """Normalize a file path the same way the macros do."""
+    return file_path.replace('\\', '/')
+
+
+def is_path_pattern(file_path):
+    """Return True if a changed-file entry is a glob pattern rather than a path."""
+    return any(char in file_path for char in GLOB_CHARS)
+
+
+def read_changed_files(path):
+    """Return the changed files listed one per line in a file, or on stdin for '-'."""
+    f = sys.stdin if path == '-' else open(path, 'r')
+    try:
+        return list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+class PathTrie:
+    """Prefix trie of file paths, one level per path segment.
+
+    Matching a directory or a glob only visits the subtrees that can
+    match, instead of comparing the pattern with every file path.
+    """
+
+    def __init__(self, paths=None):
+        self.root = {}
+        for path, values in (paths or {}).items():
+            self.add(path, values)
+
+    def add(self, path, values):
+        """Add values under a normalized file path."""
+        node = self.root
+        for part in path.split('/'):
+            node = node.setdefault(part, {})
+        # The None key holds the values of the path ending at this node
+        node.setdefault(None, []).extend(values)
+
+    @staticmethod
+    def _collect(node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for key, child in node.items():
+                if key is None:
+                    yield from child
+                else:
+                    stack.append(child)
+
+    def match(self, pattern):
+        """Return the values under a file path, a directory, or a glob.
+
+        Glob segments use fnmatch rules within one path segment, and `**`
+        matches any number of segments, so `models/staging/**` matches
+        everything below models/staging.
+        """
+        parts = normalize_path(pattern).strip('/').split('/')
+        node = self.root
+        i = 0
+        while i < len(parts) and not is_path_pattern(parts[i]):
+            node = node.get(parts[i])
+            if node is None:
+                return []
+            i += 1
+        if i == len(parts):
+            return list(self._collect(node))
+
+        values = []
+        stack = [(node, i)]
+        seen = set()
+        while stack:
+            node, i = stack.pop()
+            if (id(node), i) in seen:
+                continue
+            seen.add((id(node), i))
+            if i == len(parts):
+                values.extend(node.get(None, []))
+                continue
+            part = parts[i]
+            if part == '**':
+                stack.append((node, i + 1))
+                stack.extend((child, i) for key, child in node.items() if key is not None)
+            else:
+                stack.extend((child, i + 1) for key, child in node.items()
+                             if key is not None and fnmatchcase(key, part))
+        return list(dict.fromkeys(values))
+
+
+def default_manifest_path(project_dir='.'):
+    """Return the default manifest location for a dbt project."""
+    return Path(project_dir) / 'target' / 'manifest.json'
+
+
+class ManifestGraph:
+    """Node, file path and dependency index over a dbt manifest."""
+
+    def __init__(self, nodes, sources, dag=None, macros=None, project_name=None):
+        self.nodes = nodes
+        self.sources = sources
+        self.macros = macros or {}
+        self.project_name = project_name
+        self.parents = {}
+        self.path_index = {}
+        self.source_path_index = {}
+        self.model_tests = {}
+        self.model_ids = {}
+
+        for node_id, node in nodes.items():
+            if node['resource_type'] == 'model':
+                self.model_ids.setdefault(node['name'], node_id)
+            if node.get('original_file_path'):
+                path = normalize_path(node['original_file_path'])
+                self.path_index.setdefault(path, []).append(node_id)
+            self.parents[node_id] = node['depends_on']['nodes']
+            if node['resource_type'] == 'test':
+                for upstream_id in self.parents[node_id]:
+                    self.model_tests.setdefault(upstream_id, []).append(node_id)
+
+        for source_id, source in sources.items():
+            self.parents[source_id] = []
+            if source.get('original_file_path'):
+                path = normalize_path(source['original_file_path'])
+                self.source_path_index.setdefault(path, []).append(source_id)
+
+        self.dag = dag or CompactDag.from_parents(self.parents)
+        self._path_trie = None
+
+    @classmethod
+    def from_manifest(cls, manifest_path):
+        """Load a graph from a manifest.json file using the streaming reader."""
+        manifest = read_manifest(manifest_path, sections=('metadata', 'nodes', 'sources', 'macros'))
+        return cls(manifest['nodes'], manifest['sources'], macros=manifest['macros'],
+                   project_name=manifest['metadata'].get('project_name'))
+
+    def to_index(self):
+        """Return the plain data needed to rebuild this graph."""
+        return {'nodes': self.nodes, 'sources': self.sources, 'macros': self.macros,
+                'dag': self.dag.to_index(), 'project_name': self.project_name}
+
+    @classmethod
+    def from_index(cls, data):
+        """Rebuild a graph from the output of to_index."""
+        return cls(data['nodes'], data['sources'], CompactDag.from_index(data['dag']), data['macros'],
+                   data['project_name'])
+
+    def _unindex_node(self, unique_id, node):
+        """Remove a node from the path and test indexes."""
+        if node.get('original_file_path'):
+            path_ids = self.path_index.get(normalize_path(node['original_file_path']), [])
+            if unique_id in path_ids:
+                path_ids.remove(unique_id)
+        if node['resource_type'] == 'test':
+            for upstream_id in node['depends_on']['nodes']:
+                tests = self.model_tests.get(upstream_id, [])
+                if unique_id in tests:
+                    tests.remove(unique_id)
+
+    def _unindex_name(self, unique_id, name):
+        """Stop resolving a model name to a node that no longer has it."""
+        if self.model_ids.get(name) != unique_id:
+            return
+        del self.model_ids[name]
+        # Another model with the same name, e.g. in another package, takes over
+        for other_id, other in self.nodes.items():
+            if other_id != unique_id and other['resource_type'] == 'model' and other['name'] == name:
+                self.model_ids[name] = other_id
+                break
+
+    def update_node(self, unique_id, node):
+        """Add or replace one node, updating the indexes for that node only.
+
+        The compact DAG is rebuilt only when the node's dependencies change.
+        Returns True if they did.
+        """
+        previous = self.nodes.get(unique_id)
+        if previous is not None:
+            self._unindex_node(unique_id, previous)
+            if previous['name'] != node['name'] or node['resource_type'] != 'model':
+                self._unindex_name(unique_id, previous['name'])
+
+        self.nodes[unique_id] = node
+        self._path_trie = None
+        if node['resource_type'] == 'model':
+            self.model_ids.setdefault(node['name'], unique_id)
+        if node.get('original_file_path'):
+            self.path_index.setdefault(normalize_path(node['original_file_path']), []).append(unique_id)
+        if node['resource_type'] == 'test':
+            for upstream_id in node['depends_on']['nodes']:
+                self.model_tests.setdefault(upstream_id, []).append(unique_id)
+
+        old_parents = self.parents.get(unique_id)
+        self.parents[unique_id] = node['depends_on']['nodes']
+        if old_parents is not None and sorted(old_parents) == sorted(self.parents[unique_id]):
+            return False
+        self.dag = CompactDag.from_parents(self.parents)
+        return True
+
+    def remove_node(self, unique_id):
+        """Remove a node and its indexes, rebuilding the compact DAG."""
+        node = self.nodes.pop(unique_id, None)
+        if node is None:
+            return
+        self._unindex_node(unique_id, node)
+        self._unindex_name(unique_id, node['name'])
+        self._path_trie = None
+        del self.parents[unique_id]
+        self.dag = CompactDag.from_parents(self.parents)
+
+    def get_node(self, unique_id):
+        """Return a node or source by unique_id."""
+        return self.nodes.get(unique_id) or self.sources.get(unique_id)
+
+    def get_model_id(self, model_name):
+        """Return the unique_id of a model by name, or None."""
+        return self.model_ids.get(model_name)
+
+    def path_trie(self):
+        """Return a prefix trie over the file paths of every node and source, built on first use."""
+        if self._path_trie is None:
+            self._path_trie = PathTrie(self.path_index)
+            for path, source_ids in self.source_path_index.items():
+                self._path_trie.add(path, source_ids)
+        return self._path_trie
+
+    def find_nodes_by_files(self, source_files, include_sources=True):
+        """Return the unique_ids of nodes defined in the given files.
+
+        Entries may also be directories or glob patterns such as
+        `models/staging/**`, which are matched against a prefix trie of
+        node file paths.
+        """
+        node_ids = []
+        for file_path in source_files:
+            file_path = normalize_path(file_path)
+            if file_path in self.path_index or file_path in self.source_path_index:
+                node_ids.extend(self.path_index.get(file_path, []))
+                if include_sources:
+                    node_ids.extend(self.source_path_index.get(file_path, []))
+            else:
+                node_ids.extend(node_id for node_id in self.path_trie().match(file_path)
+                                if include_sources or node_id not in self.sources)
+        return list(dict.fromkeys(node_ids))
+
+    def get_children(self, node_id):
+        """Return the unique_ids of the direct children of a node."""
+        if node_id not in self.dag.index:
+            return []
+        return [self.dag.ids[i] for i in self.dag.children(self.dag.index[node_id])]
+
+    def get_downstream(self, node_ids):
+        """Return every node transitively downstream of node_ids, in BFS order."""
+        order, _ = self.dag.closure(self.dag.intern(node_ids))
+        return [self.dag.ids[i] for i in order]
+
+    def get_upstream(self, node_ids):
+        """Return every node transitively upstream of node_ids, in BFS order."""
+        order, _ = self.dag.closure(self.dag.intern(node_ids), upstream=True)
+        return [self.dag.ids[i] for i in order]
+
+    def topological_waves(self, node_ids):
+        """Group node_ids into waves so each node comes after its upstream node_ids."""
+        return [[self.dag.ids[i] for i in wave] for wave in self.dag.waves(self.dag.intern(node_ids))]
+
+    def get_impacted_models(self, source_files, include_sources=True,
+                            include_downstream=True, exclude_current=False):
+        """Return the names of models impacted by changes to source_files.
+
+        Matches the semantics of the get_impacted_models macro, but follows
+        the full transitive downstream closure.
+        """
+        modified_ids = self.find_nodes_by_files(source_files, include_sources)
+        return self.get_impacted_models_by_ids(modified_ids, include_downstream, exclude_current)
+
+    def get_impacted_models_by_ids(self, modified_ids, include_downstream=True, exclude_current=False):
+        """Return the names of models impacted by changes to the given nodes."""
+        impacted_ids = []
+        if not exclude_current:
+            impacted_ids.extend(modified_ids)
+        if include_downstream:
+            impacted_ids.extend(self.get_downstream(modified_ids))
+
+        impacted_models = []
+        seen = set()
+        for node_id in impacted_ids:
+            node = self.get_node(node_id)
+            if node and node.get('resource_type') == 'model' and node['name'] not in seen:
+                seen.add(node['name'])
+                impacted_models.append(node['name'])
+        return impacted_models
+
+
+_loaded_graphs = {}
+
+
+def load_graph(project_dir='.', manifest_path=None, use_cache=True):
+    """Load the manifest graph for a project, exiting if no manifest exists.
+
+    The graph is served from the on-disk index under target/ when it is
+    still current for the manifest, and the index is rebuilt otherwise.
+    """
+    manifest_path = Path(manifest_path) if manifest_path else default_manifest_path(project_dir)
+    if not manifest_path.exists():
+        print(f"Error: Manifest not found at {manifest_path}. Run 'dbt parse' or 'dbt compile' first.")
+        sys.exit(1)
+
+    if not use_cache:
+        return ManifestGraph.from_manifest(manifest_path)
+
+    # Keep graphs in memory for long-running processes such as the daemon
+    key = str(manifest_path.resolve())
+    stat = manifest_path.stat()
+    cached = _loaded_graphs.get(key)
+    if cached and cached[0] == (stat.st_size, stat.st_mtime_ns):
+        return cached[1]
+
+    from dbt_cicd_toolkit.scripts.graph_index import load_or_build_index
+    graph = load_or_build_index(manifest_path)
+    _loaded_graphs[key] = ((stat.st_size, stat.st_mtime_ns), graph)
+    return graph
+
+
+def format_impact(source_files, impacted_models, output_format='text', state_changes=None,
+                  impacted_columns=None):
+    """Format impact analysis results like the visualize_impact macro.
+
+    state_changes, from a --state comparison, maps unique_ids to the
+    reasons they differ from the state manifest. impacted_columns maps
+    impacted model names to their impacted columns ('*' for all).
+    """
+    if output_format == 'json':
+        result = {'source_files': source_files, 'impacted_models': impacted_models}
+        if state_changes is not None:
+            result['state_changes'] = state_changes
+        if impacted_columns is not None:
+            result['impacted_columns'] = impacted_columns
+        return json.dumps(result)
+
+    def describe(model):
+        if impacted_columns is None:
+            return None
+        return ', '.join(impacted_columns[model]).replace('*', 'all columns')
+
+    if output_format == 'markdown':
+        output = ["# Impact Analysis Results", "", "## Source Files"]
+        output.extend(f"- `{f}`" for f in source_files)
+        if state_changes is not None:
+            output.extend(["", "## State Changes"])
+            output.extend(f"- `{node_id}`: {', '.join(reasons)}" for node_id, reasons in state_changes.items())
+        output.extend(["", "## Impacted Models"])
+        if impacted_models:
+            output.extend(f"- `{model}`" + (f": {describe(model)}" if describe(model) else "")
+                          for model in impacted_models)
+        else:
+            output.append("*No models impacted*")
+        return '\n'.join(output)
+
+    output = ["Impact Analysis Results:", "=======================", "Source Files:"]
+    output.extend(f"  - {f}" for f in source_files)
+    if state_changes is not None:
+        output.extend(["", "State Changes:"])
+        output.extend(f"  - {node_id}: {', '.join(reasons)}" for node_id, reasons in state_changes.items())
+    output.extend(["", "Impacted Models:"])
+    if impacted_models:
+        output.extend(f"  - {model}" + (f" ({describe(model)})" if describe(model) else "")
+                      for model in impacted_models)
+    else:
+        output.append("  No models impacted")
+    return '\n'.join(output)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Streaming reader for dbt's manifest.json.
+
+Manifests for large projects can be hundreds of megabytes, most of it
+compiled SQL, docs and column descriptions the toolkit never looks at.
+This reader decodes the manifest one top-level member at a time and keeps
+only a projection of each node, so peak memory grows with the size of the
+graph rather than the size of the file.
+"""
+
+import hashlib
+import json
+import re
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r'[ \t\n\r]*')
+
+
+class ManifestStream:
+    """Incremental JSON tokenizer over a text file."""
+
+    def __init__(self, f, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, min_size=None):
+        """Drop consumed input and read at least min_size more characters."""
+        chunk = self.f.read(max(min_size or 0, self.chunk_size))
+        if not chunk:
+            self.eof = True
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+
+    def _skip_whitespace(self):
+        while True:
+            self.pos = _WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer) or self.eof:
+                return
+            self._fill()
+
+    def _next_char(self):
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of manifest")
+        char = self.buffer[self.pos]
+        self.pos += 1
+        return char
+
+    def peek_char(self):
+        """Return the next non-whitespace character without consuming it."""
+        self._skip_whitespace()
+        if self.pos >= len(self.buffer):
+            raise ValueError("Unexpected end of manifest")
+        return self.buffer[self.pos]
+
+    def _expect(self, expected):
+        char = self._next_char()
+        if char != expected:
+            raise ValueError(f"Expected '{expected}' in manifest, found '{char}'")
+
+    def read_value(self):
+        """Decode the next complete JSON value."""
+        self._skip_whitespace()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+                # Grow geometrically so a single huge value is read in O(n)
+                self._fill(len(self.buffer))
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # A number at the end of the buffer may be truncated
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def iter_object(self):
+        """Yield the keys of the next JSON object.
+
+        The caller must consume each member's value with read_value or
+        iter_object before advancing to the next key.
+        """
+        self._expect('{')
+        if self.peek_char() == '}':
+            self.pos += 1
+            return
+        while True:
+            key = self.read_value()
+            self._expect(':')
+            yield key
+            char = self._next_char()
+            if char == '}':
+                return
+            if char != ',':
+                raise ValueError(f"Expected ',' or '}}' in manifest, found '{char}'")
+
+    def skip_value(self):
+        """Consume the next value, streaming through objects member by member."""
+        if self.peek_char() == '{':
+            for _ in self.iter_object():
+                self.skip_value()
+        else:
+            self.read_value()
+
+
+def hash_value(value):
+    """Return a stable sha256 hex digest of a JSON-serializable value."""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def project_node(node):
+    """Keep only the node fields the toolkit relies on."""
+    depends_on = node.get('depends_on') or {}
+    checksum = node.get('checksum') or {}
+    test_metadata = node.get('test_metadata')
+    return {
+        'name': node.get('name'),
+        'fqn': node.get('fqn'),
+        'resource_type': node.get('resource_type'),
+        'original_file_path': node.get('original_file_path'),
+        'package_name': node.get('package_name'),
+        'checksum': checksum.get('checksum') if isinstance(checksum, dict) else checksum,
+        # Unrendered config, like state:modified.configs, so target-specific
+        # values such as schema and database do not count as changes
+        'config_hash': hash_value(node.get('unrendered_config', node.get('config')) or {}),
+        'materialized': (node.get('config') or {}).get('materialized'),
+        'test_metadata': {'name': test_metadata.get('name')} if test_metadata else None,
+        'column_name': node.get('column_name'),
+        'depends_on': {
+            'nodes': list(depends_on.get('nodes') or []),
+            'macros': list(depends_on.get('macros') or [])
+        }
+    }
+
+
+def project_macro(macro):
+    """Keep only the macro fields needed to detect changed macros."""
+    depends_on = macro.get('depends_on') or {}
+    return {
+        'name': macro.get('name'),
+        'package_name': macro.get('package_name'),
+        'original_file_path': macro.get('original_file_path'),
+        'checksum': hashlib.sha256((macro.get('macro_sql') or '').encode('utf-8')).hexdigest(),
+        'depends_on': {'macros': list(depends_on.get('macros') or [])}
+    }
+
+
+def project_metadata(value):
+    """Keep manifest metadata members, which are small, as they are."""
+    return value
+
+
+SECTION_PROJECTIONS = {
+    'nodes': project_node,
+    'sources': project_node,
+    'macros': project_macro,
+    'metadata': project_metadata
+}
+
+
+def iter_manifest_members(manifest_path, sections, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield (section, unique_id, raw_node) for every member of the given sections.
+
+    Every other top-level section is skipped without being held in memory.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        stream = ManifestStream(f, chunk_size)
+        for section in stream.iter_object():
+            if section in sections and stream.peek_char() == '{':
+                for unique_id in stream.iter_object():
+                    yield section, unique_id, stream.read_value()
+            else:
+                stream.skip_value()
+
+
+def read_manifest(manifest_path, project=None, sections=('nodes', 'sources')):
+    """Stream a manifest and return {section: {unique_id: projected_node}}.
+
+    Members are projected with `project` if given, and with the section's
+    entry in SECTION_PROJECTIONS otherwise.
+    """
+    result = {section: {} for section in sections}
+    for section, unique_id, node in iter_manifest_members(manifest_path, sections):
+        result[section][unique_id] = (project or SECTION_PROJECTIONS[section])(node)
+    return result
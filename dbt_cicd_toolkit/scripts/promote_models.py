@@ -4,18 +4,32 @@ Script to promote dbt models to a target environment.
 """
 
 import argparse
+import asyncio
 import json
-import os
-import subprocess
 import sys
+from datetime import datetime
 from pathlib import Path
 
+from dbt_cicd_toolkit.scripts.async_promotion import (
+    DEFAULT_CONCURRENCY,
+    DEFAULT_RETRIES,
+    DEFAULT_TIMEOUT_SECONDS,
+    format_report,
+    promote_environments,
+)
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtCommandError, get_runner
+from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+
 
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Promote dbt models to a target environment.')
-    parser.add_argument('--target-environment', type=str, required=True,
-                        help='Target environment to promote to')
+    target_group = parser.add_mutually_exclusive_group(required=True)
+    target_group.add_argument('--target-environment', type=str,
+                              help='Target environment to promote to')
+    target_group.add_argument('--target-environments', type=str,
+                              help='Comma-separated list of environments to promote to concurrently; '
+                                   'each is validated with dbt test --target <environment>')
     parser.add_argument('--models', type=str, required=True,
                         help='Comma-separated list of models to promote')
     parser.add_argument('--dbt-project-dir', type=str, default='.',
@@ -29,120 +43,277 @@ def parse_arguments():
     parser.add_argument('--output-format', type=str, default='text',
                         choices=['text', 'json', 'markdown'],
                         help='Output format for results')
+    parser.add_argument('--batch', action='store_true',
+                        help='Validate models in topological waves and write one consolidated promotion record')
+    parser.add_argument('--workers', type=int, default=4,
+                        help='Number of dbt test processes per wave in batch mode')
+    parser.add_argument('--durations-from', type=str, nargs='+',
+                        help='Previous run_results.json files used to balance tests within a wave')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY,
+                        help='Number of environments promoted at once with --target-environments')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES,
+                        help='Times to retry an environment whose dbt run errored or timed out')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_SECONDS,
+                        help='Seconds before an environment\'s dbt test run is stopped')
     return parser.parse_args()
 
 
-def run_dbt_command(args, command, additional_args=None):
-    """Run a dbt command and return the result."""
-    if additional_args is None:
-        additional_args = []
-    
-    cmd = ['dbt', command, '--project-dir', args.dbt_project_dir] + additional_args
-    
-    print(f"Running command: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    
-    if result.returncode != 0:
-        print(f"Error running dbt command: {result.stderr}")
-        sys.exit(result.returncode)
-    
-    return result.stdout
+def get_dbt_runner(args):
+    """Get the shared dbt runner for the project."""
+    return get_runner(args.dbt_project_dir)
 
 
 def run_tests_for_models(args, models):
     """Run tests for the specified models."""
-    # Join models with '+'
-    models_arg = '+'.join(models)
-    
-    # Run tests
     print(f"Running tests for models: {models}")
-    result = run_dbt_command(args, 'test', ['--models', models_arg])
+    result = get_dbt_runner(args).invoke('test', ['--select'] + models)
     
-    # Check if any tests failed
-    if "FAIL" in result:
+    # Check the structured results rather than the log output
+    failed = result.failed_results()
+    if failed or not result.success:
         print("Tests failed. Models cannot be promoted.")
+        for test_result in failed:
+            print(f"  {test_result.get('unique_id')}: {test_result.get('status')}")
         return False
     
     print("All tests passed.")
     return True
 
 
+def promotion_status(promotion_result):
+    """Return Success, Partial or Failed for a promotion result."""
+    if not promotion_result['success']:
+        return 'Failed'
+    return 'Success' if promotion_result.get('complete', True) else 'Partial'
+
+
+def print_promotion_result(args, promotion_result):
+    """Print a promotion result in the requested output format."""
+    if args.output_format == 'json':
+        print(json.dumps(promotion_result, indent=2))
+    elif args.output_format == 'markdown':
+        print(f"# Promotion Results\n")
+        print(f"## Target Environment: {promotion_result['target_environment']}\n")
+        print(f"## Models Promoted\n")
+        for model in promotion_result['models']:
+            print(f"- `{model}`")
+        for key, label in (('failed_models', 'Failed Models'), ('skipped_models', 'Skipped Models')):
+            if promotion_result.get(key):
+                print(f"\n## {label}\n")
+                for model in promotion_result[key]:
+                    print(f"- `{model}`")
+        print(f"\n## Timestamp: {promotion_result['timestamp']}")
+        print(f"\n## Status: {promotion_status(promotion_result)}")
+        if args.dry_run:
+            print("\n**Note: This was a dry run. No state was updated.**")
+    else:  # text
+        print(f"Promotion Results:")
+        print(f"  Target Environment: {promotion_result['target_environment']}")
+        print(f"  Models Promoted: {', '.join(promotion_result['models'])}")
+        if promotion_result.get('failed_models'):
+            print(f"  Failed Models: {', '.join(promotion_result['failed_models'])}")
+        if promotion_result.get('skipped_models'):
+            print(f"  Skipped Models: {', '.join(promotion_result['skipped_models'])}")
+        print(f"  Timestamp: {promotion_result['timestamp']}")
+        print(f"  Status: {promotion_status(promotion_result)}")
+        if args.dry_run:
+            print("Note: This was a dry run. No state was updated.")
+
+
+def wave_tests(graph, waves):
+    """Assign each test of the given models to the first wave it depends on.
+
+    A test on several promoted models (e.g. a relationships test) runs
+    once, before any of them is promoted, so if it fails, none of them are.
+    """
+    test_waves = {}
+    for wave_index, wave in enumerate(waves):
+        for model_id in wave:
+            for test_id in graph.model_tests.get(model_id, []):
+                test_waves.setdefault(test_id, wave_index)
+
+    tests = [[] for _ in waves]
+    for test_id, wave_index in sorted(test_waves.items()):
+        tests[wave_index].append(test_id)
+    return tests
+
+
+def validate_wave(args, graph, wave_index, test_ids, durations):
+    """Run a wave's tests in parallel shards and return (run_results, failed results)."""
+    from dbt_cicd_toolkit.scripts.shard_runner import (
+        balance_shards,
+        merge_run_results,
+        run_test_shards,
+    )
+    
+    print(f"Wave {wave_index + 1}: running {len(test_ids)} tests")
+    shards = balance_shards(test_ids, args.workers, durations, graph)
+    shard_results = run_test_shards(args.dbt_project_dir, graph, shards, args.workers)
+    run_results = merge_run_results([path for _, path in shard_results])
+    
+    failed = [result for result in run_results['results']
+              if result.get('status') in ('fail', 'error', 'runtime error')]
+    # A shard that failed without writing results fails the whole wave
+    if any(returncode != 0 for returncode, path in shard_results if not path.exists()):
+        failed.append({'unique_id': None, 'status': 'error'})
+    return run_results, failed
+
+
+def promote_batch(args, models):
+    """Promote models in topological waves, validating each wave's tests in parallel.
+    
+    Models whose tests fail are not promoted, and every later wave is
+    skipped. A test spanning several waves runs in the first one, so its
+    models in later waves are skipped when it fails. All promoted models
+    are written as one promotion record.
+    """
+    from dbt_cicd_toolkit.scripts.manifest_graph import load_graph
+    from dbt_cicd_toolkit.scripts.shard_runner import load_test_durations, write_run_results
+    
+    graph = load_graph(args.dbt_project_dir)
+    invalid_models = [model for model in models if graph.get_model_id(model) is None]
+    if invalid_models:
+        print(f"Warning: The following models do not exist and cannot be promoted: {', '.join(invalid_models)}")
+    model_ids = [graph.get_model_id(model) for model in models if model not in invalid_models]
+    if not model_ids:
+        print("Error: No valid models to promote")
+        return 1
+    
+    waves = graph.topological_waves(model_ids)
+    print(f"Promoting {len(model_ids)} models in {len(waves)} waves")
+    
+    promoted, failed_models, skipped_models = [], [], []
+    all_results, elapsed_time = [], 0.0
+    if args.require_tests:
+        durations = load_test_durations(args.durations_from or [])
+        tests = wave_tests(graph, waves)
+        for wave_index, wave in enumerate(waves):
+            if failed_models:
+                skipped_models.extend(graph.nodes[model_id]['name'] for model_id in wave)
+                continue
+            if not tests[wave_index]:
+                promoted.extend(graph.nodes[model_id]['name'] for model_id in wave)
+                continue
+            
+            run_results, failed = validate_wave(args, graph, wave_index, tests[wave_index], durations)
+            all_results.extend(run_results['results'])
+            elapsed_time += run_results['elapsed_time']
+            wave_ids = set(wave)
+            failed_ids = set()
+            for test_result in failed:
+                if test_result['unique_id'] is None:
+                    failed_ids.update(wave)
+                    continue
+                print(f"  {test_result['unique_id']}: {test_result['status']}")
+                # Parents in later waves are skipped with the rest of those waves
+                failed_ids.update(parent_id for parent_id in graph.parents.get(test_result['unique_id'], [])
+                                  if parent_id in wave_ids)
+            
+            for model_id in wave:
+                name = graph.nodes[model_id]['name']
+                (failed_models if model_id in failed_ids else promoted).append(name)
+            if failed_models:
+                print(f"Wave {wave_index + 1} failed; skipping downstream waves")
+        
+        if all_results:
+            write_run_results({'metadata': {}, 'results': all_results, 'elapsed_time': elapsed_time, 'args': {}},
+                              Path(args.dbt_project_dir) / 'target' / 'run_results.json')
+    else:
+        promoted = [graph.nodes[model_id]['name'] for wave in waves for model_id in wave]
+    
+    promotion_result = {
+        'target_environment': args.target_environment,
+        'models': promoted,
+        'timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+        'success': bool(promoted),
+        'complete': not failed_models,
+        'failed_models': failed_models,
+        'skipped_models': skipped_models,
+        'waves': [[graph.nodes[model_id]['name'] for model_id in wave] for wave in waves]
+    }
+    
+    if not args.dry_run:
+        with PromotionStore.for_project(args.dbt_project_dir) as store:
+            store.record_promotion(promotion_result)
+    
+    print_promotion_result(args, promotion_result)
+    return 0 if promotion_result['success'] and promotion_result['complete'] else 1
+
+
+def promote_to_environments(args, models):
+    """Promote models to several environments concurrently and print one report.
+    
+    Returns 0 only if every environment was promoted.
+    """
+    from dbt_cicd_toolkit.scripts.manifest_graph import load_graph
+    
+    if args.batch:
+        print("Error: --batch promotes to a single --target-environment")
+        return 1
+    environments = [env.strip() for env in args.target_environments.split(',') if env.strip()]
+    graph = load_graph(args.dbt_project_dir)
+    invalid_models = [model for model in models if graph.get_model_id(model) is None]
+    if invalid_models:
+        print(f"Warning: The following models do not exist and cannot be promoted: {', '.join(invalid_models)}")
+    models = [model for model in models if model not in invalid_models]
+    if not models:
+        print("Error: No valid models to promote")
+        return 1
+    
+    print(f"Promoting {len(models)} models to {len(environments)} environments, "
+          f"{args.concurrency} at a time")
+    with PromotionStore.for_project(args.dbt_project_dir) as store:
+        results = asyncio.run(promote_environments(
+            args.dbt_project_dir, environments, models, args.concurrency,
+            None if args.dry_run else store, args.require_tests, args.retries, args.timeout
+        ))
+    
+    print(format_report(results, args.output_format))
+    if args.dry_run:
+        print("Note: This was a dry run. No state was updated.")
+    return 0 if all(result['status'] == 'promoted' for result in results) else 1
+
+
 def promote_models(args):
     """Promote models to the target environment."""
     # Parse models list
     models = [model.strip() for model in args.models.split(',')]
     
+    if args.target_environments:
+        return promote_to_environments(args, models)
+    
+    if args.batch:
+        return promote_batch(args, models)
+    
     # Run tests if required
     if args.require_tests:
         tests_passed = run_tests_for_models(args, models)
         if not tests_passed:
             return 1
     
-    # Create a temporary file to run the macro
-    temp_dir = Path(args.dbt_project_dir) / 'target' / 'run'
-    temp_dir.mkdir(parents=True, exist_ok=True)
-    
-    temp_file = temp_dir / 'promote_models.sql'
-    
-    # Escape model names for Jinja
-    models_arg = '[' + ', '.join(f'"{model}"' for model in models) + ']'
-    update_state = 'true' if not args.dry_run else 'false'
+    # Run the promotion macro and read its return value. State is recorded
+    # in the promotion store below rather than by the macro.
+    try:
+        promotion_result = get_dbt_runner(args).run_macro('dbt_cicd_toolkit.promote_to_environment', {
+            'target_environment': args.target_environment,
+            'models': models,
+            'require_tests': False,  # We already ran tests
+            'update_state': False
+        })
+    except DbtCommandError as e:
+        print(f"Error running promotion: {e}")
+        return 1
     
-    with open(temp_file, 'w') as f:
-        f.write(f"""
--- This is a temporary model to run the macro
-{{{{ config(enabled=false) }}}}
-
-SELECT 
-    {{{{ dbt_cicd_toolkit.promote_to_environment(
-        target_environment='{args.target_environment}',
-        models={models_arg},
-        require_tests=false,  -- We already ran tests
-        update_state={update_state}
-    ) | tojson }}}}
-""")
+    if not promotion_result:
+        print("Error: Promotion did not return a result")
+        return 1
     
-    # Run the macro
-    result = run_dbt_command(args, 'compile', ['--models', 'promote_models'])
+    if promotion_result['success'] and not args.dry_run:
+        with PromotionStore.for_project(args.dbt_project_dir) as store:
+            store.record_promotion(promotion_result)
     
-    # Parse the result
-    try:
-        # Extract the JSON part from the compile output
-        json_start = result.find('{')
-        json_end = result.rfind('}') + 1
-        if json_start >= 0 and json_end > json_start:
-            json_result = result[json_start:json_end]
-            promotion_result = json.loads(json_result)
-            
-            # Format output based on output format
-            if args.output_format == 'json':
-                print(json.dumps(promotion_result, indent=2))
-            elif args.output_format == 'markdown':
-                print(f"# Promotion Results\n")
-                print(f"## Target Environment: {promotion_result['target_environment']}\n")
-                print(f"## Models Promoted\n")
-                for model in promotion_result['models']:
-                    print(f"- `{model}`")
-                print(f"\n## Timestamp: {promotion_result['timestamp']}")
-                print(f"\n## Status: {'Success' if promotion_result['success'] else 'Failed'}")
-                if args.dry_run:
-                    print("\n**Note: This was a dry run. No state was updated.**")
-            else:  # text
-                print(f"Promotion Results:")
-                print(f"  Target Environment: {promotion_result['target_environment']}")
-                print(f"  Models Promoted: {', '.join(promotion_result['models'])}")
-                print(f"  Timestamp: {promotion_result['timestamp']}")
-                print(f"  Status: {'Success' if promotion_result['success'] else 'Failed'}")
-                if args.dry_run:
-                    print("Note: This was a dry run. No state was updated.")
-            
-            return 0 if promotion_result['success'] else 1
-        else:
-            print("Error: Could not find JSON output in dbt compile result")
-            return 1
-    except (json.JSONDecodeError, KeyError) as e:
-        print(f"Error parsing promotion result: {e}")
-        return 1
+    print_promotion_result(args, promotion_result)
+    return 0 if promotion_result['success'] else 1
 
 
 def main():
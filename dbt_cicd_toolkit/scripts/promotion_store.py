@@ -0,0 +1,269 @@
+#!/usr/bin/env python3
+"""
+Transactional promotion state store for dbt-ci-cd-toolkit.
+
+Promotions are kept in a SQLite database with an append-only promotion
+log, an (environment, model) index and a latest-status table. Writers
+take SQLite's file lock with BEGIN IMMEDIATE, so concurrent CI jobs
+cannot overwrite each other's promotions. After every write the
+per-environment JSON file read by the promotion macros is regenerated
+from the store.
+"""
+
+import json
+import os
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+STATE_DIR_NAME = 'promotion_states'
+STORE_FILE_NAME = 'promotions.db'
+SCHEMA_VERSION = '1'
+BUSY_TIMEOUT_SECONDS = 60
+# Number of promotions kept in the JSON files read by the macros
+JSON_STATE_LIMIT = 10
+DEFAULT_ENVIRONMENTS = ['development', 'staging', 'production']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS store_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS promotions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    environment TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    plan TEXT NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_promotions_environment
+    ON promotions (environment, timestamp);
+
+CREATE TABLE IF NOT EXISTS promotion_models (
+    promotion_id INTEGER NOT NULL REFERENCES promotions (id),
+    environment TEXT NOT NULL,
+    model TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    success INTEGER NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_promotion_models_environment_model
+    ON promotion_models (environment, model, timestamp);
+
+CREATE TABLE IF NOT EXISTS latest_status (
+    environment TEXT NOT NULL,
+    model TEXT NOT NULL,
+    promotion_id INTEGER NOT NULL,
+    last_promotion TEXT NOT NULL,
+    success INTEGER NOT NULL,
+    PRIMARY KEY (environment, model)
+);
+"""
+
+
+def default_state_dir(project_dir='.'):
+    """Return the promotion state directory used by the macros."""
+    return Path(project_dir) / 'target' / STATE_DIR_NAME
+
+
+class PromotionStore:
+    """SQLite-backed promotion log with a latest-status index."""
+
+    def __init__(self, state_dir):
+        self.state_dir = Path(state_dir)
+        self.state_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.state_dir / STORE_FILE_NAME
+        self.connection = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS,
+                                          isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(
+            "INSERT OR IGNORE INTO store_metadata (key, value) VALUES ('schema_version', ?)",
+            (SCHEMA_VERSION,)
+        )
+
+    @classmethod
+    def for_project(cls, project_dir='.'):
+        """Open the store for a dbt project."""
+        return cls(default_state_dir(project_dir))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in a write transaction, holding the database write lock."""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def _insert_promotion(self, connection, promotion_plan):
+        environment = promotion_plan['target_environment']
+        timestamp = promotion_plan['timestamp']
+        success = 1 if promotion_plan.get('success') else 0
+        cursor = connection.execute(
+            'INSERT INTO promotions (environment, timestamp, success, plan) VALUES (?, ?, ?, ?)',
+            (environment, timestamp, success, json.dumps(promotion_plan, sort_keys=True))
+        )
+        promotion_id = cursor.lastrowid
+        rows = [(promotion_id, environment, model, timestamp, success)
+                for model in promotion_plan.get('models', [])]
+        connection.executemany(
+            'INSERT INTO promotion_models (promotion_id, environment, model, timestamp, success) '
+            'VALUES (?, ?, ?, ?, ?)', rows
+        )
+        connection.executemany(
+            'INSERT INTO latest_status (promotion_id, environment, model, last_promotion, success) '
+            'VALUES (?, ?, ?, ?, ?) '
+            'ON CONFLICT (environment, model) DO UPDATE SET '
+            'promotion_id = excluded.promotion_id, last_promotion = excluded.last_promotion, '
+            'success = excluded.success '
+            'WHERE excluded.last_promotion >= latest_status.last_promotion', rows
+        )
+        return promotion_id
+
+    def record_promotion(self, promotion_plan):
+        """Append a promotion plan to the log and update the latest status."""
+        with self.transaction() as connection:
+            promotion_id = self._insert_promotion(connection, promotion_plan)
+            self._export_json_state(connection, promotion_plan['target_environment'])
+        return promotion_id
+
+    def record_promotions(self, promotion_plans):
+        """Append several promotion plans in one transaction."""
+        with self.transaction() as connection:
+            for promotion_plan in promotion_plans:
+                self._insert_promotion(connection, promotion_plan)
+            for environment in {plan['target_environment'] for plan in promotion_plans}:
+                self._export_json_state(connection, environment)
+
+    def _export_json_state(self, connection, environment):
+        """Regenerate the JSON state file the promotion macros read."""
+        rows = connection.execute(
+            'SELECT plan FROM promotions WHERE environment = ? ORDER BY timestamp DESC, id DESC LIMIT ?',
+            (environment, JSON_STATE_LIMIT)
+        ).fetchall()
+        state = {'promotions': [json.loads(row['plan']) for row in reversed(rows)]}
+        state_file = self.state_dir / f'{environment}.json'
+        temp_file = state_file.with_name(f'{state_file.name}.{os.getpid()}.tmp')
+        with open(temp_file, 'w') as f:
+            json.dump(state, f)
+        os.replace(temp_file, state_file)
+
+    def get_environments(self):
+        """Return every environment with recorded promotions."""
+        rows = self.connection.execute(
+            'SELECT DISTINCT environment FROM promotions ORDER BY environment'
+        ).fetchall()
+        return [row['environment'] for row in rows] or list(DEFAULT_ENVIRONMENTS)
+
+    def get_status(self, environment=None, models=None, include_history=False):
+        """Return {environment: {model: status}} like the get_promotion_status macro.
+
+        Latest status comes from one indexed query; per-model history is
+        only read when include_history is set.
+        """
+        environments = [environment] if environment else self.get_environments()
+        placeholders = ','.join('?' for _ in environments)
+        rows = self.connection.execute(
+            f'SELECT environment, model, last_promotion, success FROM latest_status '
+            f'WHERE environment IN ({placeholders})', environments
+        ).fetchall()
+
+        result = {env: {} for env in environments}
+        if models is not None:
+            for env in environments:
+                for model in models:
+                    result[env][model] = {'name': model, 'promoted': False,
+                                          'last_promotion': None, 'promotion_history': []}
+
+        wanted = set(models) if models is not None else None
+        for row in rows:
+            if wanted is not None and row['model'] not in wanted:
+                continue
+            result[row['environment']][row['model']] = {
+                'name': row['model'],
+                'promoted': True,
+                'last_promotion': row['last_promotion'],
+                'last_success': bool(row['success']),
+                'promotion_history': []
+            }
+
+        if include_history:
+            history_rows = self.connection.execute(
+                f'SELECT environment, model, timestamp, success FROM promotion_models '
+                f'WHERE environment IN ({placeholders}) ORDER BY environment, model, timestamp DESC',
+                environments
+            ).fetchall()
+            for row in history_rows:
+                status = result[row['environment']].get(row['model'])
+                if status is not None:
+                    status['promotion_history'].append({
+                        'timestamp': row['timestamp'],
+                        'success': bool(row['success'])
+                    })
+        return result
+
+    def compact(self, keep_last):
+        """Keep only the newest keep_last promotions per (environment, model).
+
+        Returns the number of promotion_models rows removed.
+        """
+        with self.transaction() as connection:
+            cursor = connection.execute(
+                'DELETE FROM promotion_models WHERE rowid IN ('
+                '  SELECT rowid FROM ('
+                '    SELECT rowid, ROW_NUMBER() OVER ('
+                '      PARTITION BY environment, model ORDER BY timestamp DESC, promotion_id DESC'
+                '    ) AS position FROM promotion_models'
+                '  ) WHERE position > ?'
+                ')', (keep_last,)
+            )
+            removed = cursor.rowcount
+            connection.execute(
+                'DELETE FROM promotions WHERE id NOT IN (SELECT DISTINCT promotion_id FROM promotion_models) '
+                'AND id NOT IN (SELECT promotion_id FROM latest_status)'
+            )
+            # Drop the removed promotions from the JSON files too, so import-json cannot bring them back
+            for row in connection.execute('SELECT DISTINCT environment FROM promotions').fetchall():
+                self._export_json_state(connection, row['environment'])
+        self.connection.execute('VACUUM')
+        return removed
+
+    def import_json_states(self):
+        """Import promotions from the per-environment JSON state files.
+
+        Promotions already in the store are skipped, so the import can be
+        re-run safely, e.g. to pick up promotions written by the macros.
+        Only the import-json command calls this; status queries read the
+        store alone. Returns the number of promotions imported.
+        """
+        imported = 0
+        with self.transaction() as connection:
+            for state_file in sorted(self.state_dir.glob('*.json')):
+                with open(state_file, 'r') as f:
+                    state = json.load(f)
+                for promotion_plan in state.get('promotions', []):
+                    promotion_plan.setdefault('target_environment', state_file.stem)
+                    exists = connection.execute(
+                        'SELECT 1 FROM promotions WHERE environment = ? AND timestamp = ? AND plan = ?',
+                        (promotion_plan['target_environment'], promotion_plan['timestamp'],
+                         json.dumps(promotion_plan, sort_keys=True))
+                    ).fetchone()
+                    if not exists:
+                        self._insert_promotion(connection, promotion_plan)
+                        imported += 1
+        return imported
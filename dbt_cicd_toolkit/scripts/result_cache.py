@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Content-addressed cache of passing dbt test results.
+
+A test's cache key hashes the test node's own identity, checksum and
+config with those of every model, seed and snapshot upstream of it, and
+with the checksums of every macro those nodes call, directly or through
+other macros. Keys are also namespaced by the dbt profile and target,
+since a test that passed against one warehouse says nothing about
+another. If none of those inputs changed since a passing run against the
+same target, the test can be skipped.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+
+DEFAULT_CACHE_DIR = '.dbt_cicd_cache'
+CACHE_SUBDIR = 'test_results'
+CACHE_KEY_VERSION = '3'
+DEFAULT_MAX_AGE_DAYS = 14
+DEFAULT_MAX_ENTRIES = 100000
+
+
+def _macro_closure(graph, macro_ids):
+    """Return macro_ids and every macro they call, transitively."""
+    seen = set()
+    stack = list(macro_ids)
+    while stack:
+        macro_id = stack.pop()
+        if macro_id in seen:
+            continue
+        seen.add(macro_id)
+        macro = graph.macros.get(macro_id)
+        if macro:
+            stack.extend(macro['depends_on']['macros'])
+    return seen
+
+
+def _node_signature(graph, node_id):
+    node = graph.get_node(node_id) or {}
+    macro_ids = _macro_closure(graph, (node.get('depends_on') or {}).get('macros') or [])
+    macros = ','.join(f"{macro_id}={(graph.macros.get(macro_id) or {}).get('checksum') or ''}"
+                      for macro_id in sorted(macro_ids))
+    return f"{node_id}:{node.get('checksum') or ''}:{node.get('config_hash') or ''}:{macros}"
+
+
+def compute_test_keys(graph, test_ids, target=('', '')):
+    """Return {test_id: cache_key} for the given tests run against a (profile, target)."""
+    signatures = {}
+    upstream_digests = {}
+
+    def signature(node_id):
+        if node_id not in signatures:
+            signatures[node_id] = _node_signature(graph, node_id)
+        return signatures[node_id]
+
+    def upstream_digest(node_id):
+        if node_id not in upstream_digests:
+            upstream_ids = graph.get_upstream([node_id])
+            upstream_signatures = sorted(signature(u) for u in upstream_ids + [node_id])
+            upstream_digests[node_id] = hashlib.sha256('\n'.join(upstream_signatures).encode('utf-8')).hexdigest()
+        return upstream_digests[node_id]
+
+    keys = {}
+    for test_id in test_ids:
+        test_node = graph.nodes[test_id]
+        parts = [
+            CACHE_KEY_VERSION,
+            ':'.join(target),
+            signature(test_id),
+            json.dumps(test_node.get('test_metadata'), sort_keys=True),
+            test_node.get('column_name') or ''
+        ]
+        parts.extend(upstream_digest(parent_id) for parent_id in sorted(graph.parents.get(test_id, [])))
+        keys[test_id] = hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()
+    return keys
+
+
+class ResultCache:
+    """Directory of passing test results keyed by content hash."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_age_days=DEFAULT_MAX_AGE_DAYS,
+                 max_entries=DEFAULT_MAX_ENTRIES):
+        self.root = Path(cache_dir) / CACHE_SUBDIR
+        self.max_age_seconds = max_age_days * 24 * 60 * 60
+        self.max_entries = max_entries
+
+    def _entry_path(self, key):
+        return self.root / key[:2] / f'{key}.json'
+
+    def lookup(self, keys):
+        """Return {test_id: entry} for tests with a fresh passing result."""
+        hits = {}
+        now = time.time()
+        for test_id, key in keys.items():
+            path = self._entry_path(key)
+            try:
+                if now - path.stat().st_mtime > self.max_age_seconds:
+                    continue
+                with open(path, 'r') as f:
+                    hits[test_id] = json.load(f)
+            except (OSError, json.JSONDecodeError):
+                continue
+        return hits
+
+    def record(self, run_results, keys):
+        """Store every passing, non-cached result from a run_results document.
+
+        Returns the number of entries written.
+        """
+        written = 0
+        for result in run_results.get('results', []):
+            test_id = result.get('unique_id')
+            if result.get('status') != 'pass' or result.get('cached') or test_id not in keys:
+                continue
+            path = self._entry_path(keys[test_id])
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = path.with_name(f'{path.name}.{os.getpid()}.tmp')
+            with open(temp_path, 'w') as f:
+                json.dump({
+                    'unique_id': test_id,
+                    'status': 'pass',
+                    'execution_time': result.get('execution_time'),
+                    'cached_at': time.strftime('%Y-%m-%d %H:%M:%S')
+                }, f)
+            os.replace(temp_path, path)
+            written += 1
+        return written
+
+    def evict(self):
+        """Remove expired entries, then the oldest entries beyond max_entries.
+
+        Returns the number of entries removed.
+        """
+        if not self.root.exists():
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for path in self.root.glob('*/*.json'):
+            try:
+                mtime = path.stat().st_mtime
+                if now - mtime > self.max_age_seconds:
+                    path.unlink()
+                    removed += 1
+                else:
+                    entries.append((mtime, path))
+            except OSError:
+                continue
+
+        if len(entries) > self.max_entries:
+            entries.sort()
+            for _, path in entries[:len(entries) - self.max_entries]:
+                try:
+                    path.unlink()
+                    removed += 1
+                except OSError:
+                    continue
+        return removed
+
+
+def cached_results(hits):
+    """Return run_results entries reporting cached tests as passing."""
+    return [
+        {
+            'unique_id': test_id,
+            'status': 'pass',
+            'cached': True,
+            'execution_time': 0.0,
+            'message': f"cached result from {entry.get('cached_at', 'a previous run')}",
+            'failures': 0
+        }
+        for test_id, entry in sorted(hits.items())
+    ]
@@ -4,142 +4,421 @@ Script to run selective tests in a CI environment based on changed files.
 """
 
 import argparse
-import json
-import os
-import subprocess
 import sys
 from pathlib import Path
 
+from dbt_cicd_toolkit.scripts.dbt_runner import resolve_target
+from dbt_cicd_toolkit.scripts.deferred_build import (
+    clone_upstream,
+    defer_args,
+    run_deferred_build,
+    unchanged_upstream,
+)
+from dbt_cicd_toolkit.scripts.failure_priority import (
+    DEFAULT_HISTORY_DIR,
+    DEFAULT_PRIORITY_BATCHES,
+    history_files,
+    load_test_history,
+    prioritize_tests,
+    priority_batches,
+    record_history,
+)
+from dbt_cicd_toolkit.scripts.manifest_graph import load_graph, read_changed_files
+from dbt_cicd_toolkit.scripts.result_cache import (
+    DEFAULT_CACHE_DIR,
+    DEFAULT_MAX_AGE_DAYS,
+    DEFAULT_MAX_ENTRIES,
+    ResultCache,
+    cached_results,
+    compute_test_keys,
+)
+from dbt_cicd_toolkit.scripts.selective_planner import (
+    add_upstream_models,
+    parse_budget,
+    plan_column_tests,
+    plan_tests,
+    select_within_budget,
+)
+from dbt_cicd_toolkit.scripts.shard_runner import (
+    balance_shards,
+    load_test_durations,
+    merge_run_results,
+    parse_shard_spec,
+    run_test_shards,
+    select_shard,
+    summarize_run_results,
+    write_run_results,
+)
+
+# Changed files echoed before a run; large refactors can list thousands
+MAX_LISTED_FILES = 20
+
 
 def parse_arguments():
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(description='Run selective dbt tests based on changed files.')
     parser.add_argument('--changed-files', type=str, help='Comma-separated list of changed files')
-    parser.add_argument('--changed-files-file', type=str, help='File containing list of changed files (one per line)')
+    parser.add_argument('--changed-files-file', type=str,
+                        help='File containing list of changed files (one per line), or - for stdin. '
+                             'Entries may be directories or glob patterns such as models/staging/**')
     parser.add_argument('--test-level', type=str, default='standard', 
-                        choices=['minimal', 'standard', 'comprehensive'],
-                        help='Level of testing to perform')
+                        choices=['minimal', 'standard', 'comprehensive', 'column'],
+                        help='Level of testing to perform (column: only tests on impacted columns, '
+                             'plus model-level tests)')
+    parser.add_argument('--changed-columns', type=str,
+                        help='Comma-separated model.column list of changed columns, for --test-level column')
     parser.add_argument('--include-upstream', action='store_true', 
                         help='Whether to include upstream models')
     parser.add_argument('--include-downstream', action='store_true', default=True,
                         help='Whether to include downstream models')
     parser.add_argument('--dbt-project-dir', type=str, default='.',
                         help='Path to dbt project directory')
+    parser.add_argument('--manifest-path', type=str,
+                        help='Path to manifest.json (defaults to <dbt-project-dir>/target/manifest.json)')
     parser.add_argument('--output-format', type=str, default='text',
                         choices=['text', 'json', 'markdown'],
                         help='Output format for results')
     parser.add_argument('--dry-run', action='store_true',
                         help='Print affected models without running tests')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Number of dbt test processes to run in parallel')
+    parser.add_argument('--durations-from', type=str, nargs='+',
+                        help='Previous run_results.json files used to balance shards '
+                             '(defaults to <dbt-project-dir>/target/run_results.json)')
+    parser.add_argument('--shard', type=str,
+                        help='Only run shard i of N of the planned tests (e.g. 2/8), for CI matrices')
+    parser.add_argument('--balance-by', type=str, default='duration',
+                        choices=['duration', 'count'],
+                        help='Balance shards by historical test duration or by test count')
+    parser.add_argument('--cache-dir', type=str, default=DEFAULT_CACHE_DIR,
+                        help='Directory for cached passing test results (persist it between CI runs)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Run every planned test, ignoring cached results')
+    parser.add_argument('--cache-max-age-days', type=float, default=DEFAULT_MAX_AGE_DAYS,
+                        help='Discard cached results older than this many days')
+    parser.add_argument('--cache-max-entries', type=int, default=DEFAULT_MAX_ENTRIES,
+                        help='Maximum number of cached results to keep')
+    parser.add_argument('--prioritize', action='store_true',
+                        help='Run the tests most likely to fail first, in batches of growing size')
+    parser.add_argument('--fail-fast', action='store_true',
+                        help='Stop the whole test run at the first failure (implies --prioritize)')
+    parser.add_argument('--priority-batches', type=int, default=DEFAULT_PRIORITY_BATCHES,
+                        help='Number of batches to run prioritized tests in')
+    parser.add_argument('--history-dir', type=str, default=DEFAULT_HISTORY_DIR,
+                        help='Directory of past test results used to estimate failure rates '
+                             '(persist it between CI runs)')
+    parser.add_argument('--budget', type=str,
+                        help='Only run the tests that cover the most impacted models and columns '
+                             'within this time budget (e.g. 600, 90s, 10m, 1h30m)')
+    parser.add_argument('--budget-type', type=str, default='wall',
+                        choices=['wall', 'warehouse'],
+                        help='Whether the budget is wall-clock time across all workers and shards, '
+                             'or total warehouse seconds')
+    parser.add_argument('--excluded-output', type=str,
+                        help='File to write the tests left out by --budget to, one per line')
+    parser.add_argument('--state', type=str,
+                        help='Artifacts directory or manifest.json of another environment (usually '
+                             'production); nodes that differ from it count as changed')
+    parser.add_argument('--build', action='store_true',
+                        help='Build the impacted models with their planned tests in one dbt build '
+                             'instead of only testing them')
+    parser.add_argument('--defer', action='store_true',
+                        help='Resolve refs to models that are not built against --state')
+    parser.add_argument('--clone-upstream', action='store_true',
+                        help='With --build, clone unchanged upstream tables from --state with dbt clone first')
     return parser.parse_args()
 
 
 def get_changed_files(args):
-    """Get the list of changed files from arguments."""
-    if args.changed_files:
-        return [f.strip() for f in args.changed_files.split(',')]
-    elif args.changed_files_file:
-        with open(args.changed_files_file, 'r') as f:
-            return [line.strip() for line in f if line.strip()]
-    else:
-        print("Error: Either --changed-files or --changed-files-file must be provided")
-        sys.exit(1)
+    """Get the list of changed files from arguments, merging --changed-files and --changed-files-file."""
+    changed_files = [f.strip() for f in args.changed_files.split(',')] if args.changed_files else []
+    if args.changed_files_file:
+        changed_files = list(dict.fromkeys(changed_files + read_changed_files(args.changed_files_file)))
+    if changed_files or args.changed_columns or args.state:
+        return changed_files
+    print("Error: Either --changed-files, --changed-files-file or --state must be provided")
+    sys.exit(1)
 
 
-def run_dbt_command(args, command, additional_args=None):
-    """Run a dbt command and return the result."""
-    if additional_args is None:
-        additional_args = []
-    
-    cmd = ['dbt', command, '--project-dir', args.dbt_project_dir] + additional_args
-    
-    print(f"Running command: {' '.join(cmd)}")
-    result = subprocess.run(cmd, capture_output=True, text=True)
+def load_state(args, graph):
+    """Return (state manifest, state graph, {unique_id: [reasons]}) for --state, or Nones."""
+    if not args.state:
+        return None, None, None
+    from dbt_cicd_toolkit.scripts.state_diff import diff_manifests, resolve_state_manifest
     
-    if result.returncode != 0:
-        print(f"Error running dbt command: {result.stderr}")
-        sys.exit(result.returncode)
+    state_manifest = resolve_state_manifest(args.state)
+    state_graph = load_graph(args.dbt_project_dir, state_manifest)
+    return state_manifest, state_graph, diff_manifests(graph, state_graph)['nodes']
+
+
+def get_impacted_models(args, changed_files, graph=None, state_changes=None):
+    """Get the list of impacted models from changed files and nodes changed against --state."""
+    graph = graph or load_graph(args.dbt_project_dir, args.manifest_path)
+    return graph.get_impacted_models_by_ids(
+        graph.find_nodes_by_files(changed_files, include_sources=True) + list(state_changes or []),
+        include_downstream=args.include_downstream,
+        exclude_current=False
+    )
+
+
+def get_impacted_columns(args, changed_files, graph, state=(None, None, None)):
+    """Get {unique_id: impacted columns} from changed files, --changed-columns and --state."""
+    from dbt_cicd_toolkit.scripts.column_lineage import (
+        impacted_columns,
+        load_column_lineage,
+        seed_changed_columns,
+    )
+    from dbt_cicd_toolkit.scripts.manifest_graph import default_manifest_path
     
-    return result.stdout
+    manifest_path = args.manifest_path or default_manifest_path(args.dbt_project_dir)
+    lineage = load_column_lineage(graph, manifest_path)
+    selectors = [c.strip() for c in (args.changed_columns or '').split(',') if c.strip()]
+    state_manifest, state_graph, state_changes = state
+    state_lineage = load_column_lineage(state_graph, state_manifest) if state_graph else None
+    changed = seed_changed_columns(graph, lineage, graph.find_nodes_by_files(changed_files), selectors,
+                                   state_changes, state_lineage)
+    impacted = impacted_columns(graph, lineage, changed, args.include_downstream)
+    if args.include_upstream:
+        for model_name in add_upstream_models(graph, [graph.nodes[node_id]['name'] for node_id in impacted
+                                                      if node_id in graph.nodes]):
+            impacted.setdefault(graph.get_model_id(model_name), {'*'})
+    return impacted
 
 
-def get_impacted_models(args, changed_files):
-    """Get the list of impacted models from changed files."""
-    # Create a temporary manifest to run the macro
-    temp_manifest_dir = Path(args.dbt_project_dir) / 'target' / 'run'
-    temp_manifest_dir.mkdir(parents=True, exist_ok=True)
+def plan_selective_tests(args, graph, impacted_models):
+    """Get the unique_ids of the tests to run for the impacted models."""
+    models = impacted_models
+    if args.include_upstream:
+        models = add_upstream_models(graph, models)
+    return plan_tests(graph, models, args.test_level)
+
+
+def get_test_durations(args, shared=False):
+    """Get historical test durations used to balance shards.
+
+    With shared=True, as for --shard, only the --durations-from files are
+    used: each CI runner has its own local run_results.json, and runners
+    that balance on different durations would compute different splits.
+    """
+    if args.balance_by == 'count':
+        return {}
+    if args.durations_from:
+        return load_test_durations(args.durations_from)
+    if shared:
+        return {}
+    return load_test_durations([Path(args.dbt_project_dir) / 'target' / 'run_results.json'])
+
+
+def apply_budget(args, graph, test_ids):
+    """Return the tests that fit in --budget, reporting the tests left out.
+
+    With --shard, test_ids is this runner's shard. Each runner budgets only
+    its own tests, so runners with different local durations never disagree
+    about which tests another shard runs.
+    """
+    budget = parse_budget(args.budget)
+    target_dir = Path(args.dbt_project_dir) / 'target'
+    durations = load_test_durations(history_files(args.history_dir)
+                                    + list(args.durations_from or [target_dir / 'run_results.json']))
+    capacity = budget
+    if args.budget_type == 'wall':
+        # Workers run concurrently, each with the full wall-clock budget
+        capacity *= max(1, args.workers)
+    elif args.shard:
+        # Warehouse time is shared by every shard
+        capacity /= parse_shard_spec(args.shard)[1]
     
-    # Create a temporary model file to run the macro
-    temp_model_path = temp_manifest_dir / 'get_impacted_models.sql'
+    selected, excluded = select_within_budget(graph, test_ids, durations, capacity)
+    estimate = sum(durations.get(test_id, 0.0) for test_id in selected)
+    print(f"Budget {args.budget} ({args.budget_type}): selected {len(selected)} of {len(test_ids)} tests "
+          f"({estimate:.1f}s of known test runtime)")
+    if excluded:
+        print(f"Excluded by budget ({len(excluded)} tests):")
+        for test_id in excluded:
+            print(f"  - {graph.nodes[test_id]['name']}")
+    if args.excluded_output:
+        with open(args.excluded_output, 'w') as f:
+            f.writelines(f"{graph.nodes[test_id]['name']}\n" for test_id in excluded)
+    return selected
+
+
+def select_runner_tests(args, graph, test_ids):
+    """Return the planned tests this runner runs: its --shard, then what fits in its --budget.
+
+    Raises ValueError for an invalid shard or budget.
+    """
+    if args.shard:
+        if args.balance_by == 'duration' and not args.durations_from:
+            print("No shared --durations-from files given; splitting shards by test count")
+        test_ids = select_shard(test_ids, args.shard, get_test_durations(args, shared=True), graph)
+        print(f"Shard {args.shard}: {len(test_ids)} tests")
+    if args.budget:
+        test_ids = apply_budget(args, graph, test_ids)
+    return test_ids
+
+
+def get_test_batches(args, graph, test_ids, changed_ids=()):
+    """Order tests by failure probability and split them into batches.
+
+    Without --prioritize or --fail-fast all tests run as a single batch.
+    """
+    if not (args.prioritize or args.fail_fast):
+        return [test_ids]
+    history = load_test_history(history_files(args.history_dir))
+    ranked = prioritize_tests(test_ids, history, graph, changed_ids)
+    return priority_batches([test_id for test_id, _, _ in ranked], args.priority_batches)
+
+
+def run_selective_tests(args, graph, test_ids, changed_ids=(), build_ids=(), state_manifest=None):
+    """Run the planned tests, split across --workers parallel dbt processes.
     
-    # Escape file paths for Jinja
-    escaped_files = [f.replace('\\', '\\\\').replace('"', '\\"') for f in changed_files]
-    files_arg = '[' + ', '.join(f'"{f}"' for f in escaped_files) + ']'
+    Tests whose inputs are unchanged since a cached passing run are skipped
+    and reported as cached unless --no-cache is set. With --prioritize the
+    likeliest failures run first, and --fail-fast stops at the first one.
+    With build_ids, the models are built together with the tests in a
+    single dbt build instead. With --defer, refs to nodes that are not
+    run resolve against state_manifest.
+    """
+    if not test_ids and not build_ids:
+        print("No models impacted by changes. No tests to run.")
+        return 0
     
-    with open(temp_model_path, 'w') as f:
-        f.write(f"""
--- This is a temporary model to run the macro
-{{{{ config(enabled=false) }}}}
-
-SELECT 
-    {{{{ dbt_cicd_toolkit.get_impacted_models(
-        source_files={files_arg},
-        include_sources=true,
-        include_downstream={str(args.include_downstream).lower()},
-        exclude_current=false
-    ) | tojson }}}}
-""")
+    target_dir = Path(args.dbt_project_dir) / 'target'
     
-    # Run the macro
-    result = run_dbt_command(args, 'compile', ['--models', 'get_impacted_models'])
+    cache = None
+    hits = {}
+    if not args.no_cache:
+        cache = ResultCache(args.cache_dir, args.cache_max_age_days, args.cache_max_entries)
+        keys = compute_test_keys(graph, test_ids, resolve_target(args.dbt_project_dir))
+        hits = cache.lookup(keys)
+        if hits:
+            print(f"Skipping {len(hits)} tests with cached passing results")
+        test_ids = [test_id for test_id in test_ids if test_id not in hits]
     
-    # Parse the result
-    try:
-        # Extract the JSON part from the compile output
-        json_start = result.find('[')
-        json_end = result.rfind(']') + 1
-        if json_start >= 0 and json_end > json_start:
-            json_result = result[json_start:json_end]
-            return json.loads(json_result)
-        else:
-            print("Error: Could not find JSON output in dbt compile result")
-            return []
-    except json.JSONDecodeError:
-        print("Error: Could not parse JSON output from dbt compile result")
-        return []
-
-
-def run_selective_tests(args, impacted_models):
-    """Run tests for the impacted models."""
-    if not impacted_models:
-        print("No models impacted by changes. No tests to run.")
-        return 0
+    run_results = merge_run_results([])
+    success = True
+    not_run = []
+    extra_args = defer_args(state_manifest) if args.defer else []
+    if build_ids:
+        if args.clone_upstream:
+            clone_upstream(args.dbt_project_dir, graph, unchanged_upstream(graph, build_ids, test_ids),
+                           state_manifest)
+        returncode, run_results_path = run_deferred_build(
+            args.dbt_project_dir, graph, build_ids, test_ids,
+            state_manifest if args.defer else None, fail_fast=args.fail_fast
+        )
+        run_results = merge_run_results([run_results_path])
+        success = returncode == 0
+        record_history(run_results, args.history_dir)
+    elif test_ids:
+        durations = get_test_durations(args)
+        batches = get_test_batches(args, graph, test_ids, changed_ids)
+        for number, batch in enumerate(batches, 1):
+            if len(batches) > 1:
+                print(f"Priority batch {number}/{len(batches)}: {len(batch)} tests")
+            shards = balance_shards(batch, max(1, args.workers), durations, graph)
+            shard_results = run_test_shards(args.dbt_project_dir, graph, shards, args.workers,
+                                            extra_args, fail_fast=args.fail_fast)
+            # Shard targets are reused by the next batch, so merge now
+            batch_results = merge_run_results([path for _, path in shard_results])
+            if not run_results['metadata']:
+                run_results['metadata'] = batch_results['metadata']
+                run_results['args'] = batch_results['args']
+            run_results['results'].extend(batch_results['results'])
+            run_results['elapsed_time'] += batch_results['elapsed_time']
+            if any(returncode != 0 for returncode, _ in shard_results):
+                success = False
+                if args.fail_fast:
+                    executed = {result.get('unique_id') for result in batch_results['results']}
+                    not_run = [test_id for test_id in batch if test_id not in executed]
+                    not_run.extend(test_id for later in batches[number:] for test_id in later)
+                    break
+        record_history(run_results, args.history_dir)
     
-    # Join models with '+'
-    models_arg = '+'.join(impacted_models)
+    # Report executed and cached results together
+    run_results['results'].extend(cached_results(hits))
+    write_run_results(run_results, target_dir / 'run_results.json')
     
-    # Run tests
-    additional_args = ['--models', models_arg]
-    run_dbt_command(args, 'test', additional_args)
+    if cache is not None:
+        cache.record(run_results, keys)
+        cache.evict()
     
-    return 0
+    print(f"Test results: {summarize_run_results(run_results)}")
+    if not_run:
+        print(f"Fail fast: stopped after the first failure; {len(not_run)} tests were not run")
+    return 0 if success else 1
+
+
+def check_build_arguments(args):
+    """Return an error message for build and defer flags that cannot be combined, or None."""
+    if (args.defer or args.clone_upstream) and not args.state:
+        return "--defer and --clone-upstream require --state"
+    if args.clone_upstream and not args.build:
+        return "--clone-upstream requires --build"
+    if args.build and (args.shard or args.prioritize):
+        return "--build runs a single dbt build, so it cannot be combined with --shard or --prioritize"
+    return None
 
 
 def main():
     args = parse_arguments()
     changed_files = get_changed_files(args)
+    error = check_build_arguments(args)
+    if error:
+        print(f"Error: {error}")
+        return 1
     
-    print(f"Changed files: {changed_files}")
+    if len(changed_files) > MAX_LISTED_FILES:
+        print(f"Changed files: {changed_files[:MAX_LISTED_FILES]} and {len(changed_files) - MAX_LISTED_FILES} more")
+    else:
+        print(f"Changed files: {changed_files}")
     print(f"Test level: {args.test_level}")
     
-    impacted_models = get_impacted_models(args, changed_files)
-    print(f"Impacted models: {impacted_models}")
+    graph = load_graph(args.dbt_project_dir, args.manifest_path)
+    state = load_state(args, graph)
+    state_manifest, _, state_changes = state
+    if state_changes is not None:
+        print(f"Changed against {args.state}: {len(state_changes)} nodes")
+    if args.test_level == 'column':
+        try:
+            impacted = get_impacted_columns(args, changed_files, graph, state)
+        except ValueError as e:
+            print(f"Error: {e}")
+            return 1
+        impacted_models = [graph.nodes[node_id]['name'] for node_id in impacted
+                           if graph.nodes.get(node_id, {}).get('resource_type') == 'model']
+        print(f"Impacted models: {impacted_models}")
+        for node_id in impacted:
+            if node_id in graph.nodes:
+                print(f"  {graph.nodes[node_id]['name']}: {', '.join(sorted(impacted[node_id]))}")
+        test_ids = plan_column_tests(graph, impacted)
+    else:
+        impacted_models = get_impacted_models(args, changed_files, graph, state_changes)
+        print(f"Impacted models: {impacted_models}")
+        test_ids = plan_selective_tests(args, graph, impacted_models)
+    print(f"Planned tests: {len(test_ids)}")
+    
+    try:
+        test_ids = select_runner_tests(args, graph, test_ids)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
     
+    changed_ids = graph.find_nodes_by_files(changed_files) + list(state_changes or [])
+    build_ids = [graph.get_model_id(name) for name in impacted_models] if args.build else []
     if args.dry_run:
+        if build_ids:
+            print(f"Models to build: {len(build_ids)}")
+            if args.clone_upstream:
+                print(f"Upstream relations to clone: {len(unchanged_upstream(graph, build_ids, test_ids))}")
+        if not args.build and (args.prioritize or args.fail_fast):
+            batches = get_test_batches(args, graph, test_ids, changed_ids)
+            print(f"Priority batches: {', '.join(str(len(batch)) for batch in batches)} tests")
         print("Dry run - not running tests")
         return 0
     
-    return run_selective_tests(args, impacted_models)
+    return run_selective_tests(args, graph, test_ids, changed_ids, build_ids, state_manifest)
 
 
 if __name__ == "__main__":
-    sys.exit(main()) 
\ No newline at end of file
+    sys.exit(main())
\ No newline at end of file
@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Selective test planning for dbt-ci-cd-toolkit.
+
+Mirrors the test selection in the run_selective_tests macro using the
+manifest graph, so a plan can be built without a dbt process.
+"""
+
+import heapq
+import re
+
+CRITICAL_TEST_MARKERS = ('not_null', 'unique', 'primary_key', 'accepted_values')
+
+# Coverage credited for the first test on a model and on each of its columns
+MODEL_COVERAGE_WEIGHT = 1.0
+COLUMN_COVERAGE_WEIGHT = 0.5
+MIN_TEST_COST = 0.01
+
+_BUDGET_PART = re.compile(r'(\d+(?:\.\d+)?)([hms]?)')
+_BUDGET_UNITS = {'h': 3600, 'm': 60, 's': 1, '': 1}
+
+
+def add_upstream_models(graph, models):
+    """Add the direct upstream models of each model, as the macro does."""
+    result = list(models)
+    seen = set(models)
+    for model_name in models:
+        model_id = graph.get_model_id(model_name)
+        for upstream_id in graph.parents.get(model_id, []):
+            upstream = graph.nodes.get(upstream_id)
+            if upstream and upstream['resource_type'] == 'model' and upstream['name'] not in seen:
+                seen.add(upstream['name'])
+                result.append(upstream['name'])
+    return result
+
+
+def is_critical_test(test_node):
+    """Return True for tests run at the minimal test level."""
+    return any(marker in test_node['name'] for marker in CRITICAL_TEST_MARKERS)
+
+
+def plan_tests(graph, models, test_level='standard'):
+    """Return the unique_ids of the tests to run for the given models."""
+    if test_level == 'comprehensive':
+        return sorted(
+            node_id for node_id, node in graph.nodes.items()
+            if node['resource_type'] == 'test'
+        )
+
+    test_ids = set()
+    for model_name in models:
+        model_id = graph.get_model_id(model_name)
+        for test_id in graph.model_tests.get(model_id, []):
+            if test_level == 'minimal' and not is_critical_test(graph.nodes[test_id]):
+                continue
+            test_ids.add(test_id)
+    return sorted(test_ids)
+
+
+def plan_column_tests(graph, impacted_columns):
+    """Return the tests to run for column-level impact.
+
+    impacted_columns maps unique_ids to impacted column names ('*' for
+    all). Column tests run when their column is impacted, and tests that
+    are not on a single plain column always run for impacted models.
+    """
+    test_ids = set()
+    for node_id, columns in impacted_columns.items():
+        for test_id in graph.model_tests.get(node_id, []):
+            column_name = (graph.nodes[test_id].get('column_name') or '').strip('"`').lower()
+            if '*' in columns or not re.fullmatch(r'[a-z_][a-z0-9_$]*', column_name) or column_name in columns:
+                test_ids.add(test_id)
+    return sorted(test_ids)
+
+
+def parse_budget(budget):
+    """Parse a budget such as '600', '90s', '10m' or '1h30m' into seconds."""
+    text = str(budget).strip().lower()
+    position = 0
+    seconds = 0.0
+    for match in _BUDGET_PART.finditer(text):
+        if match.start() != position:
+            break
+        seconds += float(match.group(1)) * _BUDGET_UNITS[match.group(2)]
+        position = match.end()
+    if not text or position != len(text) or seconds <= 0:
+        raise ValueError(f"Invalid budget '{budget}'. Use seconds or a duration such as 90s, 10m or 1h30m")
+    return seconds
+
+
+def coverage_units(graph, test_id):
+    """Return the (model, column) units a test covers; column is None for the model itself."""
+    column_name = (graph.nodes[test_id].get('column_name') or '').strip('"`').lower()
+    units = set()
+    for parent in graph.parents.get(test_id, []):
+        node = graph.nodes.get(parent)
+        if node is None or node['resource_type'] == 'test':
+            continue
+        units.add((parent, None))
+        if column_name:
+            units.add((parent, column_name))
+    return units
+
+
+def select_within_budget(graph, test_ids, durations, budget_seconds):
+    """Pick the tests that cover the most impacted models and columns within a budget.
+
+    Returns (selected, excluded). Tests are chosen greedily by newly
+    covered models and columns per second of historical runtime; any
+    budget left over is filled with the cheapest remaining tests. Tests
+    without a recorded duration are costed at the median known duration.
+    """
+    known = sorted(durations[t] for t in test_ids if t in durations)
+    default_cost = known[len(known) // 2] if known else 1.0
+    costs = {t: max(durations.get(t, default_cost), MIN_TEST_COST) for t in test_ids}
+    units = {t: coverage_units(graph, t) for t in test_ids}
+
+    def gain(test_id):
+        return sum(COLUMN_COVERAGE_WEIGHT if column else MODEL_COVERAGE_WEIGHT
+                   for _, column in units[test_id] - covered)
+
+    covered = set()
+    selected = set()
+    spent = 0.0
+    # Coverage gains only shrink, so stale heap entries are re-scored lazily
+    heap = [(-gain(t) / costs[t], t) for t in sorted(test_ids)]
+    heapq.heapify(heap)
+    while heap:
+        _, test_id = heapq.heappop(heap)
+        ratio = gain(test_id) / costs[test_id]
+        if heap and ratio < -heap[0][0]:
+            heapq.heappush(heap, (-ratio, test_id))
+            continue
+        if ratio <= 0:
+            break
+        if spent + costs[test_id] <= budget_seconds:
+            selected.add(test_id)
+            covered |= units[test_id]
+            spent += costs[test_id]
+
+    for test_id in sorted(set(test_ids) - selected, key=lambda t: (costs[t], t)):
+        if spent + costs[test_id] <= budget_seconds:
+            selected.add(test_id)
+            spent += costs[test_id]
+
+    return ([t for t in test_ids if t in selected], [t for t in test_ids if t not in selected])
+
+
+def selectors_for_tests(graph, test_ids):
+    """Return dbt node selectors for the given test unique_ids.
+
+    Tests are selected by fully qualified name, since a bare name also
+    selects same-named tests in other packages.
+    """
+    selectors = []
+    for test_id in test_ids:
+        node = graph.nodes[test_id]
+        selectors.append('fqn:' + '.'.join(node['fqn']) if node.get('fqn') else node['name'])
+    return selectors
@@ -0,0 +1,252 @@
+#!/usr/bin/env python3
+"""
+Sharded, parallel execution of planned dbt tests.
+
+Planned tests are split into balanced shards using historical durations
+from previous run_results.json files, each shard runs as its own
+`dbt test` process with a separate target path, and the per-shard
+run_results.json files are merged into a single report.
+"""
+
+import json
+import shutil
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtResult, DbtRunner
+from dbt_cicd_toolkit.scripts.selective_planner import selectors_for_tests
+
+DEFAULT_TEST_DURATION = 1.0
+SHARD_DIR_NAME = 'shards'
+PARTIAL_PARSE_FILE = 'partial_parse.msgpack'
+# Longest --select list per dbt invocation, well under Windows' 32,767
+# character command line and Linux's per-argument limits
+MAX_SELECT_CHARS = 16000
+
+
+def load_test_durations(run_results_paths):
+    """Return {unique_id: execution_time} from run_results.json files.
+
+    Later files win, so pass paths oldest first.
+    """
+    durations = {}
+    for path in run_results_paths:
+        path = Path(path)
+        if not path.exists():
+            continue
+        try:
+            with open(path, 'r') as f:
+                run_results = json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            print(f"Warning: Could not read run results from {path}: {e}")
+            continue
+        for result in run_results.get('results', []):
+            if result.get('cached'):
+                continue
+            if result.get('unique_id') and result.get('execution_time') is not None:
+                durations[result['unique_id']] = float(result['execution_time'])
+    return durations
+
+
+def parse_shard_spec(spec):
+    """Parse a 1-based 'i/N' shard spec into (index, count)."""
+    try:
+        index, count = (int(part) for part in spec.split('/'))
+    except ValueError:
+        raise ValueError(f"Invalid shard '{spec}'. Expected the form i/N, e.g. 2/8")
+    if count < 1 or not 1 <= index <= count:
+        raise ValueError(f"Invalid shard '{spec}'. The index must be between 1 and {max(count, 1)}")
+    return index, count
+
+
+def _test_groups(graph, test_ids):
+    """Group tests by the first node they test so related tests share a shard."""
+    groups = {}
+    for test_id in test_ids:
+        parents = graph.parents.get(test_id) or [test_id]
+        groups.setdefault(parents[0], []).append(test_id)
+    return list(groups.values())
+
+
+def balance_shards(test_ids, shard_count, durations=None, graph=None):
+    """Split test_ids into shard_count balanced lists.
+
+    Uses longest-processing-time-first greedy assignment. Tests without a
+    recorded duration are costed at the median known duration. When a
+    graph is given, tests on the same model are kept together as long as
+    there are enough groups to fill every shard. The result only depends
+    on the inputs, so every caller computes the same shards.
+    """
+    durations = durations or {}
+    known = sorted(durations[t] for t in test_ids if t in durations)
+    default_cost = known[len(known) // 2] if known else DEFAULT_TEST_DURATION
+
+    units = [[test_id] for test_id in sorted(test_ids)]
+    if graph is not None:
+        groups = _test_groups(graph, sorted(test_ids))
+        if len(groups) >= shard_count:
+            units = groups
+
+    def cost(unit):
+        return sum(durations.get(t, default_cost) for t in unit)
+
+    units.sort(key=lambda unit: (-cost(unit), unit[0]))
+
+    shards = [[] for _ in range(shard_count)]
+    loads = [0.0] * shard_count
+    for unit in units:
+        target = min(range(shard_count), key=lambda i: (loads[i], i))
+        shards[target].extend(unit)
+        loads[target] += cost(unit)
+    return [sorted(shard) for shard in shards]
+
+
+def prepare_shard_target(project_dir, shard_index):
+    """Create a shard's target path, seeded with the parse cache if present."""
+    target_dir = Path(project_dir) / 'target'
+    shard_target = (target_dir / SHARD_DIR_NAME / f'shard_{shard_index}').resolve()
+    shard_target.mkdir(parents=True, exist_ok=True)
+    # Never merge results left over from an earlier run
+    (shard_target / 'run_results.json').unlink(missing_ok=True)
+
+    partial_parse = target_dir / PARTIAL_PARSE_FILE
+    if partial_parse.exists():
+        shutil.copy2(partial_parse, shard_target / PARTIAL_PARSE_FILE)
+    return shard_target
+
+
+def chunk_selectors(selectors, max_chars=MAX_SELECT_CHARS):
+    """Split selectors into lists whose joined length stays within max_chars."""
+    chunks = [[]]
+    length = 0
+    for selector in selectors:
+        if chunks[-1] and length + len(selector) + 1 > max_chars:
+            chunks.append([])
+            length = 0
+        chunks[-1].append(selector)
+        length += len(selector) + 1
+    return chunks
+
+
+def _invoke_chunks(runner, chunks, args, extra_args, shard_target):
+    """Run one dbt test per chunk of selectors, merging their run results.
+
+    With --fail-fast, the remaining chunks are skipped after a failure.
+    """
+    run_results = {'metadata': {}, 'results': [], 'elapsed_time': 0.0, 'args': {}}
+    success, returncode, output = True, 0, ''
+    for chunk in chunks:
+        result = runner.invoke('test', args + ['--select'] + chunk + extra_args, target_path=shard_target)
+        if result.run_results:
+            run_results['metadata'] = result.run_results.get('metadata', {})
+            run_results['args'] = result.run_results.get('args', {})
+            run_results['results'].extend(result.run_results.get('results', []))
+            run_results['elapsed_time'] += result.run_results.get('elapsed_time') or 0.0
+        if not result.success:
+            success, returncode, output = False, returncode or result.returncode, result.output
+            if '--fail-fast' in extra_args:
+                break
+    write_run_results(run_results, shard_target / 'run_results.json')
+    return DbtResult(success, returncode, output, run_results if run_results['results'] else None)
+
+
+def run_test_shard(project_dir, graph, shard_index, test_ids, extra_args=None, runner=None):
+    """Run one shard of tests and return (returncode, run_results_path).
+
+    Shards always run as subprocesses, since dbt cannot run several
+    invocations concurrently in one process. Large shards are run as
+    several dbt invocations so no command line exceeds MAX_SELECT_CHARS.
+    """
+    shard_target = prepare_shard_target(project_dir, shard_index)
+    runner = runner or DbtRunner(project_dir, in_process=False)
+    args = ['--log-path', str(shard_target / 'logs')]
+    extra_args = list(extra_args or [])
+    chunks = chunk_selectors(selectors_for_tests(graph, test_ids))
+
+    print(f"[shard {shard_index}] Running {len(test_ids)} tests")
+    if len(chunks) == 1:
+        result = runner.invoke('test', args + ['--select'] + chunks[0] + extra_args, target_path=shard_target)
+    else:
+        print(f"[shard {shard_index}] Split into {len(chunks)} dbt invocations")
+        result = _invoke_chunks(runner, chunks, args, extra_args, shard_target)
+    status = 'passed' if result.success else 'failed'
+    print(f"[shard {shard_index}] {status} (exit code {result.returncode})")
+    if not result.success and result.output and not result.run_results:
+        print(f"[shard {shard_index}] {result.output.strip()}")
+    return result.returncode, shard_target / 'run_results.json'
+
+
+def run_test_shards(project_dir, graph, shards, workers, extra_args=None, fail_fast=False):
+    """Run shards concurrently and return their (returncode, run_results_path) pairs.
+
+    With fail_fast, dbt stops each shard at its first failure and the
+    first failing shard terminates every other shard.
+    """
+    shards = [(i, shard) for i, shard in enumerate(shards) if shard]
+    runner = DbtRunner(project_dir, in_process=False)
+    if fail_fast:
+        extra_args = list(extra_args or []) + ['--fail-fast']
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        futures = [
+            executor.submit(run_test_shard, project_dir, graph, i, shard, extra_args, runner)
+            for i, shard in shards
+        ]
+        if fail_fast:
+            for future in as_completed(futures):
+                if future.result()[0] != 0:
+                    runner.terminate()
+                    break
+        return [future.result() for future in futures]
+
+
+def select_shard(test_ids, spec, durations=None, graph=None):
+    """Return the tests assigned to a 1-based 'i/N' shard.
+
+    Every runner computes the same split from the same manifest and
+    duration files, so shards need no coordination.
+    """
+    index, count = parse_shard_spec(spec)
+    return balance_shards(test_ids, count, durations, graph)[index - 1]
+
+
+def write_run_results(run_results, path):
+    """Write a run_results document to path."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(run_results, f, indent=2)
+
+
+def merge_run_results(run_results_paths):
+    """Merge several run_results.json files into one run_results document.
+
+    Results are concatenated, and elapsed_time is the longest shard's
+    wall-clock time since shards run concurrently.
+    """
+    merged = None
+    for path in run_results_paths:
+        path = Path(path)
+        if not path.exists():
+            print(f"Warning: Run results not found at {path}")
+            continue
+        with open(path, 'r') as f:
+            run_results = json.load(f)
+        if merged is None:
+            merged = {
+                'metadata': run_results.get('metadata', {}),
+                'results': [],
+                'elapsed_time': 0.0,
+                'args': run_results.get('args', {})
+            }
+        merged['results'].extend(run_results.get('results', []))
+        merged['elapsed_time'] = max(merged['elapsed_time'], run_results.get('elapsed_time') or 0.0)
+    return merged or {'metadata': {}, 'results': [], 'elapsed_time': 0.0, 'args': {}}
+
+
+def summarize_run_results(run_results):
+    """Return {status: count} for a run_results document."""
+    summary = {}
+    for result in run_results.get('results', []):
+        status = result.get('status', 'unknown')
+        summary[status] = summary.get(status, 0) + 1
+    return summary
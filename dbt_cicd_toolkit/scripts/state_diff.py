@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Manifest-to-manifest state comparison for dbt-ci-cd-toolkit.
+
+Compares the current manifest against a manifest from another
+environment (usually production), like dbt's state:modified selector.
+Besides file contents this catches changes that reach a node through a
+macro, a dbt_project.yml config or a package, which a list of changed
+files cannot express.
+"""
+
+from collections import deque
+from pathlib import Path
+
+
+def resolve_state_manifest(state_path):
+    """Return the manifest path for --state, which may be a file or an artifacts directory."""
+    path = Path(state_path)
+    return path / 'manifest.json' if path.is_dir() else path
+
+
+def modified_macros(current_macros, state_macros):
+    """Return {macro_id: reason} for new or changed macros and every macro that calls one."""
+    changed = {}
+    for macro_id, macro in current_macros.items():
+        previous = state_macros.get(macro_id)
+        if previous is None:
+            changed[macro_id] = 'new'
+        elif previous['checksum'] != macro['checksum']:
+            changed[macro_id] = 'modified'
+
+    callers = {}
+    for macro_id, macro in current_macros.items():
+        for dependency in macro['depends_on']['macros']:
+            callers.setdefault(dependency, []).append(macro_id)
+
+    queue = deque(changed)
+    while queue:
+        macro_id = queue.popleft()
+        for caller in callers.get(macro_id, []):
+            if caller not in changed:
+                changed[caller] = f'calls {macro_id}'
+                queue.append(caller)
+    return changed
+
+
+def _node_changes(node, previous, changed_macros):
+    if previous is None:
+        return ['new']
+    reasons = []
+    if node.get('checksum') != previous.get('checksum'):
+        reasons.append('body')
+    if node.get('config_hash') != previous.get('config_hash'):
+        reasons.append('config')
+    if sorted(node['depends_on']['nodes']) != sorted(previous['depends_on']['nodes']):
+        reasons.append('dependencies')
+    macros = node['depends_on']['macros']
+    if sorted(macros) != sorted(previous['depends_on']['macros']):
+        reasons.append('macro list')
+    reasons.extend(f'macro {macro_id}' for macro_id in macros if macro_id in changed_macros)
+    return reasons
+
+
+def diff_manifests(current, state):
+    """Compare two manifest graphs in one pass over each index.
+
+    Returns {'nodes': {unique_id: [reasons]}, 'macros': {macro_id: reason}}
+    for the nodes and sources of `current` that are new or differ from
+    `state`. Deleted nodes are not reported; their children show up with
+    changed dependencies instead.
+    """
+    changed_macros = modified_macros(current.macros, state.macros)
+    changes = {}
+    for current_section, state_section in ((current.nodes, state.nodes), (current.sources, state.sources)):
+        for unique_id, node in current_section.items():
+            reasons = _node_changes(node, state_section.get(unique_id), changed_macros)
+            if reasons:
+                changes[unique_id] = reasons
+    return {'nodes': changes, 'macros': changed_macros}
@@ -0,0 +1,427 @@
+#!/usr/bin/env python3
+"""
+Model version registry for dbt-ci-cd-toolkit.
+
+Versions are kept in a SQLite database with a semver-ordered index per
+model and an environment -> deployed version index, so latest-version,
+breaking-change and history lookups are indexed queries. Bulk
+registrations and deployments are applied in one transaction. The
+per-model JSON files read by the version management macros are
+regenerated for every model that changes.
+"""
+
+import csv
+import json
+import os
+import re
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+
+VERSIONS_DIR_NAME = 'versions'
+REGISTRY_FILE_NAME = 'versions.db'
+# Version 2 stores sortable prerelease keys instead of the raw prerelease text
+SCHEMA_VERSION = '2'
+BUSY_TIMEOUT_SECONDS = 60
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+SEMVER_PATTERN = re.compile(
+    r'^v?(?P<major>0|[1-9]\d*)\.(?P<minor>0|[1-9]\d*)\.(?P<patch>0|[1-9]\d*)'
+    r'(?:-(?P<prerelease>[0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$'
+)
+
+# Prerelease key of a release, above the key of any prerelease
+RELEASE_KEY = '~'
+# Separates prerelease identifiers; sorts below every identifier character
+IDENTIFIER_SEPARATOR = ' '
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS registry_metadata (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+
+CREATE TABLE IF NOT EXISTS versions (
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    major INTEGER,
+    minor INTEGER,
+    patch INTEGER,
+    is_release INTEGER,
+    prerelease TEXT,
+    timestamp TEXT NOT NULL,
+    is_breaking INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL,
+    description TEXT,
+    author TEXT,
+    last_deployed TEXT,
+    PRIMARY KEY (model, version)
+);
+
+CREATE INDEX IF NOT EXISTS idx_versions_semver
+    ON versions (model, major DESC, minor DESC, patch DESC, is_release DESC, prerelease DESC);
+
+CREATE INDEX IF NOT EXISTS idx_versions_timestamp
+    ON versions (model, timestamp);
+
+CREATE TABLE IF NOT EXISTS deployments (
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    environment TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    status TEXT NOT NULL,
+    UNIQUE (model, version, environment, timestamp)
+);
+
+CREATE INDEX IF NOT EXISTS idx_deployments_environment
+    ON deployments (model, environment);
+
+CREATE TABLE IF NOT EXISTS environment_versions (
+    environment TEXT NOT NULL,
+    model TEXT NOT NULL,
+    version TEXT NOT NULL,
+    deployed_at TEXT NOT NULL,
+    PRIMARY KEY (environment, model)
+);
+"""
+
+# Newest semver first; versions that are not valid semver sort last
+SEMVER_ORDER = ('major IS NULL, major DESC, minor DESC, patch DESC, '
+                'is_release DESC, prerelease DESC, timestamp DESC')
+
+
+class VersionError(Exception):
+    """Raised when a version cannot be registered or deployed."""
+
+
+def prerelease_key(prerelease):
+    """Return a string that sorts prerelease tags by semver precedence.
+
+    Numeric identifiers are prefixed with their length so they compare
+    numerically (rc.2 < rc.10) and below alphanumeric identifiers, and a
+    release sorts above all of its prereleases.
+    """
+    if not prerelease:
+        return RELEASE_KEY
+    identifiers = []
+    for identifier in prerelease.split('.'):
+        if identifier.isdigit():
+            number = str(int(identifier))
+            identifiers.append(f"0{len(number):02d}{number}")
+        else:
+            identifiers.append(f"1{identifier}")
+    return IDENTIFIER_SEPARATOR.join(identifiers)
+
+
+def parse_semver(version):
+    """Return (major, minor, patch, is_release, prerelease key), or None if version is not semver."""
+    match = SEMVER_PATTERN.match(str(version))
+    if not match:
+        return None
+    prerelease = match.group('prerelease')
+    return (int(match.group('major')), int(match.group('minor')), int(match.group('patch')),
+            0 if prerelease else 1, prerelease_key(prerelease))
+
+
+def default_versions_dir(project_dir='.'):
+    """Return the version directory used by the macros."""
+    return Path(project_dir) / 'target' / VERSIONS_DIR_NAME
+
+
+def read_entries_file(path):
+    """Read registration or deployment entries from a JSON or CSV file.
+
+    JSON files hold a list of objects (or {"versions": [...]}); CSV files
+    have a header row with the same field names.
+    """
+    with open(path, 'r', newline='') as f:
+        if str(path).endswith('.csv'):
+            return list(csv.DictReader(f))
+        data = json.load(f)
+    if isinstance(data, dict):
+        data = data.get('versions', [])
+    return data
+
+
+def _as_bool(value):
+    if isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'y')
+    return bool(value)
+
+
+class VersionRegistry:
+    """SQLite-backed version registry with semver and environment indexes."""
+
+    def __init__(self, versions_dir):
+        self.versions_dir = Path(versions_dir)
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        self.path = self.versions_dir / REGISTRY_FILE_NAME
+        self.connection = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_SECONDS,
+                                          isolation_level=None)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Recompute the semver columns of registries written by an older schema."""
+        row = self.connection.execute(
+            "SELECT value FROM registry_metadata WHERE key = 'schema_version'"
+        ).fetchone()
+        if row is not None and row['value'] == SCHEMA_VERSION:
+            return
+        with self.transaction() as connection:
+            for version_row in connection.execute('SELECT model, version FROM versions').fetchall():
+                semver = parse_semver(version_row['version']) or (None, None, None, None, None)
+                connection.execute(
+                    'UPDATE versions SET major = ?, minor = ?, patch = ?, is_release = ?, prerelease = ? '
+                    'WHERE model = ? AND version = ?',
+                    semver + (version_row['model'], version_row['version'])
+                )
+            connection.execute(
+                "INSERT OR REPLACE INTO registry_metadata (key, value) VALUES ('schema_version', ?)",
+                (SCHEMA_VERSION,)
+            )
+
+    @classmethod
+    def for_project(cls, project_dir='.'):
+        """Open the registry for a dbt project."""
+        return cls(default_versions_dir(project_dir))
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    @contextmanager
+    def transaction(self):
+        """Run a block in a write transaction, holding the database write lock."""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def _insert_version(self, connection, model, entry):
+        semver = parse_semver(entry['version']) or (None, None, None, None, None)
+        cursor = connection.execute(
+            'INSERT OR IGNORE INTO versions (model, version, major, minor, patch, is_release, prerelease, '
+            'timestamp, is_breaking, status, description, author, last_deployed) '
+            'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            (model, entry['version']) + semver + (
+                entry['timestamp'], 1 if _as_bool(entry.get('is_breaking')) else 0,
+                entry.get('status', 'registered'), entry.get('description'),
+                entry.get('author'), entry.get('last_deployed'))
+        )
+        return cursor.rowcount == 1
+
+    def _insert_deployment(self, connection, model, version, deployment):
+        cursor = connection.execute(
+            'INSERT OR IGNORE INTO deployments (model, version, environment, timestamp, status) '
+            'VALUES (?, ?, ?, ?, ?)',
+            (model, version, deployment['environment'], deployment['timestamp'],
+             deployment.get('status', 'success'))
+        )
+        connection.execute(
+            'INSERT INTO environment_versions (environment, model, version, deployed_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (environment, model) DO UPDATE SET '
+            'version = excluded.version, deployed_at = excluded.deployed_at '
+            'WHERE excluded.deployed_at >= environment_versions.deployed_at',
+            (deployment['environment'], model, version, deployment['timestamp'])
+        )
+        return cursor.rowcount == 1
+
+    def _import_model_files(self, connection, models):
+        """Import versions written to the JSON files by the macros."""
+        for model in models:
+            model_file = self.versions_dir / f'{model}.json'
+            if not model_file.exists():
+                continue
+            with open(model_file, 'r') as f:
+                history = json.load(f)
+            for entry in history.get('versions', []):
+                if not self._insert_version(connection, model, entry) and entry.get('last_deployed'):
+                    connection.execute(
+                        'UPDATE versions SET status = ?, last_deployed = ? WHERE model = ? AND version = ? '
+                        'AND (last_deployed IS NULL OR last_deployed < ?)',
+                        (entry.get('status', 'deployed'), entry['last_deployed'], model,
+                         entry['version'], entry['last_deployed'])
+                    )
+                for deployment in entry.get('deployments') or []:
+                    self._insert_deployment(connection, model, entry['version'], deployment)
+
+    def sync_models(self, models):
+        """Import the JSON files of the given models, picking up versions written by the macros."""
+        with self.transaction() as connection:
+            self._import_model_files(connection, models)
+
+    def import_json_files(self):
+        """Import every per-model JSON file; returns the number of models read."""
+        models = [path.stem for path in sorted(self.versions_dir.glob('*.json'))]
+        with self.transaction() as connection:
+            self._import_model_files(connection, models)
+        return len(models)
+
+    def register(self, entries, known_models=None):
+        """Register versions in one transaction.
+
+        Each entry has model, version and optionally description,
+        is_breaking and author. Versions that are not semver are accepted,
+        like the register_version macro does, and rank below every semver
+        version. Raises VersionError, without registering anything, if the
+        model is not in known_models or the version already exists.
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        registered = []
+        models = {entry['model'] for entry in entries}
+        with self.transaction() as connection:
+            self._import_model_files(connection, models)
+            for entry in entries:
+                model, version = entry['model'], entry['version']
+                if known_models is not None and model not in known_models:
+                    raise VersionError(f"Model {model} does not exist. Cannot register version.")
+                version_entry = {
+                    'version': version,
+                    'timestamp': timestamp,
+                    'is_breaking': _as_bool(entry.get('is_breaking')),
+                    'status': 'registered'
+                }
+                for key in ('description', 'author'):
+                    if entry.get(key):
+                        version_entry[key] = entry[key]
+                if not self._insert_version(connection, model, version_entry):
+                    raise VersionError(f"Version {version} already exists for model {model}. "
+                                       f"Cannot register duplicate version.")
+                registered.append(dict(version_entry, model=model))
+            self._export_model_files(connection, models)
+        return registered
+
+    def deploy(self, entries, environment=None):
+        """Deploy versions in one transaction.
+
+        Each entry has model, version and optionally environment, which
+        defaults to `environment`. Raises VersionError, without deploying
+        anything, if a version is not registered.
+        """
+        timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+        deployed = []
+        models = {entry['model'] for entry in entries}
+        with self.transaction() as connection:
+            self._import_model_files(connection, models)
+            for entry in entries:
+                model, version = entry['model'], entry['version']
+                target_environment = entry.get('environment') or environment
+                if not target_environment:
+                    raise VersionError(f"No environment given for version {version} of model {model}.")
+                cursor = connection.execute(
+                    "UPDATE versions SET status = 'deployed', last_deployed = ? WHERE model = ? AND version = ?",
+                    (timestamp, model, version)
+                )
+                if cursor.rowcount == 0:
+                    raise VersionError(f"Version {version} does not exist for model {model}. Cannot deploy.")
+                self._insert_deployment(connection, model, version, {
+                    'environment': target_environment,
+                    'timestamp': timestamp,
+                    'status': 'success'
+                })
+                deployed.append({'model': model, 'version': version,
+                                 'environment': target_environment, 'timestamp': timestamp})
+            self._export_model_files(connection, models)
+        return deployed
+
+    def _version_entries(self, connection, model, environment=None):
+        """Return the model's version entries, newest registration first."""
+        if environment is None:
+            rows = connection.execute(
+                'SELECT * FROM versions WHERE model = ? ORDER BY timestamp DESC', (model,)
+            ).fetchall()
+        else:
+            rows = connection.execute(
+                'SELECT * FROM versions WHERE model = ? AND version IN '
+                '(SELECT version FROM deployments WHERE model = ? AND environment = ?) '
+                'ORDER BY timestamp DESC', (model, model, environment)
+            ).fetchall()
+
+        deployments = {}
+        for row in connection.execute(
+            'SELECT version, environment, timestamp, status FROM deployments WHERE model = ? '
+            'ORDER BY timestamp', (model,)
+        ):
+            deployments.setdefault(row['version'], []).append({
+                'environment': row['environment'],
+                'timestamp': row['timestamp'],
+                'status': row['status']
+            })
+
+        entries = []
+        for row in rows:
+            entry = {
+                'version': row['version'],
+                'timestamp': row['timestamp'],
+                'is_breaking': bool(row['is_breaking']),
+                'status': row['status']
+            }
+            for key in ('description', 'author', 'last_deployed'):
+                if row[key] is not None:
+                    entry[key] = row[key]
+            version_deployments = deployments.get(row['version'])
+            if version_deployments:
+                entry['environments'] = list(dict.fromkeys(d['environment'] for d in version_deployments))
+                entry['deployments'] = version_deployments
+            entries.append(entry)
+        return entries
+
+    def _export_model_files(self, connection, models):
+        """Regenerate the JSON files the version management macros read."""
+        for model in models:
+            history = {'model': model, 'versions': self._version_entries(connection, model)}
+            model_file = self.versions_dir / f'{model}.json'
+            temp_file = model_file.with_name(f'{model_file.name}.{os.getpid()}.tmp')
+            with open(temp_file, 'w') as f:
+                json.dump(history, f)
+            os.replace(temp_file, model_file)
+
+    def history(self, model, environment=None):
+        """Return {'model', 'versions'} like the get_version_history macro."""
+        return {'model': model, 'versions': self._version_entries(self.connection, model, environment)}
+
+    def get_latest(self, model, environment=None):
+        """Return the highest semver version of a model, or '0.0.0' if it has none.
+
+        With an environment, only versions deployed there are considered.
+        """
+        if environment is None:
+            row = self.connection.execute(
+                f'SELECT version FROM versions WHERE model = ? ORDER BY {SEMVER_ORDER} LIMIT 1', (model,)
+            ).fetchone()
+        else:
+            row = self.connection.execute(
+                f'SELECT version FROM versions WHERE model = ? AND version IN '
+                f'(SELECT version FROM deployments WHERE model = ? AND environment = ?) '
+                f'ORDER BY {SEMVER_ORDER} LIMIT 1', (model, model, environment)
+            ).fetchone()
+        return row['version'] if row else '0.0.0'
+
+    def is_breaking(self, model, version):
+        """Return True if the version is registered as a breaking change."""
+        row = self.connection.execute(
+            'SELECT is_breaking FROM versions WHERE model = ? AND version = ?', (model, version)
+        ).fetchone()
+        return bool(row and row['is_breaking'])
+
+    def get_deployed(self, environment, models=None):
+        """Return {model: version} currently deployed to an environment."""
+        rows = self.connection.execute(
+            'SELECT model, version FROM environment_versions WHERE environment = ?', (environment,)
+        ).fetchall()
+        deployed = {row['model']: row['version'] for row in rows}
+        if models is not None:
+            deployed = {model: deployed[model] for model in models if model in deployed}
+        return deployed
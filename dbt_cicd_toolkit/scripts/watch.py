@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+"""
+Watch mode for dbt-ci-cd-toolkit.
+
+Watches the project's model, macro, seed, snapshot and test paths and,
+on every save, updates only the saved nodes in the cached manifest
+graph, then prints the impacted models and planned tests. No dbt
+process is started: refs and sources are read from the saved SQL, and a
+file whose contents match the manifest checksum again stops counting as
+changed. File events come from watchdog (inotify on Linux) when it is
+installed, and from polling file modification times otherwise.
+"""
+
+import hashlib
+import os
+import queue
+import re
+import time
+from pathlib import Path
+
+import yaml
+
+from dbt_cicd_toolkit.scripts.manifest_graph import normalize_path
+from dbt_cicd_toolkit.scripts.selective_planner import plan_tests, selectors_for_tests
+
+DEFAULT_POLL_INTERVAL = 0.5
+# Quiet period that groups the events of one save (editors often write several times)
+DEBOUNCE_SECONDS = 0.1
+WATCHED_SUFFIXES = ('.sql', '.py', '.yml', '.yaml', '.csv')
+DEFAULT_PROJECT_PATHS = {
+    'model-paths': ['models'],
+    'macro-paths': ['macros'],
+    'seed-paths': ['seeds'],
+    'snapshot-paths': ['snapshots'],
+    'test-paths': ['tests'],
+    'analysis-paths': ['analyses']
+}
+# Files whose nodes carry the sha256 of the file as their checksum
+FILE_CHECKSUM_SUFFIXES = ('.sql', '.py', '.csv')
+
+_REF_CALL = re.compile(r"""\bref\s*\(\s*['"]([^'"]+)['"]\s*(?:,\s*['"]([^'"]+)['"])?""")
+_DYNAMIC_REF_CALL = re.compile(r"""\bref\s*\(\s*[^'"\s)]""")
+_SOURCE_CALL = re.compile(r"""\bsource\s*\(\s*['"]([^'"]+)['"]\s*,\s*['"]([^'"]+)['"]""")
+
+
+def read_project_config(project_dir):
+    """Return the parsed dbt_project.yml, or {} if it is missing or cannot be parsed."""
+    path = Path(project_dir) / 'dbt_project.yml'
+    if not path.exists():
+        return {}
+    try:
+        with open(path, 'r') as f:
+            return yaml.safe_load(f) or {}
+    except yaml.YAMLError as e:
+        print(f"Warning: Could not parse {path}: {e}")
+        return {}
+
+
+def project_paths(config):
+    """Return {path key: [directories]} from a dbt_project.yml config."""
+    return {key: [normalize_path(p).rstrip('/') for p in config.get(key) or default]
+            for key, default in DEFAULT_PROJECT_PATHS.items()}
+
+
+def _under(path, directories):
+    return any(path == d or path.startswith(d + '/') for d in directories)
+
+
+class PollingWatcher:
+    """Detect saved files by comparing modification times between polls."""
+
+    def __init__(self, root, directories, interval=DEFAULT_POLL_INTERVAL):
+        self.root = Path(root)
+        self.directories = directories
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self):
+        snapshot = {}
+        for directory in self.directories:
+            for dirpath, _, filenames in os.walk(self.root / directory):
+                for filename in filenames:
+                    if not filename.endswith(WATCHED_SUFFIXES):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    snapshot[normalize_path(os.path.relpath(path, self.root))] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self):
+        """Wait one interval and return the relative paths created, modified or deleted since the last call."""
+        time.sleep(self.interval)
+        snapshot = self._scan()
+        changed = {path for path, stat in snapshot.items() if self.snapshot.get(path) != stat}
+        changed.update(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self):
+        pass
+
+
+class WatchdogWatcher:
+    """Receive file events from watchdog, which uses inotify on Linux."""
+
+    def __init__(self, root, directories, interval=DEFAULT_POLL_INTERVAL):
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        self.root = Path(root).resolve()
+        self.interval = interval
+        self.events = queue.Queue()
+        events = self.events
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    events.put(event.src_path)
+                    if getattr(event, 'dest_path', None):
+                        events.put(event.dest_path)
+
+        self.observer = Observer()
+        for directory in directories:
+            if (self.root / directory).is_dir():
+                self.observer.schedule(Handler(), str(self.root / directory), recursive=True)
+        self.observer.start()
+
+    def _relative(self, path):
+        try:
+            return normalize_path(os.path.relpath(os.fsdecode(path), self.root))
+        except ValueError:
+            return None
+
+    def changes(self):
+        """Wait for events, then return the relative paths touched once the save settles."""
+        try:
+            paths = [self.events.get(timeout=self.interval)]
+        except queue.Empty:
+            return set()
+        while True:
+            try:
+                paths.append(self.events.get(timeout=DEBOUNCE_SECONDS))
+            except queue.Empty:
+                break
+        changed = {self._relative(path) for path in paths}
+        return {path for path in changed if path and path.endswith(WATCHED_SUFFIXES)}
+
+    def close(self):
+        self.observer.stop()
+        self.observer.join()
+
+
+def make_watcher(root, directories, polling=False, interval=DEFAULT_POLL_INTERVAL):
+    """Return a watchdog watcher, or a polling watcher if watchdog is missing or polling is forced."""
+    if not polling:
+        try:
+            return WatchdogWatcher(root, directories, interval)
+        except ImportError:
+            print("watchdog is not installed; polling for changes (pip install watchdog for inotify)")
+    return PollingWatcher(root, directories, interval)
+
+
+class WatchSession:
+    """Changed files since the watch started, applied incrementally to a manifest graph."""
+
+    def __init__(self, project_dir, graph, config=None, test_level='minimal', include_downstream=True):
+        config = config if config is not None else read_project_config(project_dir)
+        self.root = Path(project_dir)
+        self.graph = graph
+        # dbt_project.yml may be unreadable mid-edit; the manifest knows the name too
+        self.project_name = config.get('name') or graph.project_name
+        self.paths = project_paths(config)
+        self.test_level = test_level
+        self.include_downstream = include_downstream
+        self.changed = {}
+        self.original_nodes = {}
+        self.added_nodes = set()
+        self._sources = None
+        self._macro_index = None
+
+    def directories(self):
+        """Return every directory to watch."""
+        return sorted({d for directories in self.paths.values() for d in directories})
+
+    def _source_ids(self):
+        if self._sources is None:
+            self._sources = {}
+            for source_id in self.graph.sources:
+                parts = source_id.split('.')
+                if len(parts) >= 4:
+                    self._sources.setdefault((parts[2], '.'.join(parts[3:])), source_id)
+        return self._sources
+
+    def parse_parents(self, text, previous=()):
+        """Return the unique_ids referenced by ref() and source() calls in SQL or Python code.
+
+        Refs that cannot be read statically (e.g. ref(name) in a loop) keep
+        the previous dependencies, since they cannot be ruled out.
+        """
+        parents = {}
+        for first, second in _REF_CALL.findall(text):
+            model_id = self.graph.get_model_id(second or first)
+            if model_id:
+                parents[model_id] = None
+        sources = self._source_ids()
+        for source_name, table_name in _SOURCE_CALL.findall(text):
+            source_id = sources.get((source_name, table_name))
+            if source_id:
+                parents[source_id] = None
+        if _DYNAMIC_REF_CALL.search(text):
+            parents.update(dict.fromkeys(previous))
+        return list(parents)
+
+    def _macro_dependents(self, path):
+        """Return the nodes that use a macro defined in path, directly or through other macros."""
+        if self._macro_index is None:
+            by_path, callers, users = {}, {}, {}
+            for macro_id, macro in self.graph.macros.items():
+                if macro.get('original_file_path'):
+                    by_path.setdefault(normalize_path(macro['original_file_path']), []).append(macro_id)
+                for dependency in macro['depends_on']['macros']:
+                    callers.setdefault(dependency, []).append(macro_id)
+            for node_id, node in self.graph.nodes.items():
+                for macro_id in node['depends_on']['macros']:
+                    users.setdefault(macro_id, []).append(node_id)
+            self._macro_index = (by_path, callers, users)
+
+        by_path, callers, users = self._macro_index
+        macros = list(by_path.get(path, []))
+        seen = set(macros)
+        for macro_id in macros:
+            for caller in callers.get(macro_id, []):
+                if caller not in seen:
+                    seen.add(caller)
+                    macros.append(caller)
+        return list(dict.fromkeys(node_id for macro_id in macros for node_id in users.get(macro_id, [])))
+
+    def _new_node(self, path, text):
+        name = Path(path).stem
+        return f'model.{self.project_name}.{name}', {
+            'name': name,
+            'resource_type': 'model',
+            'original_file_path': path,
+            'package_name': self.project_name,
+            # Not in the manifest, so it never matches a manifest checksum
+            'checksum': None,
+            'config_hash': None,
+            'materialized': None,
+            'test_metadata': None,
+            'column_name': None,
+            'depends_on': {'nodes': self.parse_parents(text), 'macros': []}
+        }
+
+    def record_change(self, path):
+        """Apply one saved file to the graph and return what changed, or None if it matches the manifest."""
+        path = normalize_path(path)
+        full_path = self.root / path
+        if not full_path.exists():
+            added_ids = [node_id for node_id in self.graph.path_index.get(path, []) if node_id in self.added_nodes]
+            if added_ids:
+                # A model created during the watch is gone again
+                for node_id in added_ids:
+                    self.graph.remove_node(node_id)
+                    self.added_nodes.discard(node_id)
+                self.changed.pop(path, None)
+                return None
+            self.changed[path] = 'deleted'
+            return self.changed[path]
+
+        reason = 'modified'
+        node_ids = self.graph.path_index.get(path, [])
+        if path.endswith(FILE_CHECKSUM_SUFFIXES) and not _under(path, self.paths['macro-paths']):
+            # dbt hashes the raw bytes, so CRLF files must not be read in text mode
+            contents = full_path.read_bytes()
+            checksum = hashlib.sha256(contents).hexdigest()
+            text = contents.decode('utf-8', errors='replace')
+            if node_ids and all(self.graph.nodes[node_id]['checksum'] == checksum for node_id in node_ids):
+                # Saved back to its manifest contents: restore the manifest dependencies
+                for node_id in node_ids:
+                    if node_id in self.original_nodes:
+                        self.graph.update_node(node_id, self.original_nodes.pop(node_id))
+                self.changed.pop(path, None)
+                return None
+            if not path.endswith('.csv'):
+                for node_id in node_ids:
+                    node = self.graph.nodes[node_id]
+                    parents = self.parse_parents(text, node['depends_on']['nodes'])
+                    updated = dict(node, depends_on={'nodes': parents, 'macros': node['depends_on']['macros']})
+                    self.original_nodes.setdefault(node_id, node)
+                    if self.graph.update_node(node_id, updated):
+                        reason = 'dependencies changed'
+                if not node_ids and _under(path, self.paths['model-paths']):
+                    node_id, node = self._new_node(path, text)
+                    self.graph.update_node(node_id, node)
+                    self.added_nodes.add(node_id)
+                    reason = 'new model'
+        self.changed[path] = reason
+        return reason
+
+    def modified_ids(self):
+        """Return the unique_ids of every node changed by the files saved so far."""
+        node_ids = []
+        for path in self.changed:
+            node_ids.extend(self.graph.find_nodes_by_files([path]))
+            if _under(path, self.paths['macro-paths']):
+                node_ids.extend(self._macro_dependents(path))
+        return list(dict.fromkeys(node_ids))
+
+    def plan(self):
+        """Return (impacted model names, planned test unique_ids) for the current changes."""
+        impacted_models = self.graph.get_impacted_models_by_ids(
+            self.modified_ids(), include_downstream=self.include_downstream, exclude_current=False
+        )
+        return impacted_models, plan_tests(self.graph, impacted_models, self.test_level)
+
+
+def print_plan(session, impacted_models, test_ids, elapsed=None):
+    """Print the current changes, impacted models and planned tests."""
+    timing = f" in {elapsed * 1000:.0f} ms" if elapsed is not None else ''
+    print(f"Changed files ({len(session.changed)}): {', '.join(sorted(session.changed)) or 'none'}")
+    print(f"Impacted models ({len(impacted_models)}): {', '.join(impacted_models) or 'none'}")
+    print(f"Planned {session.test_level} tests: {len(test_ids)}{timing}", flush=True)
+
+
+def watch(session, watcher, run_tests=False, runner=None):
+    """Print the impact of every save until interrupted."""
+    impacted_models, test_ids = session.plan()
+    print(f"Watching {', '.join(session.directories())} (Ctrl+C to stop)")
+    print_plan(session, impacted_models, test_ids)
+    try:
+        while True:
+            paths = watcher.changes()
+            if not paths:
+                continue
+            start = time.monotonic()
+            for path in sorted(paths):
+                reason = session.record_change(path)
+                print(f"[{time.strftime('%H:%M:%S')}] {path}: {reason or 'matches the manifest again'}")
+            impacted_models, test_ids = session.plan()
+            print_plan(session, impacted_models, test_ids, time.monotonic() - start)
+
+            if run_tests and test_ids:
+                result = runner.invoke('test', ['--select'] + selectors_for_tests(session.graph, test_ids))
+                failed = result.failed_results()
+                print(f"Tests {'passed' if result.success else 'failed'}"
+                      + (f": {', '.join(r.get('unique_id') for r in failed)}" if failed else ''), flush=True)
+    except KeyboardInterrupt:
+        print("Stopped watching")
+    finally:
+        watcher.close()
+    return 0
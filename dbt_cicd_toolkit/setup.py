@@ -11,13 +11,16 @@ setup(
     url="https://github.com/dbt-labs/dbt-ci-cd-toolkit",
     packages=find_packages(),
     include_package_data=True,
-    python_requires=">=3.7",
+    python_requires=">=3.8",
     install_requires=[
-        "dbt-core>=1.0.0",
+        "dbt-core>=1.6.0",
         "pyyaml>=5.1",
         "click>=7.0",
         "jinja2>=2.10",
     ],
+    extras_require={
+        "watch": ["watchdog>=2.0"],
+    },
     entry_points={
         "console_scripts": [
             "dbt-cicd=dbt_cicd_toolkit.scripts.cli:main",
@@ -27,7 +30,6 @@ setup(
         "Development Status :: 4 - Beta",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
         "Programming Language :: Python :: 3.8",
         "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
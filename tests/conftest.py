@@ -0,0 +1,96 @@
+import io
+import json
+import os
+import sys
+import threading
+from http.server import HTTPServer
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from dbt_cicd_toolkit.scripts.daemon import DaemonState, _make_handler, state_file_path  # noqa: E402
+from dbt_cicd_toolkit.scripts.manifest_graph import ManifestGraph  # noqa: E402
+from dbt_cicd_toolkit.scripts.manifest_reader import project_macro, project_node  # noqa: E402
+
+
+def make_node(resource_type, name, parents=(), package='proj', **fields):
+    """Return (unique_id, raw manifest node) for a node of the given type."""
+    node = {
+        'name': name,
+        'resource_type': resource_type,
+        'package_name': package,
+        'original_file_path': fields.pop('path', f"models/{name}.sql"),
+        'checksum': {'name': 'sha256', 'checksum': fields.pop('checksum', name)},
+        'config': fields.pop('config', {'materialized': 'view'}),
+        'depends_on': {'nodes': list(parents), 'macros': fields.pop('macros', [])},
+    }
+    node.update(fields)
+    return f"{resource_type}.{package}.{name}", node
+
+
+def make_macro(name, sql, macros=(), package='proj'):
+    """Return (unique_id, raw manifest macro)."""
+    return f"macro.{package}.{name}", {
+        'name': name,
+        'package_name': package,
+        'original_file_path': f"macros/{name}.sql",
+        'macro_sql': sql,
+        'depends_on': {'macros': list(macros)},
+    }
+
+
+def build_graph(nodes, sources=(), macros=()):
+    """Build a ManifestGraph from (unique_id, raw node) pairs."""
+    return ManifestGraph(
+        {unique_id: project_node(node) for unique_id, node in nodes},
+        {unique_id: project_node(node) for unique_id, node in sources},
+        macros={unique_id: project_macro(macro) for unique_id, macro in macros},
+    )
+
+
+@pytest.fixture
+def manifest():
+    """Factories for raw manifest members and graphs built from them."""
+    class Factories:
+        node = staticmethod(make_node)
+        macro = staticmethod(make_macro)
+        graph = staticmethod(build_graph)
+    return Factories
+
+
+class DetachedDaemonState(DaemonState):
+    """Daemon state whose own stdin is empty, as for a backgrounded `dbt-cicd serve`."""
+
+    def run(self, argv, cwd, stdin=None):
+        client_stdin, sys.stdin = sys.stdin, io.StringIO('')
+        try:
+            return super().run(argv, cwd, stdin)
+        finally:
+            sys.stdin = client_stdin
+
+
+@pytest.fixture
+def daemon(tmp_path, manifest):
+    """A daemon for a two-model project, serving from a thread."""
+    customers = manifest.node('model', 'customers')
+    orders = manifest.node('model', 'orders', parents=[customers[0]])
+    (tmp_path / 'target').mkdir()
+    (tmp_path / 'target' / 'manifest.json').write_text(json.dumps({
+        'metadata': {'project_name': 'proj'},
+        'nodes': dict([customers, orders]),
+        'sources': {},
+        'macros': {}
+    }))
+
+    server = HTTPServer(('127.0.0.1', 0), _make_handler(DetachedDaemonState(tmp_path), 'token'))
+    state_path = state_file_path(tmp_path)
+    state_path.parent.mkdir(parents=True, exist_ok=True)
+    state_path.write_text(json.dumps({'pid': os.getpid(), 'host': '127.0.0.1',
+                                      'port': server.server_address[1], 'token': 'token'}))
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield tmp_path
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,110 @@
+import asyncio
+import os
+import sys
+import time
+
+import pytest
+
+from dbt_cicd_toolkit.scripts.async_promotion import promote_environments
+from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+
+# Behaves according to --target: staging passes, production fails a test,
+# flaky errors once before passing and hung never finishes
+STUB_DBT = """#!{python}
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+args = sys.argv[1:]
+target = args[args.index('--target') + 1]
+target_path = Path(args[args.index('--target-path') + 1])
+print(f"stub dbt {{' '.join(args[:1])}} against {{target}}", flush=True)
+
+def write_results(status):
+    results = [{{'unique_id': 'test.proj.not_null_orders_id', 'status': status}}]
+    (target_path / 'run_results.json').write_text(json.dumps({{'results': results}}))
+
+if target == 'staging':
+    write_results('pass')
+    sys.exit(0)
+if target == 'production':
+    write_results('fail')
+    sys.exit(1)
+if target == 'flaky':
+    attempts = target_path / 'attempts'
+    if not attempts.exists():
+        attempts.write_text('1')
+        print('Database Error: connection reset', flush=True)
+        sys.exit(2)
+    write_results('pass')
+    sys.exit(0)
+# A child holding the output pipe open, like a dbt adapter's helper process
+subprocess.Popen(['sleep', '15'])
+time.sleep(15)
+"""
+
+
+@pytest.fixture
+def stub_dbt(tmp_path, monkeypatch):
+    bin_dir = tmp_path / 'bin'
+    bin_dir.mkdir()
+    dbt = bin_dir / 'dbt'
+    dbt.write_text(STUB_DBT.format(python=sys.executable))
+    dbt.chmod(0o755)
+    monkeypatch.setenv('PATH', f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    project_dir = tmp_path / 'project'
+    project_dir.mkdir()
+    return project_dir
+
+
+def promote(project_dir, environments, store=None, **kwargs):
+    return asyncio.run(promote_environments(project_dir, environments, ['orders'], store=store, **kwargs))
+
+
+def test_promotions_are_recorded_after_all_environments(tmp_path):
+    with PromotionStore(tmp_path / 'state') as store:
+        results = asyncio.run(promote_environments(
+            tmp_path, ['staging', 'production'], ['orders', 'customers'], concurrency=2, store=store,
+            require_tests=False,
+        ))
+
+        assert [result['status'] for result in results] == ['promoted', 'promoted']
+        status = store.get_status()
+        assert set(status) == {'staging', 'production'}
+        assert set(status['production']) == {'orders', 'customers'}
+
+
+def test_failed_validation_is_not_recorded(stub_dbt, tmp_path):
+    with PromotionStore(tmp_path / 'state') as store:
+        results = promote(stub_dbt, ['staging', 'production'], store=store, retries=1)
+
+        assert [result['status'] for result in results] == ['promoted', 'failed']
+        # Failing tests are final, so they are not retried
+        assert results[1]['attempts'] == 1
+        assert results[1]['failed_tests'] == ['test.proj.not_null_orders_id']
+        assert set(store.get_status()) == {'staging'}
+
+
+def test_dbt_errors_are_retried(stub_dbt):
+    results = promote(stub_dbt, ['flaky'], retries=1)
+    assert results[0]['status'] == 'promoted'
+    assert results[0]['attempts'] == 2
+
+    (stub_dbt / 'target' / 'promotion' / 'flaky' / 'attempts').unlink()
+    results = promote(stub_dbt, ['flaky'], retries=0)
+    assert results[0]['status'] == 'error'
+    assert results[0]['message'] == 'Database Error: connection reset'
+
+
+def test_hung_dbt_is_killed_at_the_timeout(stub_dbt, tmp_path):
+    start = time.monotonic()
+    with PromotionStore(tmp_path / 'state') as store:
+        results = promote(stub_dbt, ['hung', 'staging'], store=store, retries=1, timeout=0.5)
+
+        assert [result['status'] for result in results] == ['timeout', 'promoted']
+        assert results[0]['attempts'] == 2
+        assert set(store.get_status()) == {'staging'}
+    # The dbt process group, including the child holding its output pipe, was killed
+    assert time.monotonic() - start < 10
@@ -0,0 +1,60 @@
+import io
+import json
+import sys
+
+import pytest
+
+from dbt_cicd_toolkit.scripts.cli import forwards_to_daemon, main, parse_arguments, run_command
+
+
+@pytest.mark.parametrize('argv', [
+    ['impact-analysis', '--files', 'models/orders.sql'],
+    ['graph'],
+    ['version', 'latest', '--model', 'orders'],
+    ['promotion', 'status'],
+])
+def test_queries_are_forwarded_to_the_daemon(argv):
+    assert forwards_to_daemon(parse_arguments(argv))
+
+
+@pytest.mark.parametrize('argv', [
+    ['promote', '--models', 'orders', '--environment', 'staging'],
+    ['promote', '--models', 'orders', '--environments', 'staging', 'production'],
+    ['version', 'deploy', '--model', 'orders', '--version', '1.0.0', '--environment', 'production'],
+    ['selective-testing', '--files', 'models/orders.sql'],
+])
+def test_test_runs_stay_in_the_client(argv):
+    assert not forwards_to_daemon(parse_arguments(argv))
+
+
+def test_files_from_stdin_is_read_by_the_client_and_sent_to_the_daemon(daemon, monkeypatch, capsys):
+    monkeypatch.delenv('DBT_CICD_NO_DAEMON', raising=False)
+    monkeypatch.setattr(sys, 'argv', ['dbt-cicd', 'impact-analysis', '--files-from', '-',
+                                      '--include-downstream', '--format', 'json', '--project-dir', str(daemon)])
+    monkeypatch.setattr(sys, 'stdin', io.StringIO("models/customers.sql\n"))
+
+    with pytest.raises(SystemExit) as exit_info:
+        main()
+
+    assert exit_info.value.code == 0
+    assert json.loads(capsys.readouterr().out)['impacted_models'] == ['customers', 'orders']
+    assert sys.stdin.read() == ''
+
+
+def test_selective_testing_merges_files_and_files_from(tmp_path, monkeypatch):
+    from dbt_cicd_toolkit.scripts import run_selective_tests
+
+    changed = tmp_path / 'changed.txt'
+    changed.write_text("models/customers.sql\nmodels/orders.sql\n")
+    received = []
+    monkeypatch.setattr(run_selective_tests, 'main',
+                        lambda: received.append(run_selective_tests.get_changed_files(
+                            run_selective_tests.parse_arguments())))
+
+    monkeypatch.setattr(sys, 'argv', list(sys.argv))
+
+    with pytest.raises(SystemExit):
+        run_command(['selective-testing', '--files', 'models/orders.sql', 'models/payments.sql',
+                     '--files-from', str(changed)])
+
+    assert received == [['models/orders.sql', 'models/payments.sql', 'models/customers.sql']]
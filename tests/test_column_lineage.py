@@ -0,0 +1,131 @@
+from dbt_cicd_toolkit.scripts.column_lineage import (
+    ALL_COLUMNS,
+    ROWS,
+    impacted_columns,
+    opaque_lineage,
+    parse_sql,
+    resolve_lineage,
+    seed_changed_columns,
+)
+
+ORDERS = 'model.proj.orders'
+CUSTOMERS = 'model.proj.customers'
+RELATION_NAMES = {ORDERS: {'orders'}, CUSTOMERS: {'customers'}}
+
+
+def lineage_of(sql, parents=(ORDERS,), lineage=None):
+    return resolve_lineage(parse_sql(sql), list(parents), RELATION_NAMES, lineage or {})
+
+
+def deps(lineage, column):
+    return lineage['columns'][column][0]
+
+
+def test_select_aliases():
+    lineage = lineage_of("select id as order_id, amount * 100 as amount_cents from orders")
+
+    assert set(lineage['columns']) == {'order_id', 'amount_cents'}
+    assert (ORDERS, 'id') in deps(lineage, 'order_id')
+    assert (ORDERS, 'amount') in deps(lineage, 'amount_cents')
+    assert (ORDERS, 'amount') not in deps(lineage, 'order_id')
+
+
+def test_filter_columns_are_row_dependencies():
+    lineage = lineage_of("select id from orders where status = 'placed'")
+
+    assert (ORDERS, 'status') in lineage['row_deps']
+    assert (ORDERS, 'status') in deps(lineage, 'id')
+
+
+def test_cte_passthrough():
+    lineage = lineage_of("with source as (select * from orders), renamed as (select * from source) "
+                         "select * from renamed")
+
+    assert lineage['columns'] == {}
+    assert lineage['passthrough'] == {ORDERS}
+    assert not lineage['opaque']
+
+
+def test_select_star_with_extra_columns():
+    lineage = lineage_of("select *, amount * 2 as double_amount from orders")
+
+    assert lineage['passthrough'] == {ORDERS}
+    assert (ORDERS, 'amount') in deps(lineage, 'double_amount')
+
+
+def test_join_with_qualified_columns():
+    lineage = lineage_of("select o.id, c.name as customer_name from orders as o "
+                         "left join customers c on o.customer_id = c.id", (ORDERS, CUSTOMERS))
+
+    assert (CUSTOMERS, 'name') in deps(lineage, 'customer_name')
+    assert (ORDERS, 'name') not in deps(lineage, 'customer_name')
+    assert (ORDERS, 'id') in deps(lineage, 'id')
+    # Join keys decide which rows exist, so every column depends on them
+    assert {(ORDERS, 'customer_id'), (CUSTOMERS, 'id')} <= lineage['row_deps']
+
+
+def test_unparseable_sql_is_opaque():
+    lineage = resolve_lineage(None, [ORDERS], RELATION_NAMES, {})
+
+    assert lineage == opaque_lineage([ORDERS])
+    assert lineage['opaque']
+
+
+def lineage_graph(manifest):
+    graph = manifest.graph([
+        manifest.node('model', 'orders'),
+        manifest.node('model', 'stg_orders', parents=[ORDERS]),
+        manifest.node('model', 'opaque', parents=['model.proj.stg_orders']),
+    ])
+    stg_orders = lineage_of("select id, amount from orders")
+    lineage = {
+        'model.proj.stg_orders': stg_orders,
+        'model.proj.opaque': opaque_lineage(['model.proj.stg_orders']),
+    }
+    return graph, lineage
+
+
+def test_impacted_columns_follow_changed_column(manifest):
+    graph, lineage = lineage_graph(manifest)
+
+    impacted = impacted_columns(graph, lineage, {ORDERS: {'amount'}})
+
+    assert impacted[ORDERS] == {'amount'}
+    assert impacted['model.proj.stg_orders'] == {'amount'}
+    # Opaque models depend on every upstream column
+    assert impacted['model.proj.opaque'] == {ALL_COLUMNS}
+
+
+def test_unused_column_does_not_impact_downstream(manifest):
+    graph, lineage = lineage_graph(manifest)
+
+    impacted = impacted_columns(graph, lineage, {ORDERS: {'discount'}})
+
+    assert impacted == {ORDERS: {'discount'}}
+
+
+def test_all_columns_fallback_impacts_every_column(manifest):
+    graph, lineage = lineage_graph(manifest)
+    assert (ORDERS, ROWS) in lineage['model.proj.stg_orders']['row_deps']
+
+    impacted = impacted_columns(graph, lineage, {ORDERS: {ALL_COLUMNS}})
+
+    assert impacted['model.proj.stg_orders'] == {ALL_COLUMNS}
+    assert impacted['model.proj.opaque'] == {ALL_COLUMNS}
+
+
+def test_seed_changed_columns(manifest):
+    graph, lineage = lineage_graph(manifest)
+    previous = dict(lineage)
+    previous['model.proj.stg_orders'] = lineage_of("select id, amount * 100 as amount from orders")
+
+    changed = seed_changed_columns(
+        graph, lineage, modified_ids=[ORDERS], column_selectors=['opaque.total'],
+        state_changes={'model.proj.stg_orders': ['body']}, state_lineage=previous,
+    )
+    assert changed == {ORDERS: {ALL_COLUMNS}, 'model.proj.stg_orders': {'amount'}, 'model.proj.opaque': {'total'}}
+
+    # Changes that are not visible in the SQL fall back to every column
+    changed = seed_changed_columns(graph, lineage, state_changes={'model.proj.stg_orders': ['config']},
+                                   state_lineage=previous)
+    assert changed == {'model.proj.stg_orders': {ALL_COLUMNS}}
@@ -0,0 +1,93 @@
+import json
+import os
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+import pytest
+
+from dbt_cicd_toolkit.scripts import dbt_runner
+from dbt_cicd_toolkit.scripts.daemon import TOKEN_HEADER, DaemonState, forward_to_daemon, state_file_path
+
+
+def request(project_dir, path, payload=None, token='token'):
+    """Send a request to the daemon serving project_dir and return (status, body)."""
+    port = json.loads(state_file_path(project_dir).read_text())['port']
+    headers = {TOKEN_HEADER: token} if token is not None else {}
+    data = json.dumps(payload).encode('utf-8') if payload is not None else None
+    try:
+        with urlopen(Request(f"http://127.0.0.1:{port}{path}", data=data, headers=headers), timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_health_reports_the_project(daemon):
+    assert request(daemon, '/health') == (200, {'status': 'ok', 'project_dir': str(daemon.resolve())})
+    assert request(daemon, '/missing')[0] == 404
+
+
+@pytest.mark.parametrize('token', [None, '', 'wrong'])
+def test_run_requires_the_token(daemon, token):
+    status, body = request(daemon, '/run', {'argv': ['graph'], 'cwd': str(daemon)}, token=token)
+    assert (status, body) == (403, {'error': 'invalid token'})
+
+
+def test_unknown_post_path_is_not_found(daemon):
+    assert request(daemon, '/shutdown', {})[0] == 404
+
+
+def test_run_returns_the_exit_code_and_output(daemon):
+    status, body = request(daemon, '/run', {
+        'argv': ['impact-analysis', '--files', 'models/customers.sql', '--include-downstream',
+                 '--format', 'json', '--project-dir', str(daemon)],
+        'cwd': str(daemon),
+    })
+
+    assert status == 200
+    assert body['exit_code'] == 0
+    assert json.loads(body['output'])['impacted_models'] == ['customers', 'orders']
+
+
+def test_failing_command_reports_its_exit_code(daemon):
+    status, body = request(daemon, '/run', {'argv': ['version', 'latest'], 'cwd': str(daemon)})
+
+    assert status == 200
+    assert body['exit_code'] == 2
+    # The daemon restores its own working directory after each command
+    assert os.getcwd() != str(daemon)
+
+
+def test_forward_to_daemon_prints_the_output(daemon, monkeypatch, capsys):
+    monkeypatch.chdir(daemon)
+    argv = ['impact-analysis', '--files', 'models/orders.sql', '--format', 'json', '--project-dir', str(daemon)]
+
+    assert forward_to_daemon(argv, daemon) == 0
+    assert json.loads(capsys.readouterr().out)['impacted_models'] == ['orders']
+
+
+def test_forward_to_daemon_falls_back_without_a_reachable_daemon(tmp_path):
+    assert forward_to_daemon(['graph'], tmp_path) is None
+
+    state_path = state_file_path(tmp_path)
+    state_path.parent.mkdir(parents=True)
+    state_path.write_text(json.dumps({'pid': 0, 'host': '127.0.0.1', 'port': 1, 'token': 'token'}))
+    assert forward_to_daemon(['graph'], tmp_path) is None
+
+    state_path.write_text('{not json')
+    assert forward_to_daemon(['graph'], tmp_path) is None
+
+
+def test_changed_manifest_drops_the_warm_dbt_project(tmp_path, monkeypatch):
+    manifest_path = tmp_path / 'target' / 'manifest.json'
+    manifest_path.parent.mkdir()
+    manifest_path.write_text('{}')
+    state = DaemonState(tmp_path)
+    monkeypatch.setitem(dbt_runner._default_runners, 'warm', object())
+
+    state.refresh()
+    assert 'warm' in dbt_runner._default_runners
+
+    stat = os.stat(manifest_path)
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    state.refresh()
+    assert 'warm' not in dbt_runner._default_runners
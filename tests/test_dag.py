@@ -0,0 +1,84 @@
+import random
+
+from dbt_cicd_toolkit.scripts.dag import CompactDag, bitset_add, bitset_contains, iter_bitset, new_bitset
+
+
+def random_parents(size=300, seed=7):
+    """A random DAG: node i only has parents with a lower index, plus an external source."""
+    rng = random.Random(seed)
+    parents = {}
+    for i in range(size):
+        candidates = rng.sample(range(i), min(i, rng.randint(0, 3)))
+        parents[f"n{i}"] = [f"n{j}" for j in candidates]
+    parents['n0'].append('source.raw')
+    return parents
+
+
+def reachable(parents, seeds, upstream=False):
+    """Every node reachable from seeds, excluding the seeds, by naive search."""
+    edges = {}
+    for child, parent_ids in parents.items():
+        for parent in parent_ids:
+            source, target = (child, parent) if upstream else (parent, child)
+            edges.setdefault(source, []).append(target)
+    seen, stack = set(seeds), list(seeds)
+    while stack:
+        for target in edges.get(stack.pop(), []):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen - set(seeds)
+
+
+def test_bitset_members():
+    bits = new_bitset(20)
+    for i in (0, 7, 8, 19):
+        bitset_add(bits, i)
+    assert list(iter_bitset(bits)) == [0, 7, 8, 19]
+    assert bitset_contains(bits, 8) and not bitset_contains(bits, 9)
+
+
+def test_closures_match_a_naive_search():
+    parents = random_parents()
+    dag = CompactDag.from_parents(parents)
+    for seeds in (['n0'], ['n5', 'n40', 'n41'], ['n299'], ['source.raw']):
+        for upstream in (False, True):
+            order, bits = dag.closure(dag.intern(seeds), upstream)
+            reached = [dag.ids[i] for i in order]
+            assert len(reached) == len(set(reached))
+            assert set(reached) == reachable(parents, seeds, upstream)
+            assert {dag.ids[i] for i in iter_bitset(bits)} == set(reached) | set(seeds)
+
+
+def test_unknown_parents_are_interned():
+    dag = CompactDag.from_parents({'model.a': ['source.raw']})
+    assert [dag.ids[i] for i in dag.children(dag.index['source.raw'])] == ['model.a']
+    assert dag.intern(['model.a', 'model.missing']) == [dag.index['model.a']]
+
+
+def test_waves_follow_paths_through_non_members():
+    # a -> x -> b, where x is not promoted, and c is independent
+    dag = CompactDag.from_parents({'a': [], 'x': ['a'], 'b': ['x'], 'c': []})
+    waves = dag.waves(dag.intern(['a', 'b', 'c']))
+    assert [[dag.ids[i] for i in wave] for wave in waves] == [['a', 'c'], ['b']]
+
+
+def test_every_member_comes_after_its_upstream_members():
+    parents = random_parents()
+    dag = CompactDag.from_parents(parents)
+    members = [f"n{i}" for i in range(0, 300, 3)]
+    wave_of = {dag.ids[i]: number for number, wave in enumerate(dag.waves(dag.intern(members))) for i in wave}
+
+    assert set(wave_of) == set(members)
+    for member in members:
+        for upstream in reachable(parents, [member], upstream=True) & set(members):
+            assert wave_of[upstream] < wave_of[member]
+
+
+def test_index_round_trip():
+    dag = CompactDag.from_parents(random_parents(50))
+    restored = CompactDag.from_index(dag.to_index())
+    assert restored.ids == dag.ids
+    for i in range(len(dag)):
+        assert list(restored.children(i)) == list(dag.children(i))
+        assert list(restored.parents(i)) == list(dag.parents(i))
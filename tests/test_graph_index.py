@@ -0,0 +1,100 @@
+import json
+import os
+
+import pytest
+
+from dbt_cicd_toolkit.scripts import graph_index
+from dbt_cicd_toolkit.scripts.graph_index import (
+    INDEX_VERSION,
+    default_index_path,
+    load_or_build_index,
+    read_index,
+    write_index,
+)
+
+
+def write_manifest(path, manifest, models):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        'metadata': {'project_name': 'proj'},
+        'nodes': dict(manifest.node('model', name) for name in models),
+        'sources': {},
+        'macros': {}
+    }))
+
+
+@pytest.fixture
+def manifest_path(tmp_path, manifest):
+    path = tmp_path / 'target' / 'manifest.json'
+    write_manifest(path, manifest, ['orders'])
+    return path
+
+
+def forbid(monkeypatch, name):
+    def fail(*args, **kwargs):
+        raise AssertionError(f"{name} should not be called")
+    monkeypatch.setattr(graph_index, name, fail)
+
+
+def test_matching_stat_skips_hashing_and_parsing(manifest_path, monkeypatch):
+    load_or_build_index(manifest_path)
+    forbid(monkeypatch, 'hash_manifest')
+    forbid(monkeypatch, 'build_index')
+
+    graph = load_or_build_index(manifest_path)
+
+    assert graph.get_model_id('orders') == 'model.proj.orders'
+
+
+def test_touched_manifest_is_rehashed_but_not_rebuilt(manifest_path, monkeypatch):
+    load_or_build_index(manifest_path)
+    stat = os.stat(manifest_path)
+    os.utime(manifest_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    forbid(monkeypatch, 'build_index')
+
+    load_or_build_index(manifest_path)
+
+    index = read_index(default_index_path(manifest_path))
+    assert index['manifest_stat']['mtime_ns'] == stat.st_mtime_ns + 10 ** 9
+
+
+def test_changed_manifest_rebuilds_the_index(manifest_path, manifest):
+    load_or_build_index(manifest_path)
+    write_manifest(manifest_path, manifest, ['orders', 'customers'])
+
+    graph = load_or_build_index(manifest_path)
+
+    assert graph.get_model_id('customers') == 'model.proj.customers'
+    assert read_index(default_index_path(manifest_path))['manifest_hash'] == graph_index.hash_manifest(manifest_path)
+
+
+def test_index_of_another_version_is_rebuilt(manifest_path):
+    load_or_build_index(manifest_path)
+    index_path = default_index_path(manifest_path)
+    stale = read_index(index_path)
+    stale['version'] = INDEX_VERSION - 1
+    stale['graph'] = None
+    write_index(index_path, stale)
+
+    assert read_index(index_path) is None
+    graph = load_or_build_index(manifest_path)
+
+    assert graph.get_model_id('orders') == 'model.proj.orders'
+    assert read_index(index_path)['version'] == INDEX_VERSION
+
+
+def test_corrupt_index_is_ignored(manifest_path):
+    index_path = default_index_path(manifest_path)
+    index_path.parent.mkdir()
+    index_path.write_bytes(b'not a pickle')
+
+    assert read_index(index_path) is None
+    assert load_or_build_index(manifest_path).get_model_id('orders') == 'model.proj.orders'
+
+
+def test_write_index_leaves_no_temporary_file(tmp_path):
+    index_path = tmp_path / 'index' / 'graph_index.pickle'
+    write_index(index_path, {'version': INDEX_VERSION})
+
+    assert read_index(index_path) == {'version': INDEX_VERSION}
+    assert os.listdir(index_path.parent) == ['graph_index.pickle']
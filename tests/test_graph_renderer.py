@@ -0,0 +1,32 @@
+import io
+
+from dbt_cicd_toolkit.scripts.graph_renderer import build_view, promoted_environments, render_graph
+
+
+def test_colliding_names_get_distinct_ids(manifest):
+    graph = manifest.graph([
+        manifest.node('model', 'a_b', path='models/a_b/x.sql'),
+        manifest.node('model', 'a-b', parents=['model.proj.a_b'], path='models/a/b/y.sql'),
+    ])
+    model_ids = ['model.proj.a_b', 'model.proj.a-b']
+
+    nodes, edges = build_view(graph, model_ids)
+    assert len(nodes) == 2
+    assert [node['label'] for node in nodes.values()] == ['a_b', 'a-b']
+    assert list(edges) == [tuple(nodes)]
+
+    clusters, _ = build_view(graph, model_ids, cluster_by='directory')
+    assert sorted(node['label'] for node in clusters.values()) == ['models/a/b', 'models/a_b']
+
+
+def test_promoted_environment_uses_allocated_id(manifest):
+    graph = manifest.graph([manifest.node('model', 'a_b'), manifest.node('model', 'a-b')])
+    model_ids = ['model.proj.a_b', 'model.proj.a-b']
+    nodes, edges = build_view(graph, model_ids)
+
+    pairs = promoted_environments({'prod': {'a-b': {'promoted': True}}}, nodes, graph, model_ids)
+    assert pairs == [('a_b_2', 'prod')]
+
+    out = io.StringIO()
+    render_graph(out, nodes, edges, 'dot', pairs)
+    assert '"a_b_2" -> "prod_a_b_2";' in out.getvalue()
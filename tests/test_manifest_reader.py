@@ -0,0 +1,96 @@
+import io
+import json
+
+import pytest
+
+from dbt_cicd_toolkit.scripts.manifest_reader import (
+    ManifestStream,
+    iter_manifest_members,
+    project_node,
+    read_manifest,
+)
+
+
+def realistic_manifest():
+    """A manifest shaped like dbt's, with the values that stress a streaming tokenizer."""
+    nodes = {}
+    for i in range(40):
+        unique_id = f"model.jaffle_shop.stg_orders_{i}"
+        nodes[unique_id] = {
+            'name': f"stg_orders_{i}",
+            'resource_type': 'model',
+            'package_name': 'jaffle_shop',
+            'original_file_path': f"models\\staging\\stg_orders_{i}.sql",
+            'fqn': ['jaffle_shop', 'staging', f"stg_orders_{i}"],
+            'checksum': {'name': 'sha256', 'checksum': f"{i:064x}"},
+            'config': {'materialized': 'view', 'meta': {}, 'tags': [], 'quoting': {}, 'enabled': True},
+            'unrendered_config': {'materialized': 'view'},
+            'raw_code': "select *\n  from {{ source('raw', 'orders') }} -- \"quoted\" \\ {brace} [bracket]",
+            'description': "Orders — ünïcödé, emoji \U0001F600 and escapes \t ",
+            'columns': {'id': {'name': 'id', 'data_type': None, 'meta': {}, 'tags': []}},
+            'created_at': 1700000000.123456 + i,
+            'build_path': None,
+            'depends_on': {'nodes': ['source.jaffle_shop.raw.orders'] if i == 0
+                           else [f"model.jaffle_shop.stg_orders_{i - 1}"], 'macros': []},
+        }
+    return {
+        'metadata': {'dbt_version': '1.7.4', 'project_name': 'jaffle_shop', 'env': {}},
+        'nodes': nodes,
+        'sources': {
+            'source.jaffle_shop.raw.orders': {
+                'name': 'orders', 'resource_type': 'source', 'package_name': 'jaffle_shop',
+                'original_file_path': 'models/staging/sources.yml', 'depends_on': {},
+                'freshness': {'warn_after': {'count': 12, 'period': 'hour'}, 'error_after': {}},
+            }
+        },
+        'macros': {},
+        'exposures': {'exposure.jaffle_shop.dashboard': {'depends_on': {'nodes': list(nodes)}}},
+        'child_map': {unique_id: [] for unique_id in nodes},
+        'semantic_models': {},
+        'disabled': {},
+        'numbers': [0, -1, 2.5e-3, 1e100, True, False, None],
+    }
+
+
+@pytest.fixture
+def manifest_path(tmp_path):
+    path = tmp_path / 'manifest.json'
+    path.write_text(json.dumps(realistic_manifest(), indent=2), encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 64, 1024 * 1024])
+def test_streamed_members_match_json_load(manifest_path, chunk_size):
+    with open(manifest_path, encoding='utf-8') as f:
+        expected = json.load(f)
+
+    streamed = {}
+    for section, unique_id, node in iter_manifest_members(manifest_path, ('nodes', 'sources', 'metadata'),
+                                                          chunk_size=chunk_size):
+        streamed.setdefault(section, {})[unique_id] = node
+
+    assert streamed == {section: expected[section] for section in ('nodes', 'sources', 'metadata')}
+
+
+def test_read_manifest_projects_every_node(manifest_path):
+    with open(manifest_path, encoding='utf-8') as f:
+        expected = json.load(f)
+
+    manifest = read_manifest(manifest_path, sections=('metadata', 'nodes', 'sources'))
+
+    assert manifest['nodes'] == {unique_id: project_node(node) for unique_id, node in expected['nodes'].items()}
+    assert manifest['sources']['source.jaffle_shop.raw.orders']['depends_on'] == {'nodes': [], 'macros': []}
+    assert manifest['metadata']['project_name'] == 'jaffle_shop'
+
+
+def test_number_split_across_chunks_is_not_truncated():
+    stream = ManifestStream(io.StringIO('{"a": 123456789, "b": [1.5e10]}'), chunk_size=3)
+    values = {key: stream.read_value() for key in stream.iter_object()}
+    assert values == {'a': 123456789, 'b': [1.5e10]}
+
+
+def test_truncated_manifest_raises():
+    stream = ManifestStream(io.StringIO('{"nodes": {"model.a": {"name": "a"'), chunk_size=4)
+    with pytest.raises(ValueError):
+        for _ in stream.iter_object():
+            stream.skip_value()
@@ -0,0 +1,38 @@
+import json
+from argparse import Namespace
+
+from dbt_cicd_toolkit.scripts import promote_models
+from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore
+
+
+def test_failing_cross_wave_test_promotes_none_of_its_models(tmp_path, manifest, monkeypatch, capsys):
+    customers = manifest.node('model', 'customers')
+    orders = manifest.node('model', 'orders', parents=[customers[0]])
+    relationship = manifest.node('test', 'relationships_orders_customer_id', parents=[orders[0], customers[0]])
+    (tmp_path / 'target').mkdir()
+    (tmp_path / 'target' / 'manifest.json').write_text(json.dumps({
+        'metadata': {'project_name': 'proj'},
+        'nodes': dict([customers, orders, relationship]),
+        'sources': {},
+        'macros': {}
+    }))
+
+    def validate_wave(args, graph, wave_index, test_ids, durations):
+        results = [{'unique_id': test_id, 'status': 'fail' if test_id == relationship[0] else 'pass'}
+                   for test_id in test_ids]
+        return {'results': results, 'elapsed_time': 0.0}, [r for r in results if r['status'] == 'fail']
+
+    monkeypatch.setattr(promote_models, 'validate_wave', validate_wave)
+    args = Namespace(dbt_project_dir=str(tmp_path), target_environment='staging', require_tests=True,
+                     durations_from=None, workers=1, dry_run=False, output_format='json')
+
+    assert promote_models.promote_batch(args, ['customers', 'orders']) == 1
+
+    output = capsys.readouterr().out
+    result = json.loads(output[output.index('\n{') + 1:])
+    assert result['waves'] == [['customers'], ['orders']]
+    assert result['models'] == []
+    assert result['failed_models'] == ['customers']
+    assert result['skipped_models'] == ['orders']
+    with PromotionStore.for_project(tmp_path) as store:
+        assert store.get_status('staging')['staging'] == {}
@@ -0,0 +1,83 @@
+import json
+import threading
+
+from dbt_cicd_toolkit.scripts.cli import run_command
+from dbt_cicd_toolkit.scripts.promotion_store import PromotionStore, default_state_dir
+
+
+def plan(environment, timestamp, models, success=True):
+    return {'target_environment': environment, 'timestamp': timestamp, 'models': models, 'success': success}
+
+
+def test_latest_status_keeps_the_newest_promotion(tmp_path):
+    with PromotionStore(tmp_path) as store:
+        store.record_promotion(plan('staging', '2024-01-02T00:00:00', ['orders']))
+        store.record_promotion(plan('staging', '2024-01-01T00:00:00', ['orders', 'customers'], success=False))
+
+        status = store.get_status('staging', include_history=True)['staging']
+
+    assert status['orders']['last_promotion'] == '2024-01-02T00:00:00'
+    assert status['orders']['last_success'] is True
+    assert [entry['timestamp'] for entry in status['orders']['promotion_history']] == [
+        '2024-01-02T00:00:00', '2024-01-01T00:00:00'
+    ]
+    assert status['customers']['last_success'] is False
+
+
+def test_unpromoted_models_are_reported_as_not_promoted(tmp_path):
+    with PromotionStore(tmp_path) as store:
+        store.record_promotion(plan('staging', '2024-01-01T00:00:00', ['orders']))
+        status = store.get_status('production', models=['orders'])
+
+    assert status == {'production': {'orders': {'name': 'orders', 'promoted': False,
+                                                'last_promotion': None, 'promotion_history': []}}}
+
+
+def test_status_after_compaction_does_not_reimport_compacted_promotions(tmp_path, capsys):
+    with PromotionStore.for_project(tmp_path) as store:
+        for day in range(1, 6):
+            store.record_promotion(plan('staging', f'2024-01-0{day}T00:00:00', ['orders']))
+
+    run_command(['promotion', 'compact', '--keep-last', '1', '--project-dir', str(tmp_path)])
+    capsys.readouterr()
+    for _ in range(2):
+        run_command(['promotion', 'status', '--history', '--format', 'json', '--project-dir', str(tmp_path)])
+        status = json.loads(capsys.readouterr().out)
+        assert status['staging']['orders']['promotion_history'] == [
+            {'timestamp': '2024-01-05T00:00:00', 'success': True}
+        ]
+
+    state = json.loads((default_state_dir(tmp_path) / 'staging.json').read_text())
+    assert [promotion['timestamp'] for promotion in state['promotions']] == ['2024-01-05T00:00:00']
+    with PromotionStore.for_project(tmp_path) as store:
+        assert store.import_json_states() == 0
+
+
+def test_import_json_states_is_idempotent(tmp_path):
+    (tmp_path / 'staging.json').write_text(json.dumps({'promotions': [
+        {'timestamp': '2024-01-01T00:00:00', 'models': ['orders'], 'success': True}
+    ]}))
+
+    with PromotionStore(tmp_path) as store:
+        assert store.import_json_states() == 1
+        assert store.import_json_states() == 0
+        assert store.get_status('staging')['staging']['orders']['last_promotion'] == '2024-01-01T00:00:00'
+
+
+def test_concurrent_writers_do_not_lose_promotions(tmp_path):
+    def promote(environment):
+        with PromotionStore(tmp_path) as store:
+            for i in range(20):
+                store.record_promotion(plan(environment, f'2024-01-01T00:00:{i:02d}', [f'model_{i}']))
+
+    threads = [threading.Thread(target=promote, args=(environment,)) for environment in ('staging', 'production')]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with PromotionStore(tmp_path) as store:
+        status = store.get_status()
+    assert len(status['staging']) == len(status['production']) == 20
+    state = json.loads((tmp_path / 'production.json').read_text())
+    assert len(state['promotions']) == 10
@@ -0,0 +1,68 @@
+from dbt_cicd_toolkit.scripts.dbt_runner import resolve_target
+from dbt_cicd_toolkit.scripts.result_cache import ResultCache, compute_test_keys
+
+TEST_ID = 'test.proj.not_null_orders_id'
+
+
+def cache_key(manifest, test_macro_sql='select 1', model_macro_sql='id', helper_sql='false',
+              test_config=None, target=('proj', 'dev')):
+    graph = manifest.graph(
+        [
+            manifest.node('model', 'orders', macros=['macro.proj.cents']),
+            manifest.node('test', 'not_null_orders_id', parents=['model.proj.orders'],
+                          macros=['macro.dbt.test_not_null'], config=test_config or {'severity': 'error'},
+                          test_metadata={'name': 'not_null'}, column_name='id'),
+        ],
+        macros=[
+            manifest.macro('test_not_null', test_macro_sql, macros=['macro.dbt.should_store_failures'],
+                           package='dbt'),
+            manifest.macro('should_store_failures', helper_sql, package='dbt'),
+            manifest.macro('cents', model_macro_sql),
+        ],
+    )
+    return compute_test_keys(graph, [TEST_ID], target)[TEST_ID]
+
+
+def test_key_is_stable(manifest):
+    assert cache_key(manifest) == cache_key(manifest)
+
+
+def test_generic_test_macro_edit_invalidates(manifest):
+    assert cache_key(manifest, test_macro_sql='select 2') != cache_key(manifest)
+
+
+def test_macro_called_by_test_macro_invalidates(manifest):
+    assert cache_key(manifest, helper_sql='true') != cache_key(manifest)
+
+
+def test_upstream_model_macro_edit_invalidates(manifest):
+    assert cache_key(manifest, model_macro_sql='id / 100') != cache_key(manifest)
+
+
+def test_test_config_change_invalidates(manifest):
+    assert cache_key(manifest, test_config={'severity': 'warn'}) != cache_key(manifest)
+
+
+def test_pass_under_one_target_is_a_miss_under_another(manifest, tmp_path):
+    cache = ResultCache(tmp_path)
+    dev_keys = {TEST_ID: cache_key(manifest, target=('proj', 'dev'))}
+    cache.record({'results': [{'unique_id': TEST_ID, 'status': 'pass'}]}, dev_keys)
+
+    assert set(cache.lookup(dev_keys)) == {TEST_ID}
+    assert cache.lookup({TEST_ID: cache_key(manifest, target=('proj', 'prod'))}) == {}
+    assert cache.lookup({TEST_ID: cache_key(manifest, target=('other', 'dev'))}) == {}
+
+
+def test_target_resolves_like_dbt(tmp_path, monkeypatch):
+    for name in ('DBT_PROFILE', 'DBT_TARGET', 'DBT_PROFILES_DIR', 'CI_TARGET'):
+        monkeypatch.delenv(name, raising=False)
+    (tmp_path / 'dbt_project.yml').write_text("name: proj\nprofile: warehouse\n")
+    (tmp_path / 'profiles.yml').write_text(
+        "warehouse:\n  target: \"{{ env_var('CI_TARGET', 'dev') }}\"\n  outputs: {}\n"
+    )
+
+    assert resolve_target(tmp_path) == ('warehouse', 'dev')
+    monkeypatch.setenv('CI_TARGET', 'ci')
+    assert resolve_target(tmp_path) == ('warehouse', 'ci')
+    monkeypatch.setenv('DBT_TARGET', 'prod')
+    assert resolve_target(tmp_path) == ('warehouse', 'prod')
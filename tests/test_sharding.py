@@ -0,0 +1,128 @@
+import json
+from argparse import Namespace
+
+from dbt_cicd_toolkit.scripts.dbt_runner import DbtResult
+from dbt_cicd_toolkit.scripts.run_selective_tests import get_test_durations, select_runner_tests
+from dbt_cicd_toolkit.scripts.selective_planner import selectors_for_tests
+from dbt_cicd_toolkit.scripts.shard_runner import MAX_SELECT_CHARS, run_test_shard, select_shard
+
+
+def write_run_results(project_dir, durations):
+    target = project_dir / 'target'
+    target.mkdir(parents=True)
+    results = [{'unique_id': unique_id, 'status': 'pass', 'execution_time': seconds}
+               for unique_id, seconds in durations.items()]
+    (target / 'run_results.json').write_text(json.dumps({'results': results}))
+
+
+def shard_args(project_dir, durations_from=None):
+    return Namespace(dbt_project_dir=str(project_dir), balance_by='duration', durations_from=durations_from)
+
+
+def test_shards_ignore_local_run_results(tmp_path, manifest):
+    nodes = []
+    for i in range(7):
+        nodes.append(manifest.node('model', f"m{i}"))
+        nodes.append(manifest.node('test', f"not_null_m{i}", parents=[f"model.proj.m{i}"]))
+    graph = manifest.graph(nodes)
+    test_ids = sorted(unique_id for unique_id, _ in nodes if unique_id.startswith('test.'))
+
+    # Two runners whose previous runs recorded very different durations
+    runner_a = tmp_path / 'a'
+    runner_b = tmp_path / 'b'
+    write_run_results(runner_a, {test_id: float(i + 1) for i, test_id in enumerate(test_ids)})
+    write_run_results(runner_b, {test_ids[0]: 100.0, test_ids[4]: 50.0})
+
+    shards = []
+    for index, runner in ((1, runner_a), (2, runner_b), (3, runner_a)):
+        durations = get_test_durations(shard_args(runner), shared=True)
+        shards.append(select_shard(test_ids, f"{index}/3", durations, graph))
+
+    assigned = [test_id for shard in shards for test_id in shard]
+    assert sorted(assigned) == test_ids
+    assert len(assigned) == len(set(assigned))
+
+
+def test_shards_use_shared_durations(tmp_path):
+    shared = tmp_path / 'shared.json'
+    shared.write_text(json.dumps({'results': [{'unique_id': 'test.proj.t', 'execution_time': 3.0}]}))
+    write_run_results(tmp_path / 'runner', {'test.proj.t': 9.0})
+
+    durations = get_test_durations(shard_args(tmp_path / 'runner', [str(shared)]), shared=True)
+    assert durations == {'test.proj.t': 3.0}
+
+
+def test_budget_applies_within_each_shard(tmp_path, manifest):
+    nodes = []
+    for i in range(8):
+        nodes.append(manifest.node('model', f"m{i}"))
+        nodes.append(manifest.node('test', f"unique_m{i}", parents=[f"model.proj.m{i}"]))
+    graph = manifest.graph(nodes)
+    test_ids = sorted(unique_id for unique_id, _ in nodes if unique_id.startswith('test.'))
+
+    def runner_tests(index, local_durations, budget):
+        runner = tmp_path / f"runner{index}_{budget}"
+        write_run_results(runner, local_durations)
+        args = Namespace(dbt_project_dir=str(runner), balance_by='duration', durations_from=None,
+                         shard=f"{index}/2", budget=budget, budget_type='wall', workers=1,
+                         history_dir=str(runner / 'history'), excluded_output=None)
+        return select_runner_tests(args, graph, test_ids)
+
+    shards = [select_shard(test_ids, f"{index}/2", {}, graph) for index in (1, 2)]
+    # Each runner knows different durations, so each keeps different tests within the budget
+    first = runner_tests(1, {test_id: 2.0 for test_id in test_ids[:4]}, '5')
+    second = runner_tests(2, {test_id: 2.0 for test_id in test_ids[4:]}, '5')
+    assert set(first) < set(shards[0])
+    assert set(second) < set(shards[1])
+
+    everything = runner_tests(1, {}, '1h') + runner_tests(2, {test_ids[0]: 30.0}, '1h')
+    assert sorted(everything) == test_ids
+
+
+def test_same_named_tests_in_other_packages_are_selected_separately(manifest):
+    ours = manifest.node('test', 'unique_orders_id', parents=['model.proj.orders'],
+                         fqn=['proj', 'marts', 'unique_orders_id'])
+    theirs = manifest.node('test', 'unique_orders_id', parents=['model.shop.orders'], package='shop',
+                           fqn=['shop', 'unique_orders_id'])
+    graph = manifest.graph([manifest.node('model', 'orders'), manifest.node('model', 'orders', package='shop'),
+                            ours, theirs])
+
+    assert selectors_for_tests(graph, [ours[0], theirs[0]]) == [
+        'fqn:proj.marts.unique_orders_id', 'fqn:shop.unique_orders_id'
+    ]
+
+
+class RecordingRunner:
+    """Stands in for DbtRunner, passing every selected test."""
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.calls = []
+
+    def invoke(self, command, args, target_path=None):
+        self.calls.append(args)
+        selected = args[args.index('--select') + 1:]
+        fqns = {'.'.join(node['fqn']): unique_id for unique_id, node in self.graph.nodes.items() if node['fqn']}
+        results = [{'unique_id': fqns[selector[len('fqn:'):]], 'status': 'pass', 'execution_time': 0.1}
+                   for selector in selected]
+        return DbtResult(True, 0, run_results={'results': results, 'elapsed_time': 1.0})
+
+
+def test_large_shards_are_split_across_bounded_invocations(tmp_path, manifest):
+    nodes = [manifest.node('model', 'orders')]
+    for i in range(2000):
+        name = f"accepted_values_orders_status_with_a_long_generated_name_{i}"
+        nodes.append(manifest.node('test', name, parents=['model.proj.orders'], fqn=['proj', 'marts', name]))
+    graph = manifest.graph(nodes)
+    test_ids = sorted(unique_id for unique_id, _ in nodes if unique_id.startswith('test.'))
+    runner = RecordingRunner(graph)
+
+    returncode, run_results_path = run_test_shard(tmp_path, graph, 0, test_ids, runner=runner)
+
+    assert returncode == 0
+    assert len(runner.calls) > 1
+    for args in runner.calls:
+        assert len(' '.join(args[args.index('--select') + 1:])) <= MAX_SELECT_CHARS
+    run_results = json.loads(run_results_path.read_text())
+    assert sorted(result['unique_id'] for result in run_results['results']) == test_ids
+    assert run_results['elapsed_time'] == len(runner.calls)
@@ -0,0 +1,22 @@
+from dbt_cicd_toolkit.scripts.state_diff import diff_manifests
+
+
+def orders(manifest, schema, unrendered_config=None):
+    unrendered_config = unrendered_config or {'materialized': 'table', 'schema': "{{ target.schema }}"}
+    return manifest.node('model', 'orders', config={'materialized': 'table', 'schema': schema,
+                                                    'database': f"{schema}_db"},
+                         unrendered_config=unrendered_config)
+
+
+def test_target_only_differences_are_not_config_changes(manifest):
+    ci = manifest.graph([orders(manifest, 'ci_pr_42')])
+    prod = manifest.graph([orders(manifest, 'analytics')])
+
+    assert diff_manifests(ci, prod)['nodes'] == {}
+
+
+def test_unrendered_config_changes_are_reported(manifest):
+    ci = manifest.graph([orders(manifest, 'ci_pr_42', {'materialized': 'incremental'})])
+    prod = manifest.graph([orders(manifest, 'analytics')])
+
+    assert diff_manifests(ci, prod)['nodes'] == {'model.proj.orders': ['config']}
@@ -0,0 +1,62 @@
+import sqlite3
+
+from dbt_cicd_toolkit.scripts.version_registry import VersionRegistry, parse_semver
+
+# Ascending precedence, from the semver specification
+SPEC_ORDER = ['1.0.0-alpha', '1.0.0-alpha.1', '1.0.0-alpha.beta', '1.0.0-beta', '1.0.0-beta.2',
+              '1.0.0-beta.11', '1.0.0-rc.1', '1.0.0', '1.0.1-rc.1', '1.0.1']
+
+
+def test_semver_keys_follow_spec_precedence():
+    shuffled = SPEC_ORDER[::2] + SPEC_ORDER[1::2]
+    assert sorted(shuffled, key=parse_semver) == SPEC_ORDER
+
+
+def register(registry, *versions):
+    registry.register([{'model': 'orders', 'version': version} for version in versions])
+
+
+def test_latest_compares_numeric_prerelease_identifiers(tmp_path):
+    with VersionRegistry(tmp_path) as registry:
+        register(registry, '1.0.0-rc.2', '1.0.0-rc.10')
+        assert registry.get_latest('orders') == '1.0.0-rc.10'
+        register(registry, '1.0.0')
+        assert registry.get_latest('orders') == '1.0.0'
+        register(registry, '1.1.0-rc.1')
+        assert registry.get_latest('orders') == '1.1.0-rc.1'
+
+
+def test_registry_from_older_schema_is_migrated(tmp_path):
+    with VersionRegistry(tmp_path) as registry:
+        register(registry, '1.0.0-rc.2', '1.0.0-rc.10', '1.0.0')
+    # Rewrite the rows the way the first schema stored them
+    connection = sqlite3.connect(str(tmp_path / 'versions.db'))
+    connection.execute("UPDATE versions SET prerelease = substr(version, 7) WHERE version LIKE '%-%'")
+    connection.execute("UPDATE versions SET prerelease = '' WHERE version NOT LIKE '%-%'")
+    connection.execute('DROP TABLE registry_metadata')
+    connection.commit()
+    connection.close()
+
+    with VersionRegistry(tmp_path) as registry:
+        rows = registry.connection.execute('SELECT version, prerelease FROM versions').fetchall()
+        assert {row['version']: row['prerelease'] for row in rows} == {
+            version: parse_semver(version)[4] for version in ('1.0.0-rc.2', '1.0.0-rc.10', '1.0.0')
+        }
+
+
+def test_latest_is_the_highest_version_not_the_newest_registration(tmp_path):
+    with VersionRegistry(tmp_path) as registry:
+        register(registry, '1.2.0', '2.0.0')
+        register(registry, '1.2.1')
+        assert registry.get_latest('orders') == '2.0.0'
+
+
+def test_versions_that_are_not_semver_rank_below_semver_versions(tmp_path):
+    with VersionRegistry(tmp_path) as registry:
+        register(registry, 'release-a')
+        assert registry.get_latest('orders') == 'release-a'
+        register(registry, '0.1.0', 'release-b')
+        assert registry.get_latest('orders') == '0.1.0'
+        assert {entry['version'] for entry in registry.history('orders')['versions']} == {
+            'release-a', '0.1.0', 'release-b'
+        }
@@ -0,0 +1,71 @@
+import hashlib
+import json
+
+from dbt_cicd_toolkit.scripts.graph_index import load_or_build_index
+from dbt_cicd_toolkit.scripts.watch import WatchSession
+
+CRLF_SQL = b"select *\r\nfrom {{ ref('customers') }}\r\n"
+
+
+def write_manifest(project_dir, manifest):
+    customers = manifest.node('model', 'customers', checksum='customers')
+    orders = manifest.node('model', 'orders', parents=[customers[0]],
+                           checksum=hashlib.sha256(CRLF_SQL).hexdigest())
+    path = project_dir / 'target' / 'manifest.json'
+    path.parent.mkdir()
+    path.write_text(json.dumps({
+        'metadata': {'dbt_version': '1.7.0', 'project_name': 'proj'},
+        'nodes': dict([customers, orders]),
+        'sources': {},
+        'macros': {}
+    }))
+    return path
+
+
+def test_crlf_file_matching_the_manifest_is_not_a_change(tmp_path, manifest):
+    graph = load_or_build_index(write_manifest(tmp_path, manifest))
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'models' / 'orders.sql').write_bytes(CRLF_SQL)
+    session = WatchSession(tmp_path, graph, config={'name': 'proj'})
+
+    assert session.record_change('models/orders.sql') is None
+    assert session.changed == {}
+
+
+def test_new_models_use_the_manifest_project_name_without_one_in_dbt_project(tmp_path, manifest):
+    graph = load_or_build_index(write_manifest(tmp_path, manifest))
+    (tmp_path / 'dbt_project.yml').write_text("name: [unclosed\n")
+    (tmp_path / 'models').mkdir()
+    (tmp_path / 'models' / 'returns.sql').write_text("select * from {{ ref('orders') }}\n")
+    session = WatchSession(tmp_path, graph)
+
+    assert session.record_change('models/returns.sql') == 'new model'
+    assert graph.nodes['model.proj.returns']['package_name'] == 'proj'
+    assert graph.nodes['model.proj.returns']['depends_on']['nodes'] == ['model.proj.orders']
+
+
+def test_renamed_node_no_longer_resolves_by_its_old_name(manifest):
+    graph = manifest.graph([manifest.node('model', 'orders'), manifest.node('model', 'orders', package='shop')])
+    node = dict(graph.nodes['model.proj.orders'], name='purchases')
+
+    graph.update_node('model.proj.orders', node)
+
+    assert graph.get_model_id('purchases') == 'model.proj.orders'
+    assert graph.get_model_id('orders') == 'model.shop.orders'
+
+
+def test_model_created_and_deleted_during_the_watch_is_removed(tmp_path, manifest):
+    graph = load_or_build_index(write_manifest(tmp_path, manifest))
+    (tmp_path / 'models').mkdir()
+    returns = tmp_path / 'models' / 'returns.sql'
+    returns.write_text("select * from {{ ref('orders') }}\n")
+    session = WatchSession(tmp_path, graph, config={'name': 'proj'})
+    assert session.record_change('models/returns.sql') == 'new model'
+
+    returns.unlink()
+
+    assert session.record_change('models/returns.sql') is None
+    assert session.changed == {}
+    assert 'model.proj.returns' not in graph.nodes
+    assert graph.get_model_id('returns') is None
+    assert graph.get_downstream(['model.proj.orders']) == []